@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Backfill message_count, last_message and last_message_at on chat sessions
+
+Recomputes the fields from chat_messages for every session, so it is safe to
+re-run; run it once after deploying denormalized session fields.
+"""
+import asyncio
+import os
+from bson import ObjectId
+from bson.errors import InvalidId
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import UpdateOne
+from dotenv import load_dotenv
+
+# Load environment variables before CHAT_PREVIEW_CHARS is read
+load_dotenv()
+
+from services.chat_store import message_preview
+
+BATCH_SIZE = 500
+
+async def backfill_chat_sessions():
+    """Rebuild each chat session's message count and last-message preview from its messages"""
+    # Connect to MongoDB
+    mongo_url = os.getenv("MONGODB_URL", "mongodb://localhost:27017")
+    db_name = os.getenv("MONGODB_DATABASE", "studybuddy")
+    
+    client = AsyncIOMotorClient(mongo_url)
+    db = client[db_name]
+    
+    print("🔄 Backfilling chat sessions...")
+    
+    try:
+        # Walks the (session_id, created_at) index, so the newest message of each session comes last
+        pipeline = [
+            {"$sort": {"session_id": 1, "created_at": 1}},
+            {"$group": {
+                "_id": "$session_id",
+                "message_count": {"$sum": 1},
+                "last_message": {"$last": "$content"},
+                "last_message_at": {"$last": "$created_at"}
+            }}
+        ]
+        
+        updated = 0
+        operations = []
+        async for group in db.chat_messages.aggregate(pipeline, allowDiskUse=True):
+            try:
+                session_id = ObjectId(group["_id"])
+            except (InvalidId, TypeError):
+                continue
+            
+            operations.append(UpdateOne({"_id": session_id}, {"$set": {
+                "message_count": group["message_count"],
+                "last_message": message_preview(group["last_message"] or ""),
+                "last_message_at": group["last_message_at"]
+            }}))
+            if len(operations) >= BATCH_SIZE:
+                result = await db.chat_sessions.bulk_write(operations, ordered=False)
+                updated += result.modified_count
+                operations = []
+        
+        if operations:
+            result = await db.chat_sessions.bulk_write(operations, ordered=False)
+            updated += result.modified_count
+        
+        # Sessions without any messages
+        result = await db.chat_sessions.update_many(
+            {"message_count": {"$exists": False}},
+            {"$set": {"message_count": 0, "last_message": None, "last_message_at": None}}
+        )
+        
+        print(f"✅ Updated {updated} sessions with messages")
+        print(f"✅ Initialized {result.modified_count} empty sessions")
+        
+    except Exception as e:
+        print(f"❌ Error backfilling chat sessions: {e}")
+        raise
+    finally:
+        client.close()
+
+if __name__ == "__main__":
+    asyncio.run(backfill_chat_sessions())
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Benchmark the local extractive summarizer on a synthetic extracted PDF
+
+Builds a deterministic document of --pages pages (~500 words each, Zipf-
+distributed vocabulary) and times each SummaryType on one core.
+
+Usage:
+    python benchmarks/bench_extractive_summary.py --pages 100
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+# Pin BLAS to one thread so the numbers reflect a single core
+for var in ("OMP_NUM_THREADS", "OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS"):
+    os.environ.setdefault(var, "1")
+
+def build_document(pages: int, words_per_page: int = 500, seed: int = 42) -> str:
+    """Generate page-separated text that looks like PDF extraction output"""
+    rng = random.Random(seed)
+    vocabulary = [f"term{i}" for i in range(5000)]
+    weights = [1.0 / (rank + 1) for rank in range(len(vocabulary))]
+    stop_words = ["the", "of", "and", "in", "is", "to", "a", "that", "for", "with"]
+    
+    page_texts = []
+    for _ in range(pages):
+        sentences = []
+        written = 0
+        while written < words_per_page:
+            length = rng.randint(8, 25)
+            words = [
+                rng.choice(stop_words) if rng.random() < 0.4 else rng.choices(vocabulary, weights)[0]
+                for _ in range(length)
+            ]
+            sentences.append(" ".join(words).capitalize() + ".")
+            written += length
+        page_texts.append(" ".join(sentences))
+    return "\n".join(page_texts)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    
+    from models.summary import SummaryType
+    from services.extractive_summarizer import summarize, split_sentences
+    
+    text = build_document(args.pages)
+    print(f"Pages: {args.pages}, words: {len(text.split())}, sentences: {len(split_sentences(text))}, chars: {len(text)}")
+    
+    for summary_type in SummaryType:
+        timings = []
+        for _ in range(args.repeat):
+            started = time.perf_counter()
+            summarize(text, summary_type)
+            timings.append(time.perf_counter() - started)
+        print(f"{summary_type.value:<10} best {min(timings) * 1000:.1f}ms, worst {max(timings) * 1000:.1f}ms")
+
+if __name__ == "__main__":
+    main()
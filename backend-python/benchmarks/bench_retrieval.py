@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Benchmark BM25 retrieval over a user's uploaded documents
+
+Indexes --documents synthetic documents of --pages pages each (Zipf-
+distributed vocabulary) for one user, then times cold loads of the
+persisted index and warm chat-sized queries.
+
+Usage:
+    python benchmarks/bench_retrieval.py --documents 300 --pages 10
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import itertools
+import tempfile
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+VOCABULARY = [f"term{i}" for i in range(5000)]
+CUMULATIVE_WEIGHTS = list(itertools.accumulate(1.0 / (rank + 1) for rank in range(len(VOCABULARY))))
+
+def build_document(pages: int, seed: int, words_per_page: int = 500) -> str:
+    """Generate document text with a Zipf-distributed vocabulary"""
+    rng = random.Random(seed)
+    return " ".join(rng.choices(VOCABULARY, cum_weights=CUMULATIVE_WEIGHTS, k=pages * words_per_page))
+
+async def run(args):
+    from services.retrieval import RetrievalIndex
+    
+    with tempfile.TemporaryDirectory() as root:
+        index = RetrievalIndex(root=root)
+        
+        started = time.perf_counter()
+        for i in range(args.documents):
+            await index.add_document("bench-user", f"doc{i}", f"document-{i}.pdf", build_document(args.pages, i))
+        print(f"Indexed {args.documents} documents of {args.pages} pages in {time.perf_counter() - started:.1f}s")
+        
+        # A fresh instance loads the persisted segments on its first query
+        index = RetrievalIndex(root=root)
+        started = time.perf_counter()
+        await index.search("bench-user", "term1 term2")
+        print(f"Cold load: {(time.perf_counter() - started) * 1000:.0f}ms, passages: {len(index.indexes['bench-user'].passages)}")
+        
+        rng = random.Random(7)
+        timings = []
+        for _ in range(args.queries):
+            query = " ".join(f"term{rng.randint(0, 2000)}" for _ in range(rng.randint(3, 12)))
+            started = time.perf_counter()
+            await index.search("bench-user", query)
+            timings.append(time.perf_counter() - started)
+        timings.sort()
+        print(f"Query p50 {timings[len(timings) // 2] * 1000:.2f}ms, p99 {timings[int(len(timings) * 0.99)] * 1000:.2f}ms, worst {timings[-1] * 1000:.2f}ms")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--documents", type=int, default=300)
+    parser.add_argument("--pages", type=int, default=10)
+    parser.add_argument("--queries", type=int, default=200)
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+if __name__ == "__main__":
+    main()
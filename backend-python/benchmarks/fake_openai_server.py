@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""
+Local OpenAI-compatible stub server for load testing without API quota
+
+Serves /v1/chat/completions with configurable latency distributions, token
+streaming, injected errors and valid JSON quiz payloads for quiz prompts.
+
+Usage:
+    python benchmarks/fake_openai_server.py --port 8089 --latency 1.5 --latency-dist lognormal --error-rate 0.02
+    FAKE_AI_LATENCY=2.0 uvicorn benchmarks.fake_openai_server:app --port 8089
+
+Point the backend at it with OPENAI_BASE_URL=http://127.0.0.1:8089/v1
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import re
+import time
+import uuid
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+FAKE_AI_LATENCY = float(os.getenv("FAKE_AI_LATENCY", "2.0"))  # median seconds to first token
+FAKE_AI_LATENCY_DIST = os.getenv("FAKE_AI_LATENCY_DIST", "fixed")  # fixed, uniform, exponential, lognormal
+FAKE_AI_LATENCY_SIGMA = float(os.getenv("FAKE_AI_LATENCY_SIGMA", "0.5"))  # lognormal shape
+FAKE_AI_TOKEN_DELAY = float(os.getenv("FAKE_AI_TOKEN_DELAY", "0.02"))  # seconds between streamed tokens
+FAKE_AI_ERROR_RATE = float(os.getenv("FAKE_AI_ERROR_RATE", "0"))  # fraction of requests that fail
+FAKE_AI_ERROR_STATUS = [int(code) for code in os.getenv("FAKE_AI_ERROR_STATUS", "500,429").split(",")]
+FAKE_AI_RETRY_AFTER = os.getenv("FAKE_AI_RETRY_AFTER", "1")  # seconds, sent with 429 responses
+
+app = FastAPI(title="Fake OpenAI")
+
+stats = {"requests": 0, "streamed": 0, "errors": 0}
+
+def sample_latency() -> float:
+    """Draw one response latency from the configured distribution"""
+    if FAKE_AI_LATENCY_DIST == "uniform":
+        return random.uniform(0, 2 * FAKE_AI_LATENCY)
+    if FAKE_AI_LATENCY_DIST == "exponential":
+        return random.expovariate(1 / FAKE_AI_LATENCY) if FAKE_AI_LATENCY > 0 else 0.0
+    if FAKE_AI_LATENCY_DIST == "lognormal":
+        return random.lognormvariate(0, FAKE_AI_LATENCY_SIGMA) * FAKE_AI_LATENCY
+    return FAKE_AI_LATENCY
+
+def build_quiz_payload(prompt: str) -> str:
+    """Build a valid JSON question list for a quiz generation prompt"""
+    match = re.search(r"Generate (\d+) quiz questions about (.+?) in (.+?)\.", prompt)
+    count = int(match.group(1)) if match else 5
+    topic = match.group(2) if match else "the topic"
+    
+    questions = []
+    for i in range(count):
+        # Unique wording per question so de-duplication keeps them all
+        tag = uuid.uuid4().hex[:8]
+        if i % 2 == 0:
+            questions.append({
+                "type": "mcq",
+                "question": f"Question {tag}: which statement about {topic} is correct?",
+                "options": [f"Statement {tag} A", f"Statement {tag} B", f"Statement {tag} C", f"Statement {tag} D"],
+                "correctAnswer": random.randint(0, 3),
+                "explanation": f"Explanation {tag}.",
+                "difficulty": "medium",
+                "topic": topic
+            })
+        else:
+            questions.append({
+                "type": "true_false",
+                "question": f"Claim {tag} about {topic} holds.",
+                "correctAnswer": random.choice(["true", "false"]),
+                "explanation": f"Explanation {tag}.",
+                "difficulty": "medium",
+                "topic": topic
+            })
+    return json.dumps(questions)
+
+def build_content(messages: list) -> str:
+    """Pick a response body that matches the kind of prompt"""
+    system_prompt = messages[0].get("content", "") if messages else ""
+    user_prompt = messages[-1].get("content", "") if messages else ""
+    
+    if "quiz questions" in system_prompt:
+        return build_quiz_payload(user_prompt)
+    if "summaries" in system_prompt:
+        return "• Key point one from the text.\n• Key point two from the text.\n• Key point three from the text."
+    return "That's a great question! Here is a short explanation generated by the load-test stub server to help you understand the concept."
+
+def tokenize(content: str) -> list:
+    """Split content into word-sized stream chunks"""
+    return re.findall(r"\S+\s*|\s+", content)
+
+@app.get("/stats")
+async def get_stats():
+    return stats
+
+@app.post("/v1/chat/completions")
+async def chat_completions(request: Request):
+    body = await request.json()
+    stats["requests"] += 1
+    
+    latency = sample_latency()
+    
+    if FAKE_AI_ERROR_RATE and random.random() < FAKE_AI_ERROR_RATE:
+        stats["errors"] += 1
+        await asyncio.sleep(latency)
+        status_code = random.choice(FAKE_AI_ERROR_STATUS)
+        headers = {"retry-after": FAKE_AI_RETRY_AFTER} if status_code == 429 else {}
+        return JSONResponse(
+            status_code=status_code,
+            headers=headers,
+            content={"error": {"message": "Injected failure", "type": "server_error", "code": status_code}}
+        )
+    
+    completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+    model = body.get("model", "gpt-3.5-turbo")
+    content = build_content(body.get("messages", []))
+    prompt_tokens = sum(len(str(m.get("content", ""))) // 4 for m in body.get("messages", []))
+    completion_tokens = len(tokenize(content))
+    
+    if body.get("stream"):
+        stats["streamed"] += 1
+        
+        async def event_stream():
+            await asyncio.sleep(latency)
+            for token in tokenize(content):
+                chunk = {
+                    "id": completion_id,
+                    "object": "chat.completion.chunk",
+                    "created": int(time.time()),
+                    "model": model,
+                    "choices": [{"index": 0, "delta": {"content": token}, "finish_reason": None}]
+                }
+                yield f"data: {json.dumps(chunk)}\n\n"
+                await asyncio.sleep(FAKE_AI_TOKEN_DELAY)
+            final = {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]
+            }
+            yield f"data: {json.dumps(final)}\n\n"
+            yield "data: [DONE]\n\n"
+        
+        return StreamingResponse(event_stream(), media_type="text/event-stream")
+    
+    # Non-streaming replies take first-token latency plus full generation time
+    await asyncio.sleep(latency + FAKE_AI_TOKEN_DELAY * completion_tokens)
+    return {
+        "id": completion_id,
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [{
+            "index": 0,
+            "message": {"role": "assistant", "content": content},
+            "finish_reason": "stop"
+        }],
+        "usage": {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens
+        }
+    }
+
+def main():
+    global FAKE_AI_LATENCY, FAKE_AI_LATENCY_DIST, FAKE_AI_LATENCY_SIGMA, FAKE_AI_TOKEN_DELAY, FAKE_AI_ERROR_RATE
+    
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--latency", type=float, default=FAKE_AI_LATENCY)
+    parser.add_argument("--latency-dist", choices=["fixed", "uniform", "exponential", "lognormal"], default=FAKE_AI_LATENCY_DIST)
+    parser.add_argument("--latency-sigma", type=float, default=FAKE_AI_LATENCY_SIGMA)
+    parser.add_argument("--token-delay", type=float, default=FAKE_AI_TOKEN_DELAY)
+    parser.add_argument("--error-rate", type=float, default=FAKE_AI_ERROR_RATE)
+    args = parser.parse_args()
+    
+    FAKE_AI_LATENCY = args.latency
+    FAKE_AI_LATENCY_DIST = args.latency_dist
+    FAKE_AI_LATENCY_SIGMA = args.latency_sigma
+    FAKE_AI_TOKEN_DELAY = args.token_delay
+    FAKE_AI_ERROR_RATE = args.error_rate
+    
+    import uvicorn
+    uvicorn.run(app, host="127.0.0.1", port=args.port, log_level="warning")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+"""
+Scripted load generator for the StudyBuddy API
+
+Drives a weighted mix of summary, quiz, chat and dashboard requests against a
+running backend with a fixed number of concurrent virtual users, then reports
+throughput and latency percentiles per route. Pair it with the stub server so
+no real API quota is spent:
+
+    python benchmarks/fake_openai_server.py --port 8089 --latency 1.0 --latency-dist lognormal &
+    OPENAI_BASE_URL=http://127.0.0.1:8089/v1 uvicorn main:app --port 3001 &
+    python benchmarks/load_generator.py --base-url http://127.0.0.1:3001 --users 50 --duration 60
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+import uuid
+from collections import defaultdict
+
+import httpx
+
+SAMPLE_TEXT = (
+    "Photosynthesis is the process by which green plants convert light energy into chemical energy. "
+    "Chlorophyll in the chloroplasts absorbs light, mostly in the blue and red wavelengths. "
+    "The light-dependent reactions split water and release oxygen while producing ATP and NADPH. "
+    "The Calvin cycle then uses ATP and NADPH to fix carbon dioxide into sugars. "
+    "Factors such as light intensity, temperature and carbon dioxide concentration limit the rate of photosynthesis. "
+) * 8
+
+CHAT_QUESTIONS = [
+    "What is photosynthesis?",
+    "Explain Newton's second law.",
+    "How do I balance a chemical equation?",
+    "What is the difference between mitosis and meiosis?",
+    "Can you explain the Pythagorean theorem?",
+]
+
+DASHBOARD_ROUTES = [
+    "/api/user/dashboard",
+    "/api/progress/overview",
+    "/api/summaries/stats/overview",
+    "/api/quizzes/stats/overview",
+    "/api/chat/sessions",
+]
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a list of numbers"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+class Recorder:
+    """Collects per-route latencies and errors"""
+    
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.status_codes = defaultdict(lambda: defaultdict(int))
+    
+    def record(self, route: str, latency: float, status_code: int):
+        self.status_codes[route][status_code] += 1
+        if 200 <= status_code < 300:
+            self.latencies[route].append(latency)
+        else:
+            self.errors[route] += 1
+    
+    def report(self, elapsed: float) -> dict:
+        routes = {}
+        for route in sorted(set(self.latencies) | set(self.errors)):
+            values = self.latencies[route]
+            routes[route] = {
+                "ok": len(values),
+                "errors": self.errors[route],
+                "throughput": round(len(values) / elapsed, 2),
+                "p50_ms": round(percentile(values, 50) * 1000, 1),
+                "p90_ms": round(percentile(values, 90) * 1000, 1),
+                "p95_ms": round(percentile(values, 95) * 1000, 1),
+                "p99_ms": round(percentile(values, 99) * 1000, 1),
+                "max_ms": round(max(values) * 1000, 1) if values else 0.0,
+                "status_codes": dict(self.status_codes[route]),
+            }
+        total_ok = sum(route["ok"] for route in routes.values())
+        return {
+            "elapsed_s": round(elapsed, 2),
+            "total_ok": total_ok,
+            "total_errors": sum(route["errors"] for route in routes.values()),
+            "throughput": round(total_ok / elapsed, 2),
+            "routes": routes,
+        }
+
+async def timed(recorder: Recorder, route: str, request):
+    """Await a request coroutine and record its latency under route"""
+    started = time.perf_counter()
+    try:
+        response = await request
+        status_code = response.status_code
+    except httpx.HTTPError:
+        status_code = 599
+        response = None
+    recorder.record(route, time.perf_counter() - started, status_code)
+    return response
+
+async def create_user(client: httpx.AsyncClient) -> str:
+    """Register a throwaway user and return its token"""
+    response = await client.post("/api/auth/register", json={
+        "email": f"load-{uuid.uuid4().hex[:12]}@example.com",
+        "name": "Load Test",
+        "password": "load-test-password"
+    })
+    response.raise_for_status()
+    return response.json()["data"]["token"]
+
+async def create_chat_session(client: httpx.AsyncClient, headers: dict) -> str:
+    response = await client.post("/api/chat/sessions", headers=headers, json={
+        "title": "Load test session",
+        "subject": "science"
+    })
+    response.raise_for_status()
+    return response.json()["data"]["session"]["id"]
+
+async def virtual_user(client: httpx.AsyncClient, args, recorder: Recorder, stop_at: float, rng: random.Random):
+    """Run one user's request loop until the deadline"""
+    token = args.token or await create_user(client)
+    headers = {"Authorization": f"Bearer {token}"}
+    session_id = await create_chat_session(client, headers)
+    
+    scenarios = ["summary", "quiz", "chat", "dashboard"]
+    weights = [args.summary_weight, args.quiz_weight, args.chat_weight, args.dashboard_weight]
+    
+    while time.monotonic() < stop_at:
+        scenario = rng.choices(scenarios, weights)[0]
+        
+        if scenario == "summary":
+            # Vary the text so the summary cache does not absorb every request
+            text = SAMPLE_TEXT if rng.random() < args.repeat_ratio else f"{SAMPLE_TEXT} Note {uuid.uuid4().hex}."
+            await timed(recorder, "POST /api/summaries", client.post("/api/summaries/", headers=headers, json={
+                "original_text": text,
+                "type": rng.choice(["BULLET", "PARAGRAPH", "DETAILED"]),
+                "language": "english"
+            }))
+        elif scenario == "quiz":
+            await timed(recorder, "POST /api/quizzes", client.post("/api/quizzes/", headers=headers, json={
+                "title": "Load test quiz",
+                "subject": "science",
+                "topic": "photosynthesis",
+                "time_limit": 10,
+                "difficulty": "MEDIUM",
+                "num_questions": args.quiz_questions,
+                "question_types": ["MCQ", "TRUE_FALSE"],
+                "content": SAMPLE_TEXT
+            }))
+        elif scenario == "chat":
+            payload = {"content": rng.choice(CHAT_QUESTIONS)}
+            if args.chat_stream:
+                await stream_chat(client, headers, session_id, payload, recorder)
+            else:
+                await timed(recorder, "POST /api/chat/sessions/{id}/messages", client.post(
+                    f"/api/chat/sessions/{session_id}/messages", headers=headers, json=payload
+                ))
+        else:
+            route = rng.choice(DASHBOARD_ROUTES)
+            await timed(recorder, f"GET {route}", client.get(route, headers=headers))
+        
+        if args.think_time:
+            await asyncio.sleep(rng.expovariate(1 / args.think_time))
+
+async def stream_chat(client: httpx.AsyncClient, headers: dict, session_id: str, payload: dict, recorder: Recorder):
+    """Send a streaming chat message, recording time to first token and total time"""
+    started = time.perf_counter()
+    first_token = None
+    status_code = 599
+    try:
+        async with client.stream(
+            "POST", f"/api/chat/sessions/{session_id}/messages/stream", headers=headers, json=payload
+        ) as response:
+            status_code = response.status_code
+            async for line in response.aiter_lines():
+                if first_token is None and line.startswith("event: token"):
+                    first_token = time.perf_counter() - started
+    except httpx.HTTPError:
+        pass
+    recorder.record("POST /api/chat/sessions/{id}/messages/stream", time.perf_counter() - started, status_code)
+    if first_token is not None:
+        recorder.record("POST /api/chat/sessions/{id}/messages/stream (first token)", first_token, status_code)
+
+def print_report(report: dict):
+    print(f"Elapsed: {report['elapsed_s']}s, ok: {report['total_ok']}, errors: {report['total_errors']}, throughput: {report['throughput']} req/s")
+    print(f"{'route':<62} {'ok':>6} {'err':>5} {'req/s':>7} {'p50':>8} {'p90':>8} {'p95':>8} {'p99':>8} {'max':>8}")
+    for route, row in report["routes"].items():
+        print(
+            f"{route:<62} {row['ok']:>6} {row['errors']:>5} {row['throughput']:>7} "
+            f"{row['p50_ms']:>8} {row['p90_ms']:>8} {row['p95_ms']:>8} {row['p99_ms']:>8} {row['max_ms']:>8}"
+        )
+
+async def run(args) -> dict:
+    recorder = Recorder()
+    limits = httpx.Limits(max_connections=args.users * 2, max_keepalive_connections=args.users * 2)
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=args.timeout, limits=limits) as client:
+        started = time.monotonic()
+        stop_at = started + args.duration
+        await asyncio.gather(*[
+            virtual_user(client, args, recorder, stop_at, random.Random(args.seed + i))
+            for i in range(args.users)
+        ])
+        elapsed = time.monotonic() - started
+    return recorder.report(elapsed)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://127.0.0.1:3001")
+    parser.add_argument("--token", help="reuse an existing JWT instead of registering a user per virtual user")
+    parser.add_argument("--users", type=int, default=20, help="concurrent virtual users")
+    parser.add_argument("--duration", type=float, default=30.0, help="test duration in seconds")
+    parser.add_argument("--think-time", type=float, default=0.0, help="mean pause between a user's requests")
+    parser.add_argument("--timeout", type=float, default=120.0, help="per-request timeout in seconds")
+    parser.add_argument("--summary-weight", type=float, default=2)
+    parser.add_argument("--quiz-weight", type=float, default=1)
+    parser.add_argument("--chat-weight", type=float, default=3)
+    parser.add_argument("--dashboard-weight", type=float, default=4)
+    parser.add_argument("--quiz-questions", type=int, default=10)
+    parser.add_argument("--repeat-ratio", type=float, default=0.5, help="fraction of summaries reusing the same text")
+    parser.add_argument("--chat-stream", action="store_true", help="use the streaming chat endpoint")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    args = parser.parse_args()
+    
+    report = asyncio.run(run(args))
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_report(report)
+
+if __name__ == "__main__":
+    main()
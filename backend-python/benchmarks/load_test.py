@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Load test: latency of non-AI routes while AI calls are saturated
+
+Starts the fake completion server, points AIService at it, keeps the AI
+concurrency limit saturated with summary calls and samples /health on the
+same event loop. Reports p50/p95/p99 for /health and AI throughput.
+
+Usage:
+    python benchmarks/load_test.py --ai-workers 64 --duration 10
+"""
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import time
+import uuid
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from benchmarks.load_generator import percentile
+
+async def wait_for_server(url: str, timeout: float = 10.0):
+    import httpx
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient() as client:
+        while time.monotonic() < deadline:
+            try:
+                await client.get(url)
+                return
+            except httpx.HTTPError:
+                await asyncio.sleep(0.1)
+    raise RuntimeError(f"Fake server did not start at {url}")
+
+async def run(args):
+    import httpx
+    from main import app
+    from services.ai_service import ai_service
+    from models.summary import SummaryType
+    
+    await wait_for_server(f"http://127.0.0.1:{args.fake_port}/docs")
+    
+    stop_at = time.monotonic() + args.duration
+    ai_latencies = []
+    health_latencies = []
+    
+    async def ai_worker():
+        while time.monotonic() < stop_at:
+            started = time.perf_counter()
+            # A unique text per call so the summary cache and coalescing never answer it
+            await ai_service.generate_summary(f"{'Load test text. ' * 50}Run {uuid.uuid4().hex}.", SummaryType.BULLET)
+            ai_latencies.append(time.perf_counter() - started)
+    
+    async def health_probe(client):
+        while time.monotonic() < stop_at:
+            started = time.perf_counter()
+            response = await client.get("/health")
+            response.raise_for_status()
+            health_latencies.append(time.perf_counter() - started)
+            await asyncio.sleep(args.probe_interval)
+    
+    async with httpx.AsyncClient(app=app, base_url="http://test") as client:
+        await asyncio.gather(
+            health_probe(client),
+            *[ai_worker() for _ in range(args.ai_workers)]
+        )
+    await ai_service.close()
+    
+    print(f"AI workers: {args.ai_workers}, duration: {args.duration}s, fake latency: {args.latency}s")
+    print(f"AI calls completed: {len(ai_latencies)} ({len(ai_latencies) / args.duration:.1f}/s)")
+    print(f"AI call p50: {percentile(ai_latencies, 50) * 1000:.1f}ms, p99: {percentile(ai_latencies, 99) * 1000:.1f}ms")
+    print(f"/health samples: {len(health_latencies)}")
+    for pct in (50, 95, 99):
+        print(f"/health p{pct}: {percentile(health_latencies, pct) * 1000:.2f}ms")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--ai-workers", type=int, default=64, help="concurrent AI callers")
+    parser.add_argument("--duration", type=float, default=10.0, help="test duration in seconds")
+    parser.add_argument("--latency", type=float, default=1.0, help="fake completion latency in seconds")
+    parser.add_argument("--probe-interval", type=float, default=0.01, help="delay between /health probes")
+    parser.add_argument("--fake-port", type=int, default=8089)
+    args = parser.parse_args()
+    
+    os.environ["OPENAI_BASE_URL"] = f"http://127.0.0.1:{args.fake_port}/v1"
+    os.environ.setdefault("OPENAI_API_KEY", "load-test")
+    
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "benchmarks.fake_openai_server:app",
+         "--port", str(args.fake_port), "--log-level", "warning"],
+        cwd=BACKEND_DIR,
+        env={**os.environ, "FAKE_AI_LATENCY": str(args.latency)}
+    )
+    try:
+        asyncio.run(run(args))
+    finally:
+        server.terminate()
+        server.wait()
+
+if __name__ == "__main__":
+    main()
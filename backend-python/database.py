@@ -58,11 +58,43 @@ async def create_indexes():
         await db.database.summaries.create_index("user_id")
         await db.database.summaries.create_index([("user_id", 1), ("created_at", -1)])
         await db.database.summaries.create_index("type")
+        await db.database.summaries.create_index("job_id", sparse=True)
+        
+        # Summary cache indexes (expire entries after SUMMARY_CACHE_DB_TTL)
+        await db.database.summary_cache.create_index(
+            "created_at",
+            expireAfterSeconds=int(os.getenv("SUMMARY_CACHE_DB_TTL", str(7 * 24 * 3600)))
+        )
+        
+        # PDF page cache indexes (expire entries after PDF_PAGE_CACHE_DB_TTL)
+        await db.database.pdf_pages.create_index([("digest", 1), ("page", 1)])
+        await db.database.pdf_pages.create_index(
+            "created_at",
+            expireAfterSeconds=int(os.getenv("PDF_PAGE_CACHE_DB_TTL", str(30 * 24 * 3600)))
+        )
+        
+        # Jobs indexes
+        await db.database.jobs.create_index([("user_id", 1), ("created_at", -1)])
+        await db.database.jobs.create_index([("status", 1), ("heartbeat_at", 1)])
+        
+        # Uploaded document indexes (one record per user per file digest)
+        await db.database.documents.create_index([("user_id", 1), ("digest", 1)], unique=True)
+        await db.database.documents.create_index([("user_id", 1), ("updated_at", -1)])
+        await db.database.documents.create_index("digest")
+        
+        # Resumable upload indexes (unfinished uploads expire at expires_at)
+        await db.database.upload_sessions.create_index("user_id")
+        await db.database.upload_sessions.create_index("expires_at", expireAfterSeconds=0)
+        
+        # AI usage indexes (one document per user per day)
+        await db.database.ai_usage.create_index([("user_id", 1), ("date", -1)], unique=True)
+        await db.database.ai_usage.create_index("date")
         
         # Quizzes indexes
         await db.database.quizzes.create_index("user_id")
         await db.database.quizzes.create_index([("user_id", 1), ("created_at", -1)])
         await db.database.quizzes.create_index("subject")
+        await db.database.quizzes.create_index("job_id", sparse=True)
         
         # Questions indexes
         await db.database.questions.create_index("quiz_id")
@@ -76,6 +108,7 @@ async def create_indexes():
         # Chat sessions indexes
         await db.database.chat_sessions.create_index("user_id")
         await db.database.chat_sessions.create_index([("user_id", 1), ("updated_at", -1)])
+        await db.database.chat_sessions.create_index([("user_id", 1), ("subject", 1), ("updated_at", -1)])
         
         # Chat messages indexes
         await db.database.chat_messages.create_index("session_id")
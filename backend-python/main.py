@@ -7,13 +7,18 @@ import uvicorn
 import os
 from dotenv import load_dotenv
 
+# Load environment variables before the modules below read their settings
+load_dotenv()
+
 from database import get_database
-from routers import auth, study_tasks, summaries, quizzes, chat, user, progress, upload
+from routers import auth, study_tasks, summaries, quizzes, chat, user, progress, upload, jobs, metrics
 from middleware.auth import get_current_user
+from middleware.upload_limit import UploadSizeLimitMiddleware
 from models.user import User
-
-# Load environment variables
-load_dotenv()
+from services.ai_service import ai_service
+from services.job_queue import job_queue
+from services.telemetry import telemetry
+from services.document_extractor import extraction_pool
 
 # Global database connection
 database = None
@@ -23,8 +28,14 @@ async def lifespan(app: FastAPI):
     # Startup
     global database
     database = await get_database()
+    await job_queue.start(database)
+    await telemetry.start(database)
     yield
     # Shutdown
+    await job_queue.stop()
+    await telemetry.stop()
+    await ai_service.close()
+    extraction_pool.shutdown()
     if database:
         database.client.close()
 
@@ -54,6 +65,13 @@ app.add_middleware(
     allowed_hosts=["*"]  # Configure properly for production
 )
 
+# Reject oversized uploads before the multipart body is parsed
+app.add_middleware(
+    UploadSizeLimitMiddleware,
+    max_body_size=upload.UPLOAD_DEFAULT_REQUEST_SIZE,
+    route_limits=upload.UPLOAD_ROUTE_LIMITS
+)
+
 # Include routers
 app.include_router(auth.router, prefix="/api/auth", tags=["Authentication"])
 app.include_router(study_tasks.router, prefix="/api/study-tasks", tags=["Study Tasks"])
@@ -63,6 +81,8 @@ app.include_router(chat.router, prefix="/api/chat", tags=["Chat"])
 app.include_router(user.router, prefix="/api/user", tags=["User"])
 app.include_router(progress.router, prefix="/api/progress", tags=["Progress"])
 app.include_router(upload.router, prefix="/api/upload", tags=["Upload"])
+app.include_router(jobs.router, prefix="/api/jobs", tags=["Jobs"])
+app.include_router(metrics.router, prefix="/api/metrics", tags=["Metrics"])
 
 @app.get("/")
 async def root():
@@ -77,6 +97,8 @@ async def health_check():
     return {
         "status": "OK",
         "database": "connected" if database else "disconnected",
+        "ai": ai_service.get_stats(),
+        "jobs": job_queue.get_stats(),
         "version": "1.0.0"
     }
 
@@ -1,9 +1,10 @@
-from fastapi import HTTPException, Depends, status
+from fastapi import HTTPException, Depends, Header, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from datetime import datetime, timedelta
 import os
+import secrets
 from typing import Optional
 
 from database import get_database
@@ -13,6 +14,7 @@ from models.user import User
 SECRET_KEY = os.getenv("JWT_SECRET", "your-secret-key-change-in-production")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("JWT_EXPIRES_IN_DAYS", "7")) * 24 * 60
+OPERATOR_API_KEY = os.getenv("OPERATOR_API_KEY", "")  # operator-only endpoints are disabled when unset
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 security = HTTPBearer()
@@ -97,3 +99,10 @@ async def get_current_user_optional(
     except HTTPException:
         return None
 
+async def require_operator(x_operator_key: Optional[str] = Header(None)):
+    """Allow only requests carrying OPERATOR_API_KEY in the X-Operator-Key header"""
+    if not OPERATOR_API_KEY or not x_operator_key or not secrets.compare_digest(x_operator_key, OPERATOR_API_KEY):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Operator credentials required"
+        )
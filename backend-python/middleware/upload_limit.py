@@ -0,0 +1,83 @@
+import json
+import re
+from typing import List, Tuple
+
+class RequestTooLarge(Exception):
+    """Raised from receive() once a streamed body passes the limit"""
+
+class UploadSizeLimitMiddleware:
+    """Reject oversized upload bodies before they are parsed or spooled"""
+    
+    def __init__(self, app, max_body_size: int, route_limits: List[Tuple[str, int]] = (), path_prefix: str = "/api/upload"):
+        self.app = app
+        self.max_body_size = max_body_size  # routes under the prefix without their own limit
+        self.route_limits = [(re.compile(pattern), limit) for pattern, limit in route_limits]  # (path pattern after the prefix, limit)
+        self.path_prefix = path_prefix
+    
+    def limit_for(self, path: str) -> int:
+        """Body size allowed for a path under the prefix (first matching route pattern wins)"""
+        route = path[len(self.path_prefix):]
+        for pattern, limit in self.route_limits:
+            if pattern.fullmatch(route):
+                return limit
+        return self.max_body_size
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not scope["path"].startswith(self.path_prefix):
+            await self.app(scope, receive, send)
+            return
+        
+        max_body_size = self.limit_for(scope["path"])
+        
+        # Declared length: reject without reading the body
+        headers = dict(scope["headers"])
+        content_length = headers.get(b"content-length")
+        if content_length is not None and content_length.isdigit() and int(content_length) > max_body_size:
+            await self._reject(send, max_body_size)
+            return
+        
+        # Chunked or understated bodies: count bytes as they arrive
+        received = 0
+        exceeded = False
+        response_started = False
+        
+        async def limited_receive():
+            nonlocal received, exceeded
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > max_body_size:
+                    exceeded = True
+                    raise RequestTooLarge()
+            return message
+        
+        async def tracked_send(message):
+            nonlocal response_started
+            # The body parser turns our exception into a generic error; answer with 413 instead
+            if exceeded and not response_started:
+                return
+            if message["type"] == "http.response.start":
+                response_started = True
+            await send(message)
+        
+        try:
+            await self.app(scope, limited_receive, tracked_send)
+        except RequestTooLarge:
+            pass
+        
+        if exceeded and not response_started:
+            await self._reject(send, max_body_size)
+    
+    async def _reject(self, send, max_body_size: int):
+        size = f"{max_body_size // 1024 // 1024}MB" if max_body_size >= 1024 * 1024 else f"{max_body_size // 1024}KB"
+        body = json.dumps({
+            "success": False,
+            "error": f"Upload too large. Maximum request size is {size}.",
+            "status_code": 413
+        }).encode()
+        await send({
+            "type": "http.response.start",
+            "status": 413,
+            "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())]
+        })
+        await send({"type": "http.response.body", "body": body})
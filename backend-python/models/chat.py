@@ -12,6 +12,10 @@ class ChatSession(BaseModel):
     user_id: str
     title: str
     subject: str = "general"
+    memory_digest: Optional[str] = None  # rolling summary of turns older than the recent window
+    message_count: int = 0
+    last_message: Optional[str] = None  # preview of the newest message
+    last_message_at: Optional[datetime] = None
     created_at: Optional[datetime] = None
     updated_at: Optional[datetime] = None
 
@@ -23,6 +27,7 @@ class ChatMessage(BaseModel):
     subject: Optional[str] = None
     helpful: Optional[bool] = None
     attachments: List[str] = []  # URLs to uploaded files
+    token_count: Optional[int] = None  # computed once at insert time
     created_at: Optional[datetime] = None
 
 class ChatSessionCreate(BaseModel):
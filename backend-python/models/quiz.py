@@ -49,6 +49,8 @@ class QuizCreate(BaseModel):
     num_questions: int
     question_types: List[QuestionType]
     content: Optional[str] = None
+    document_id: Optional[str] = None  # uploaded document to use as content
+    background: bool = False  # queue generation and return a job to poll
 
 class QuizResponse(BaseModel):
     id: str
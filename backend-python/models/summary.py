@@ -22,10 +22,13 @@ class Summary(BaseModel):
     updated_at: Optional[datetime] = None
 
 class SummaryCreate(BaseModel):
-    original_text: str
+    original_text: Optional[str] = None
+    document_id: Optional[str] = None  # uploaded document to summarize instead of original_text
     type: SummaryType = SummaryType.BULLET
     language: str = "english"
     title: Optional[str] = None
+    instant: bool = False  # local extractive summary, no model call
+    background: bool = False  # queue generation and return a job to poll
 
 class SummaryUpdate(BaseModel):
     title: Optional[str] = None
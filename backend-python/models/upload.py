@@ -0,0 +1,7 @@
+from pydantic import BaseModel
+from typing import Optional
+
+class UploadSessionCreate(BaseModel):
+    filename: str
+    size: int  # total file size in bytes
+    sha256: Optional[str] = None  # checked against the assembled file on completion
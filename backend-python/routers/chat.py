@@ -1,7 +1,11 @@
-from fastapi import APIRouter, HTTPException, Depends, status, Query
+from fastapi import APIRouter, HTTPException, Depends, status, Query, BackgroundTasks
+from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
+from contextlib import aclosing
 from datetime import datetime
 from bson import ObjectId
 from typing import Optional, List
+import asyncio
 import logging
 
 from database import get_database
@@ -9,6 +13,13 @@ from models.chat import ChatSession, ChatMessage, ChatSessionCreate, ChatMessage
 from models.user import User
 from middleware.auth import get_current_user
 from services.ai_service import ai_service
+from services.token_counter import count_tokens
+from services.chat_memory import get_conversation_history, update_session_memory
+from services.chat_store import insert_message
+from services.semantic_cache import semantic_cache
+from services.retrieval import retrieval_index
+from services.streaming import format_sse
+from services.telemetry import tag_request
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
@@ -32,27 +43,15 @@ async def get_chat_sessions(
         # Calculate skip
         skip = (page - 1) * limit
         
-        # Get sessions with last message
-        pipeline = [
-            {"$match": query},
-            {"$lookup": {
-                "from": "chat_messages",
-                "localField": "_id",
-                "foreignField": "session_id",
-                "as": "messages"
-            }},
-            {"$addFields": {
-                "last_message": {"$arrayElemAt": ["$messages", -1]},
-                "message_count": {"$size": "$messages"}
-            }},
-            {"$sort": {"updated_at": -1}},
-            {"$skip": skip},
-            {"$limit": limit}
-        ]
-        
+        # Message count and last-message preview are kept on each session as messages are stored
         sessions = []
-        async for session_doc in db.database.chat_sessions.aggregate(pipeline):
-            last_message = session_doc.get("last_message", {})
+        async for session_doc in db.database.chat_sessions.find(
+            query,
+            {
+                "user_id": 1, "title": 1, "subject": 1, "created_at": 1, "updated_at": 1,
+                "last_message": 1, "last_message_at": 1, "message_count": 1
+            }
+        ).sort("updated_at", -1).skip(skip).limit(limit):
             sessions.append({
                 "id": str(session_doc["_id"]),
                 "user_id": session_doc["user_id"],
@@ -60,9 +59,9 @@ async def get_chat_sessions(
                 "subject": session_doc["subject"],
                 "created_at": session_doc["created_at"],
                 "updated_at": session_doc["updated_at"],
-                "last_message": last_message.get("content", "No messages yet"),
-                "last_message_time": last_message.get("created_at", session_doc["created_at"]),
-                "message_count": session_doc["message_count"]
+                "last_message": session_doc.get("last_message") or "No messages yet",
+                "last_message_time": session_doc.get("last_message_at") or session_doc["created_at"],
+                "message_count": session_doc.get("message_count", 0)
             })
         
         # Get total count
@@ -160,6 +159,9 @@ async def create_chat_session(
             "user_id": current_user.id,
             "title": session_data.title,
             "subject": session_data.subject,
+            "message_count": 0,
+            "last_message": None,
+            "last_message_at": None,
             "created_at": datetime.utcnow(),
             "updated_at": datetime.utcnow()
         }
@@ -193,6 +195,7 @@ async def create_chat_session(
 async def send_message(
     session_id: str,
     message_data: ChatMessageCreate,
+    background_tasks: BackgroundTasks,
     current_user: User = Depends(get_current_user),
     db = Depends(get_database)
 ):
@@ -210,6 +213,14 @@ async def send_message(
                 detail="Chat session not found"
             )
         
+        tag_request(current_user.id, session_doc["subject"])
+        
+        # Get conversation history for context, before this message is stored, and passages from the user's documents
+        recent_messages, context_passages = await asyncio.gather(
+            get_conversation_history(db, session_doc),
+            retrieval_index.search(current_user.id, message_data.content)
+        )
+        
         # Create user message
         user_message_doc = {
             "session_id": session_id,
@@ -217,12 +228,13 @@ async def send_message(
             "content": message_data.content,
             "subject": message_data.subject or session_doc["subject"],
             "attachments": message_data.attachments,
+            "token_count": count_tokens(message_data.content),
             "created_at": datetime.utcnow()
         }
         
-        user_result = await db.database.chat_messages.insert_one(user_message_doc)
+        user_message_id = await insert_message(db, user_message_doc)
         user_message = {
-            "id": str(user_result.inserted_id),
+            "id": str(user_message_id),
             "session_id": session_id,
             "type": MessageType.USER.value,
             "content": message_data.content,
@@ -233,23 +245,12 @@ async def send_message(
         
         # Generate AI response
         try:
-            # Get recent conversation history for context
-            recent_messages = []
-            async for msg_doc in db.database.chat_messages.find({
-                "session_id": session_id
-            }).sort("created_at", -1).limit(10):
-                recent_messages.append({
-                    "role": "user" if msg_doc["type"] == "USER" else "assistant",
-                    "content": msg_doc["content"]
-                })
-            
-            # Reverse to get chronological order
-            recent_messages.reverse()
-            
             ai_response = await ai_service.generate_chat_response(
                 message_data.content,
                 session_doc["subject"],
-                recent_messages
+                recent_messages,
+                session_doc.get("memory_digest"),
+                context_passages
             )
             
             # Create bot message
@@ -258,12 +259,13 @@ async def send_message(
                 "type": MessageType.BOT.value,
                 "content": ai_response,
                 "subject": session_doc["subject"],
+                "token_count": count_tokens(ai_response),
                 "created_at": datetime.utcnow()
             }
             
-            bot_result = await db.database.chat_messages.insert_one(bot_message_doc)
+            bot_message_id = await insert_message(db, bot_message_doc)
             bot_message = {
-                "id": str(bot_result.inserted_id),
+                "id": str(bot_message_id),
                 "session_id": session_id,
                 "type": MessageType.BOT.value,
                 "content": ai_response,
@@ -280,12 +282,13 @@ async def send_message(
                 "type": MessageType.BOT.value,
                 "content": "I apologize, but I'm having trouble processing your request right now. Please try again later.",
                 "subject": session_doc["subject"],
+                "token_count": count_tokens("I apologize, but I'm having trouble processing your request right now. Please try again later."),
                 "created_at": datetime.utcnow()
             }
             
-            bot_result = await db.database.chat_messages.insert_one(bot_message_doc)
+            bot_message_id = await insert_message(db, bot_message_doc)
             bot_message = {
-                "id": str(bot_result.inserted_id),
+                "id": str(bot_message_id),
                 "session_id": session_id,
                 "type": MessageType.BOT.value,
                 "content": "I apologize, but I'm having trouble processing your request right now. Please try again later.",
@@ -293,11 +296,8 @@ async def send_message(
                 "created_at": datetime.utcnow()
             }
         
-        # Update session timestamp
-        await db.database.chat_sessions.update_one(
-            {"_id": ObjectId(session_id)},
-            {"$set": {"updated_at": datetime.utcnow()}}
-        )
+        # Fold older turns into the session memory after the response is sent
+        background_tasks.add_task(update_session_memory, db, session_id)
         
         return {
             "success": True,
@@ -317,6 +317,124 @@ async def send_message(
             detail="Internal server error"
         )
 
+@router.post("/sessions/{session_id}/messages/stream")
+async def send_message_stream(
+    session_id: str,
+    message_data: ChatMessageCreate,
+    current_user: User = Depends(get_current_user),
+    db = Depends(get_database)
+):
+    """Send a message to a chat session and stream the reply as server-sent events"""
+    try:
+        # Verify session exists and belongs to user
+        session_doc = await db.database.chat_sessions.find_one({
+            "_id": ObjectId(session_id),
+            "user_id": current_user.id
+        })
+        
+        if not session_doc:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Chat session not found"
+            )
+        
+        tag_request(current_user.id, session_doc["subject"])
+        
+        # Get conversation history for context, before this message is stored, and passages from the user's documents
+        recent_messages, context_passages = await asyncio.gather(
+            get_conversation_history(db, session_doc),
+            retrieval_index.search(current_user.id, message_data.content)
+        )
+        
+        # Create user message
+        user_message_doc = {
+            "session_id": session_id,
+            "type": MessageType.USER.value,
+            "content": message_data.content,
+            "subject": message_data.subject or session_doc["subject"],
+            "attachments": message_data.attachments,
+            "token_count": count_tokens(message_data.content),
+            "created_at": datetime.utcnow()
+        }
+        
+        user_message_id = await insert_message(db, user_message_doc)
+        user_message = {
+            "id": str(user_message_id),
+            "session_id": session_id,
+            "type": MessageType.USER.value,
+            "content": message_data.content,
+            "subject": user_message_doc["subject"],
+            "attachments": message_data.attachments,
+            "created_at": user_message_doc["created_at"]
+        }
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Send message stream error: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Internal server error"
+        )
+    
+    async def event_stream():
+        tokens = []
+        yield format_sse("userMessage", user_message)
+        
+        try:
+            async with aclosing(ai_service.stream_chat_response(
+                message_data.content,
+                session_doc["subject"],
+                recent_messages,
+                session_doc.get("memory_digest"),
+                context_passages
+            )) as reply:
+                async for token in reply:
+                    tokens.append(token)
+                    yield format_sse("token", {"content": token})
+        except BaseException:
+            # Client disconnected mid-stream: keep whatever was generated so far.
+            # Shielded so the save completes even though this task is being cancelled.
+            if tokens:
+                await asyncio.shield(save_bot_message(db, session_id, session_doc["subject"], "".join(tokens)))
+            raise
+        
+        bot_message = await save_bot_message(db, session_id, session_doc["subject"], "".join(tokens))
+        yield format_sse("done", {"botMessage": bot_message})
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no"  # Disable proxy buffering so tokens flush immediately
+        },
+        # Fold older turns into the session memory once the stream has finished
+        background=BackgroundTask(update_session_memory, db, session_id)
+    )
+
+async def save_bot_message(db, session_id: str, subject: str, content: str) -> dict:
+    """Persist a bot reply"""
+    bot_message_doc = {
+        "session_id": session_id,
+        "type": MessageType.BOT.value,
+        "content": content,
+        "subject": subject,
+        "token_count": count_tokens(content),
+        "created_at": datetime.utcnow()
+    }
+    
+    bot_message_id = await insert_message(db, bot_message_doc)
+    
+    return {
+        "id": str(bot_message_id),
+        "session_id": session_id,
+        "type": MessageType.BOT.value,
+        "content": content,
+        "subject": subject,
+        "created_at": bot_message_doc["created_at"]
+    }
+
 @router.patch("/messages/{message_id}/rate", response_model=dict)
 async def rate_message(
     message_id: str,
@@ -399,6 +517,16 @@ async def delete_chat_session(
             detail="Internal server error"
         )
 
+@router.get("/cache/stats", response_model=dict)
+async def get_chat_cache_stats(
+    current_user: User = Depends(get_current_user)
+):
+    """Get semantic answer cache hit/miss counters"""
+    return {
+        "success": True,
+        "data": semantic_cache.get_stats()
+    }
+
 @router.get("/stats/overview", response_model=dict)
 async def get_chat_stats(
     current_user: User = Depends(get_current_user),
@@ -438,16 +566,12 @@ async def get_chat_stats(
         async for session_doc in db.database.chat_sessions.find({
             "user_id": current_user.id
         }).sort("updated_at", -1).limit(5):
-            message_count = await db.database.chat_messages.count_documents({
-                "session_id": str(session_doc["_id"])
-            })
-            
             recent_sessions.append({
                 "id": str(session_doc["_id"]),
                 "title": session_doc["title"],
                 "subject": session_doc["subject"],
                 "updated_at": session_doc["updated_at"],
-                "message_count": message_count
+                "message_count": session_doc.get("message_count", 0)
             })
         
         return {
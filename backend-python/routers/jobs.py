@@ -0,0 +1,79 @@
+from fastapi import APIRouter, HTTPException, Depends, status, Query
+from typing import Optional
+import logging
+
+from database import get_database
+from models.user import User
+from middleware.auth import get_current_user
+from services.job_queue import job_queue
+
+logger = logging.getLogger(__name__)
+router = APIRouter()
+
+@router.get("/", response_model=dict)
+async def get_jobs(
+    limit: int = Query(20, ge=1, le=100),
+    job_status: Optional[str] = Query(None, alias="status"),
+    current_user: User = Depends(get_current_user),
+    db = Depends(get_database)
+):
+    """Get the user's most recent background jobs"""
+    try:
+        query = {"user_id": current_user.id}
+        if job_status:
+            query["status"] = job_status
+        
+        jobs = []
+        async for job_doc in db.database.jobs.find(query, {"payload": 0, "result": 0}).sort("created_at", -1).limit(limit):
+            jobs.append(job_queue.format(job_doc))
+        
+        return {
+            "success": True,
+            "data": {"jobs": jobs}
+        }
+        
+    except Exception as e:
+        logger.error(f"Get jobs error: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Internal server error"
+        )
+
+@router.get("/stats", response_model=dict)
+async def get_job_stats(
+    current_user: User = Depends(get_current_user)
+):
+    """Get job worker pool counters"""
+    return {
+        "success": True,
+        "data": job_queue.get_stats()
+    }
+
+@router.get("/{job_id}", response_model=dict)
+async def get_job(
+    job_id: str,
+    current_user: User = Depends(get_current_user)
+):
+    """Get the status, progress and result of a background job"""
+    try:
+        job_doc = await job_queue.get(job_id, current_user.id)
+        
+        if not job_doc:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Job not found"
+            )
+        
+        return {
+            "success": True,
+            "data": {"job": job_queue.format(job_doc)}
+        }
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Get job error: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Internal server error"
+        )
@@ -0,0 +1,80 @@
+from fastapi import APIRouter, HTTPException, Depends, status, Query
+from datetime import datetime, timedelta
+import logging
+
+from database import get_database
+from middleware.auth import require_operator
+from services.ai_service import ai_service
+from services.telemetry import telemetry
+
+logger = logging.getLogger(__name__)
+router = APIRouter()
+
+@router.get("/ai", response_model=dict, dependencies=[Depends(require_operator)])
+async def get_ai_metrics():
+    """Get model call usage and latency aggregated by route, model and subject"""
+    return {
+        "success": True,
+        "data": {
+            **telemetry.get_stats(),
+            "governor": ai_service.get_stats()
+        }
+    }
+
+@router.get("/ai/users", response_model=dict, dependencies=[Depends(require_operator)])
+async def get_ai_usage_by_user(
+    days: int = Query(7, ge=1, le=90),
+    limit: int = Query(10, ge=1, le=100),
+    sort_by: str = Query("tokens", pattern="^(tokens|calls|latency)$"),
+    db = Depends(get_database)
+):
+    """Get the users with the highest model usage over the last days"""
+    try:
+        since = (datetime.utcnow() - timedelta(days=days - 1)).strftime("%Y-%m-%d")
+        sort_field = {"tokens": "total_tokens", "calls": "calls", "latency": "latency_ms"}[sort_by]
+        
+        pipeline = [
+            {"$match": {"date": {"$gte": since}}},
+            {"$group": {
+                "_id": "$user_id",
+                "calls": {"$sum": "$calls"},
+                "prompt_tokens": {"$sum": "$prompt_tokens"},
+                "completion_tokens": {"$sum": "$completion_tokens"},
+                "latency_ms": {"$sum": "$latency_ms"},
+                "errors": {"$sum": "$errors"},
+                "fallbacks": {"$sum": "$fallback"},
+                "cache_hits": {"$sum": "$cache_hit"}
+            }},
+            {"$addFields": {"total_tokens": {"$add": ["$prompt_tokens", "$completion_tokens"]}}},
+            {"$sort": {sort_field: -1}},
+            {"$limit": limit}
+        ]
+        
+        users = []
+        async for usage_doc in db.database.ai_usage.aggregate(pipeline):
+            users.append({
+                "user_id": usage_doc["_id"],
+                "calls": usage_doc["calls"],
+                "prompt_tokens": usage_doc["prompt_tokens"],
+                "completion_tokens": usage_doc["completion_tokens"],
+                "total_tokens": usage_doc["total_tokens"],
+                "latency_ms": usage_doc["latency_ms"],
+                "errors": usage_doc["errors"],
+                "fallbacks": usage_doc["fallbacks"],
+                "cache_hits": usage_doc["cache_hits"]
+            })
+        
+        return {
+            "success": True,
+            "data": {
+                "since": since,
+                "users": users
+            }
+        }
+        
+    except Exception as e:
+        logger.error(f"Get AI usage by user error: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Internal server error"
+        )
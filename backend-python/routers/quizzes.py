@@ -1,7 +1,10 @@
 from fastapi import APIRouter, HTTPException, Depends, status, Query
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
+from contextlib import aclosing
 from datetime import datetime
 from bson import ObjectId
-from typing import Optional, List
+from typing import Optional, List, AsyncIterator
 import logging
 
 from database import get_database
@@ -9,6 +12,10 @@ from models.quiz import Quiz, QuizCreate, QuizResponse, QuizSubmission, QuizResu
 from models.user import User
 from middleware.auth import get_current_user
 from services.ai_service import ai_service
+from services.job_queue import job_queue
+from services.document_store import document_store
+from services.streaming import format_sse
+from services.telemetry import tag_request
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
@@ -172,84 +179,35 @@ async def create_quiz(
 ):
     """Create a new quiz with AI-generated questions"""
     try:
-        # Generate AI quiz questions
-        generated_questions = await ai_service.generate_quiz_questions(
-            quiz_data.content or f"General knowledge about {quiz_data.subject}{f' - {quiz_data.topic}' if quiz_data.topic else ''}",
-            quiz_data.subject,
-            quiz_data.topic or quiz_data.subject,
-            quiz_data.num_questions,
-            quiz_data.difficulty,
-            quiz_data.question_types
-        )
+        tag_request(current_user.id, quiz_data.subject)
         
-        # Create quiz document
-        quiz_doc = {
-            "user_id": current_user.id,
-            "title": quiz_data.title,
-            "subject": quiz_data.subject,
-            "topic": quiz_data.topic,
-            "description": quiz_data.description,
-            "time_limit": quiz_data.time_limit,
-            "difficulty": quiz_data.difficulty.value,
-            "is_active": True,
-            "created_at": datetime.utcnow(),
-            "updated_at": datetime.utcnow()
-        }
-        
-        # Insert quiz
-        quiz_result = await db.database.quizzes.insert_one(quiz_doc)
-        quiz_id = str(quiz_result.inserted_id)
+        if quiz_data.document_id and not await document_store.get(db, current_user.id, quiz_data.document_id):
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Document not found"
+            )
         
-        # Create questions
-        questions = []
-        for i, q in enumerate(generated_questions):
-            question_doc = {
-                "quiz_id": quiz_id,
-                "type": q["type"].upper(),
-                "question": q["question"],
-                "options": q.get("options", []),
-                "correct_answer": str(q["correctAnswer"]),
-                "explanation": q["explanation"],
-                "difficulty": q["difficulty"].upper(),
-                "topic": q.get("topic", quiz_data.topic),
-                "order": i + 1,
-                "created_at": datetime.utcnow()
+        # Hand generation to the job queue and return the job to poll
+        if quiz_data.background:
+            job_doc = await job_queue.submit(
+                "quiz",
+                current_user.id,
+                jsonable_encoder(quiz_data, exclude={"background"})
+            )
+            return {
+                "success": True,
+                "message": "Quiz generation queued",
+                "data": {"job": job_queue.format(job_doc)}
             }
-            
-            question_result = await db.database.questions.insert_one(question_doc)
-            questions.append({
-                "id": str(question_result.inserted_id),
-                "type": question_doc["type"],
-                "question": question_doc["question"],
-                "options": question_doc["options"],
-                "correct_answer": question_doc["correct_answer"],
-                "explanation": question_doc["explanation"],
-                "difficulty": question_doc["difficulty"],
-                "topic": question_doc["topic"],
-                "order": question_doc["order"]
-            })
         
         return {
             "success": True,
             "message": "Quiz created successfully",
-            "data": {
-                "quiz": {
-                    "id": quiz_id,
-                    "user_id": current_user.id,
-                    "title": quiz_data.title,
-                    "subject": quiz_data.subject,
-                    "topic": quiz_data.topic,
-                    "description": quiz_data.description,
-                    "time_limit": quiz_data.time_limit,
-                    "difficulty": quiz_data.difficulty.value,
-                    "is_active": True,
-                    "created_at": datetime.utcnow(),
-                    "updated_at": datetime.utcnow()
-                },
-                "questions": questions
-            }
+            "data": await generate_quiz(db, current_user.id, quiz_data)
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Create quiz error: {e}")
         raise HTTPException(
@@ -257,6 +215,45 @@ async def create_quiz(
             detail="Failed to create quiz"
         )
 
+@router.post("/stream")
+async def create_quiz_stream(
+    quiz_data: QuizCreate,
+    current_user: User = Depends(get_current_user),
+    db = Depends(get_database)
+):
+    """Create a quiz and stream each question as server-sent events once it is stored"""
+    tag_request(current_user.id, quiz_data.subject)
+    
+    if quiz_data.document_id and not await document_store.get(db, current_user.id, quiz_data.document_id):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Document not found"
+        )
+    
+    async def event_stream():
+        question_count = 0
+        try:
+            async with aclosing(stream_quiz(db, current_user.id, quiz_data)) as events:
+                async for event, data in events:
+                    if event == "question":
+                        question_count += 1
+                    yield format_sse(event, {event: data})
+            
+            yield format_sse("done", {"questionCount": question_count})
+            
+        except Exception as e:
+            logger.error(f"Create quiz stream error: {e}")
+            yield format_sse("error", {"detail": "Failed to create quiz"})
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no"  # Disable proxy buffering so questions flush immediately
+        }
+    )
+
 @router.post("/{quiz_id}/submit", response_model=dict)
 async def submit_quiz(
     quiz_id: str,
@@ -509,3 +506,117 @@ async def update_user_progress(user_id: str, score: int, db):
     except Exception as e:
         logger.error(f"Update user progress error: {e}")
 
+async def generate_quiz(db, user_id: str, quiz_data: QuizCreate, report_progress=None, job_id: str = None) -> dict:
+    """Generate quiz questions and store the quiz; returns the response data"""
+    quiz = None
+    questions = []
+    async with aclosing(stream_quiz(db, user_id, quiz_data, job_id)) as events:
+        async for event, data in events:
+            if event == "quiz":
+                quiz = data
+            else:
+                questions.append(data)
+                if report_progress:
+                    await report_progress(round(min(1.0, len(questions) / quiz_data.num_questions), 2), "generating")
+    
+    return {
+        "quiz": quiz,
+        "questions": questions
+    }
+
+async def stream_quiz(db, user_id: str, quiz_data: QuizCreate, job_id: str = None) -> AsyncIterator[tuple]:
+    """Create the quiz, then store and yield each question as soon as it is generated"""
+    # Uploaded documents are read from the document store rather than the request
+    content = quiz_data.content
+    if not content and quiz_data.document_id:
+        content = await document_store.load_text(db, user_id, quiz_data.document_id)
+        if content is None:
+            raise ValueError(f"Document {quiz_data.document_id} not found")
+    
+    # Create quiz document
+    quiz_doc = {
+        "user_id": user_id,
+        "title": quiz_data.title,
+        "subject": quiz_data.subject,
+        "topic": quiz_data.topic,
+        "description": quiz_data.description,
+        "time_limit": quiz_data.time_limit,
+        "difficulty": quiz_data.difficulty.value,
+        "is_active": True,
+        "created_at": datetime.utcnow(),
+        "updated_at": datetime.utcnow()
+    }
+    if job_id:
+        quiz_doc["job_id"] = job_id
+    
+    # Insert quiz
+    quiz_result = await db.database.quizzes.insert_one(quiz_doc)
+    quiz_id = str(quiz_result.inserted_id)
+    
+    yield "quiz", {
+        "id": quiz_id,
+        "user_id": user_id,
+        "title": quiz_data.title,
+        "subject": quiz_data.subject,
+        "topic": quiz_data.topic,
+        "description": quiz_data.description,
+        "time_limit": quiz_data.time_limit,
+        "difficulty": quiz_data.difficulty.value,
+        "is_active": True,
+        "created_at": quiz_doc["created_at"],
+        "updated_at": quiz_doc["updated_at"]
+    }
+    
+    # Generate AI quiz questions, storing each one as it arrives
+    generated_questions = ai_service.stream_quiz_questions(
+        content or f"General knowledge about {quiz_data.subject}{f' - {quiz_data.topic}' if quiz_data.topic else ''}",
+        quiz_data.subject,
+        quiz_data.topic or quiz_data.subject,
+        quiz_data.num_questions,
+        quiz_data.difficulty,
+        quiz_data.question_types
+    )
+    
+    async with aclosing(generated_questions) as generated:
+        i = 0
+        async for q in generated:
+            question_doc = {
+                "quiz_id": quiz_id,
+                "type": q["type"].upper(),
+                "question": q["question"],
+                "options": q.get("options", []),
+                "correct_answer": str(q["correctAnswer"]),
+                "explanation": q["explanation"],
+                "difficulty": q["difficulty"].upper(),
+                "topic": q.get("topic", quiz_data.topic),
+                "order": i + 1,
+                "created_at": datetime.utcnow()
+            }
+            
+            question_result = await db.database.questions.insert_one(question_doc)
+            i += 1
+            yield "question", {
+                "id": str(question_result.inserted_id),
+                "type": question_doc["type"],
+                "question": question_doc["question"],
+                "options": question_doc["options"],
+                "correct_answer": question_doc["correct_answer"],
+                "explanation": question_doc["explanation"],
+                "difficulty": question_doc["difficulty"],
+                "topic": question_doc["topic"],
+                "order": question_doc["order"]
+            }
+
+async def run_quiz_job(db, user_id: str, payload: dict, report_progress, job_id: str) -> dict:
+    """Job queue handler for background quiz generation"""
+    quiz_data = QuizCreate(**payload)
+    tag_request(user_id, quiz_data.subject)
+    
+    # A previous run of this job may have stored the quiz and part of its questions
+    async for quiz_doc in db.database.quizzes.find({"job_id": job_id, "user_id": user_id}, {"_id": 1}):
+        await db.database.questions.delete_many({"quiz_id": str(quiz_doc["_id"])})
+        await db.database.quizzes.delete_one({"_id": quiz_doc["_id"]})
+    
+    return await generate_quiz(db, user_id, quiz_data, report_progress, job_id)
+
+job_queue.register("quiz", run_quiz_job)
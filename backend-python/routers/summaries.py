@@ -1,4 +1,5 @@
 from fastapi import APIRouter, HTTPException, Depends, status, Query
+from fastapi.encoders import jsonable_encoder
 from datetime import datetime
 from bson import ObjectId
 from typing import Optional
@@ -9,6 +10,10 @@ from models.summary import Summary, SummaryCreate, SummaryUpdate, SummaryRespons
 from models.user import User
 from middleware.auth import get_current_user
 from services.ai_service import ai_service
+from services.summary_cache import summary_cache
+from services.job_queue import job_queue
+from services.document_store import document_store
+from services.telemetry import tag_request
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
@@ -77,6 +82,16 @@ async def get_summaries(
             detail="Internal server error"
         )
 
+@router.get("/cache/stats", response_model=dict)
+async def get_summary_cache_stats(
+    current_user: User = Depends(get_current_user)
+):
+    """Get summary cache hit/miss counters"""
+    return {
+        "success": True,
+        "data": summary_cache.get_stats()
+    }
+
 @router.get("/{summary_id}", response_model=dict)
 async def get_summary(
     summary_id: str,
@@ -132,49 +147,34 @@ async def create_summary(
 ):
     """Create a new summary"""
     try:
-        # Generate AI summary
-        summary_text = await ai_service.generate_summary(
-            summary_data.original_text,
-            summary_data.type,
-            summary_data.language
-        )
+        tag_request(current_user.id)
         
-        # Calculate lengths
-        original_length = len(summary_data.original_text.split())
-        summary_length = len(summary_text.split())
+        if not summary_data.original_text and not summary_data.document_id:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Either original_text or document_id is required"
+            )
         
-        # Create summary document
-        summary_doc = {
-            "user_id": current_user.id,
-            "title": summary_data.title or f"Summary {datetime.utcnow().strftime('%Y%m%d_%H%M%S')}",
-            "original_text": summary_data.original_text,
-            "summary_text": summary_text,
-            "original_length": original_length,
-            "summary_length": summary_length,
-            "language": summary_data.language,
-            "type": summary_data.type.value,
-            "created_at": datetime.utcnow(),
-            "updated_at": datetime.utcnow()
-        }
+        if not summary_data.original_text and not await document_store.get(db, current_user.id, summary_data.document_id):
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Document not found"
+            )
         
-        result = await db.database.summaries.insert_one(summary_doc)
-        summary_id = str(result.inserted_id)
+        # Hand generation to the job queue and return the job to poll
+        if summary_data.background:
+            job_doc = await job_queue.submit(
+                "summary",
+                current_user.id,
+                jsonable_encoder(summary_data, exclude={"background"})
+            )
+            return {
+                "success": True,
+                "message": "Summary generation queued",
+                "data": {"job": job_queue.format(job_doc)}
+            }
         
-        # Get the created summary
-        summary_doc = await db.database.summaries.find_one({"_id": ObjectId(summary_id)})
-        summary = SummaryResponse(
-            id=str(summary_doc["_id"]),
-            user_id=summary_doc["user_id"],
-            title=summary_doc["title"],
-            original_text=summary_doc["original_text"],
-            summary_text=summary_doc["summary_text"],
-            original_length=summary_doc["original_length"],
-            summary_length=summary_doc["summary_length"],
-            language=summary_doc["language"],
-            type=summary_doc["type"],
-            created_at=summary_doc["created_at"],
-            updated_at=summary_doc["updated_at"]
-        )
+        summary = await generate_and_save_summary(db, current_user.id, summary_data)
         
         return {
             "success": True,
@@ -182,6 +182,8 @@ async def create_summary(
             "data": {"summary": summary}
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Create summary error: {e}")
         raise HTTPException(
@@ -360,3 +362,85 @@ async def get_summary_stats(
             detail="Internal server error"
         )
 
+async def generate_and_save_summary(db, user_id: str, summary_data: SummaryCreate, report_progress=None, job_id: str = None) -> SummaryResponse:
+    """Generate a summary and store it"""
+    # A previous run of this job may already have stored the summary
+    existing = await db.database.summaries.find_one({"job_id": job_id, "user_id": user_id}, {"_id": 1}) if job_id else None
+    if existing:
+        summary_id = str(existing["_id"])
+    else:
+        # Uploaded documents are read from the document store rather than the request
+        original_text = summary_data.original_text
+        if not original_text:
+            original_text = await document_store.load_text(db, user_id, summary_data.document_id)
+            if original_text is None:
+                raise ValueError(f"Document {summary_data.document_id} not found")
+        
+        if report_progress:
+            await report_progress(0.1, "generating")
+        
+        # Generate summary: local extractive for instant requests, AI otherwise
+        if summary_data.instant:
+            summary_text = await ai_service.generate_instant_summary(
+                original_text,
+                summary_data.type,
+                summary_data.language
+            )
+        else:
+            summary_text = await ai_service.generate_summary(
+                original_text,
+                summary_data.type,
+                summary_data.language
+            )
+        
+        if report_progress:
+            await report_progress(0.8, "saving")
+        
+        # Calculate lengths
+        original_length = len(original_text.split())
+        summary_length = len(summary_text.split())
+        
+        # Create summary document
+        summary_doc = {
+            "user_id": user_id,
+            "title": summary_data.title or f"Summary {datetime.utcnow().strftime('%Y%m%d_%H%M%S')}",
+            "original_text": original_text,
+            "summary_text": summary_text,
+            "original_length": original_length,
+            "summary_length": summary_length,
+            "language": summary_data.language,
+            "type": summary_data.type.value,
+            "created_at": datetime.utcnow(),
+            "updated_at": datetime.utcnow()
+        }
+        if job_id:
+            summary_doc["job_id"] = job_id
+        
+        result = await db.database.summaries.insert_one(summary_doc)
+        summary_id = str(result.inserted_id)
+    
+    # Get the created summary
+    summary_doc = await db.database.summaries.find_one({"_id": ObjectId(summary_id)})
+    summary = SummaryResponse(
+        id=str(summary_doc["_id"]),
+        user_id=summary_doc["user_id"],
+        title=summary_doc["title"],
+        original_text=summary_doc["original_text"],
+        summary_text=summary_doc["summary_text"],
+        original_length=summary_doc["original_length"],
+        summary_length=summary_doc["summary_length"],
+        language=summary_doc["language"],
+        type=summary_doc["type"],
+        created_at=summary_doc["created_at"],
+        updated_at=summary_doc["updated_at"]
+    )
+    
+    return summary
+
+async def run_summary_job(db, user_id: str, payload: dict, report_progress, job_id: str) -> dict:
+    """Job queue handler for background summary generation"""
+    tag_request(user_id)
+    summary = await generate_and_save_summary(db, user_id, SummaryCreate(**payload), report_progress, job_id)
+    return {"summary": summary.model_dump()}
+
+job_queue.register("summary", run_summary_job)
@@ -1,18 +1,25 @@
-from fastapi import APIRouter, HTTPException, Depends, status, UploadFile, File, Form
-from fastapi.responses import JSONResponse
+from fastapi import APIRouter, HTTPException, Depends, status, UploadFile, File, Form, Query, Header, Request
+from fastapi.responses import JSONResponse, StreamingResponse
 import aiofiles
+import asyncio
+import codecs
+import hashlib
 import os
 import uuid
-from typing import List
+from typing import List, Union, Optional, AsyncIterator
+from contextlib import asynccontextmanager
 import logging
-import PyPDF2
-import io
-from docx import Document
-import tempfile
 
 from database import get_database
 from models.user import User
+from models.upload import UploadSessionCreate
 from middleware.auth import get_current_user
+from services.page_cache import page_cache
+from services.document_store import document_store
+from services.retrieval import retrieval_index
+from services.resumable_upload import resumable_uploads, ChunkRejected, UploadStatus, RESUMABLE_CHUNK_SIZE, RESUMABLE_MAX_FILE_SIZE
+from services.streaming import format_ndjson, text_blocks
+from services.document_extractor import extraction_pool, extract_pdf_document, stream_pdf_document, extract_docx, DocumentTooLarge, ExtractionTimeout
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
@@ -21,6 +28,23 @@ router = APIRouter()
 UPLOAD_DIR = os.getenv("UPLOAD_PATH", "./uploads")
 MAX_FILE_SIZE = int(os.getenv("MAX_FILE_SIZE", "10485760"))  # 10MB
 ALLOWED_EXTENSIONS = {".pdf", ".docx", ".doc", ".txt"}
+UPLOAD_CONCURRENCY = int(os.getenv("UPLOAD_CONCURRENCY", "5"))  # files of one batch processed at once
+UPLOAD_CHUNK_SIZE = int(os.getenv("UPLOAD_CHUNK_SIZE", "1048576"))  # bytes read from an upload at a time
+UPLOAD_SPOOL_THRESHOLD = int(os.getenv("UPLOAD_SPOOL_THRESHOLD", "1048576"))  # larger files are parsed from disk
+MAX_TEXT_CHARS = MAX_FILE_SIZE  # longest .txt accepted; what a /file upload can hold, applied to resumable sessions too
+EXTRACTION_STREAM_BLOCK_CHARS = int(os.getenv("EXTRACTION_STREAM_BLOCK_CHARS", "4000"))  # text per streamed NDJSON block
+MAX_FILES_PER_UPLOAD = 5
+MULTIPART_FRAMING_SIZE = 64 * 1024  # allowance for multipart boundaries and part headers
+MAX_FILE_REQUEST_SIZE = MAX_FILE_SIZE + MULTIPART_FRAMING_SIZE
+MAX_UPLOAD_REQUEST_SIZE = MAX_FILE_SIZE * MAX_FILES_PER_UPLOAD + MULTIPART_FRAMING_SIZE
+
+# Request body limits enforced by UploadSizeLimitMiddleware, by path under /api/upload
+UPLOAD_ROUTE_LIMITS = [
+    (r"/file(/stream)?", MAX_FILE_REQUEST_SIZE),
+    (r"/files", MAX_UPLOAD_REQUEST_SIZE),
+    (r"/sessions/[^/]+/chunks/[^/]+", RESUMABLE_CHUNK_SIZE)
+]
+UPLOAD_DEFAULT_REQUEST_SIZE = MULTIPART_FRAMING_SIZE  # JSON bodies of the other upload routes
 
 # Ensure upload directory exists
 os.makedirs(UPLOAD_DIR, exist_ok=True)
@@ -28,73 +52,25 @@ os.makedirs(UPLOAD_DIR, exist_ok=True)
 @router.post("/file", response_model=dict)
 async def upload_file(
     file: UploadFile = File(...),
+    first_page: Optional[int] = Form(None, ge=1),
+    last_page: Optional[int] = Form(None, ge=1),
     current_user: User = Depends(get_current_user),
     db = Depends(get_database)
 ):
-    """Upload and process a single file"""
+    """Upload and process a single file (first_page/last_page select a PDF page range)"""
     try:
-        # Validate file
         if not file.filename:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="No file provided"
             )
         
-        # Check file extension
-        file_ext = os.path.splitext(file.filename)[1].lower()
-        if file_ext not in ALLOWED_EXTENSIONS:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Invalid file type. Only PDF, DOCX, DOC, and TXT files are allowed."
-            )
-        
-        # Check file size
-        file_content = await file.read()
-        if len(file_content) > MAX_FILE_SIZE:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail=f"File too large. Maximum size is {MAX_FILE_SIZE // 1024 // 1024}MB."
-            )
-        
-        # Extract text based on file type
-        extracted_text = ""
-        
-        try:
-            if file_ext == ".pdf":
-                extracted_text = await extract_pdf_text(file_content)
-            elif file_ext in [".docx", ".doc"]:
-                extracted_text = await extract_docx_text(file_content)
-            elif file_ext == ".txt":
-                extracted_text = file_content.decode("utf-8")
-            
-        except Exception as extraction_error:
-            logger.error(f"File extraction error: {extraction_error}")
-            raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail="Failed to extract text from file"
-            )
-        
-        # Validate extracted text
-        if not extracted_text or len(extracted_text.strip()) < 50:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Could not extract sufficient text from the file"
-            )
-        
-        # Calculate word and character counts
-        word_count = len(extracted_text.split())
-        char_count = len(extracted_text)
+        processed_file = await process_upload(db, current_user.id, file, first_page, last_page)
         
         return {
             "success": True,
             "message": "File processed successfully",
-            "data": {
-                "originalName": file.filename,
-                "fileType": file_ext,
-                "extractedText": extracted_text.strip(),
-                "wordCount": word_count,
-                "characterCount": char_count
-            }
+            "data": processed_file
         }
         
     except HTTPException:
@@ -106,6 +82,79 @@ async def upload_file(
             detail="File upload failed"
         )
 
+@router.post("/file/stream")
+async def upload_file_stream(
+    file: UploadFile = File(...),
+    first_page: Optional[int] = Form(None, ge=1),
+    last_page: Optional[int] = Form(None, ge=1),
+    current_user: User = Depends(get_current_user),
+    db = Depends(get_database)
+):
+    """Upload a file and stream its text as NDJSON page or block records followed by a done record"""
+    file_ext = validate_upload(file)
+    whole_document = first_page is None and last_page is None
+    
+    async def record_stream():
+        texts = []
+        word_count = 0
+        char_count = 0
+        
+        try:
+            async with spool_upload(file) as (source, digest):
+                # Stored documents are replayed instead of parsed again
+                stored_text = await document_store.load_extracted_text(digest) if whole_document else None
+                
+                async for kind, number, text in extracted_blocks(file_ext, source, digest, first_page, last_page, stored_text):
+                    texts.append(text)
+                    word_count += len(text.split())
+                    char_count += len(text)
+                    yield format_ndjson({
+                        "type": kind,
+                        kind: number,
+                        "text": text,
+                        "wordCount": word_count,
+                        "characterCount": char_count
+                    })
+                
+                extracted_text = "\n".join(texts).strip()
+                if len(extracted_text) < 50:
+                    yield format_ndjson({"type": "error", "detail": "Could not extract sufficient text from the file"})
+                    return
+                
+                document_id = None
+                if whole_document:
+                    if stored_text is None:
+                        await document_store.save(digest, source, extracted_text)
+                    document_doc = await document_store.register(db, current_user.id, digest, file.filename, file_ext, extracted_text)
+                    document_id = str(document_doc["_id"])
+                    await retrieval_index.add_document(current_user.id, document_id, file.filename, extracted_text)
+            
+            yield format_ndjson({
+                "type": "done",
+                "documentId": document_id,
+                "originalName": file.filename,
+                "fileType": file_ext,
+                "wordCount": len(extracted_text.split()),
+                "characterCount": len(extracted_text)
+            })
+            
+        except HTTPException as e:
+            yield format_ndjson({"type": "error", "detail": e.detail})
+        except (DocumentTooLarge, ExtractionTimeout) as e:
+            yield format_ndjson({"type": "error", "detail": str(e)})
+        except Exception as e:
+            logger.error(f"File stream extraction error: {e}")
+            yield format_ndjson({"type": "error", "detail": "Failed to extract text from file"})
+    
+    return StreamingResponse(
+        record_stream(),
+        media_type="application/x-ndjson",
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no"  # Disable proxy buffering so records flush immediately
+        }
+    )
+
 @router.post("/files", response_model=dict)
 async def upload_multiple_files(
     files: List[UploadFile] = File(...),
@@ -120,56 +169,32 @@ async def upload_multiple_files(
                 detail="No files provided"
             )
         
-        if len(files) > 5:
+        if len(files) > MAX_FILES_PER_UPLOAD:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Too many files. Maximum 5 files per upload."
+                detail=f"Too many files. Maximum {MAX_FILES_PER_UPLOAD} files per upload."
             )
         
+        # Process files concurrently; results come back in upload order
+        semaphore = asyncio.Semaphore(UPLOAD_CONCURRENCY)
+        
+        async def process_with_limit(file: UploadFile):
+            async with semaphore:
+                return await process_upload(db, current_user.id, file)
+        
+        results = await asyncio.gather(*[process_with_limit(file) for file in files], return_exceptions=True)
+        
         processed_files = []
+        errors = []
         
-        for file in files:
-            try:
-                # Validate file
-                if not file.filename:
-                    continue
-                
-                # Check file extension
-                file_ext = os.path.splitext(file.filename)[1].lower()
-                if file_ext not in ALLOWED_EXTENSIONS:
-                    continue
-                
-                # Check file size
-                file_content = await file.read()
-                if len(file_content) > MAX_FILE_SIZE:
-                    continue
-                
-                # Extract text
-                extracted_text = ""
-                try:
-                    if file_ext == ".pdf":
-                        extracted_text = await extract_pdf_text(file_content)
-                    elif file_ext in [".docx", ".doc"]:
-                        extracted_text = await extract_docx_text(file_content)
-                    elif file_ext == ".txt":
-                        extracted_text = file_content.decode("utf-8")
-                except Exception as extraction_error:
-                    logger.error(f"Error processing file {file.filename}: {extraction_error}")
-                    continue
-                
-                # Validate extracted text
-                if extracted_text and len(extracted_text.strip()) >= 50:
-                    processed_files.append({
-                        "originalName": file.filename,
-                        "fileType": file_ext,
-                        "extractedText": extracted_text.strip(),
-                        "wordCount": len(extracted_text.split()),
-                        "characterCount": len(extracted_text)
-                    })
-                    
-            except Exception as file_error:
-                logger.error(f"Error processing file {file.filename}: {file_error}")
-                continue
+        for file, result in zip(files, results):
+            if isinstance(result, HTTPException):
+                errors.append({"originalName": file.filename, "error": result.detail})
+            elif isinstance(result, Exception):
+                logger.error(f"Error processing file {file.filename}: {result}")
+                errors.append({"originalName": file.filename, "error": "Failed to process file"})
+            else:
+                processed_files.append(result)
         
         if not processed_files:
             raise HTTPException(
@@ -186,6 +211,7 @@ async def upload_multiple_files(
             "message": f"{len(processed_files)} files processed successfully",
             "data": {
                 "files": processed_files,
+                "errors": errors,
                 "totalWordCount": total_word_count,
                 "totalCharacterCount": total_char_count
             }
@@ -237,46 +263,497 @@ async def get_supported_file_types():
                 }
             ],
             "maxFileSize": MAX_FILE_SIZE,
-            "maxFilesPerUpload": 5
+            "maxFilesPerUpload": MAX_FILES_PER_UPLOAD
         }
     }
 
-async def extract_pdf_text(file_content: bytes) -> str:
-    """Extract text from PDF file"""
+@router.post("/sessions", response_model=dict)
+async def create_upload_session(
+    upload_data: UploadSessionCreate,
+    current_user: User = Depends(get_current_user),
+    db = Depends(get_database)
+):
+    """Start a resumable upload; chunks are then PUT by index and the upload completed"""
+    try:
+        file_ext = os.path.splitext(upload_data.filename)[1].lower()
+        if file_ext not in ALLOWED_EXTENSIONS:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Invalid file type. Only PDF, DOCX, DOC, and TXT files are allowed."
+            )
+        
+        if upload_data.size <= 0 or upload_data.size > RESUMABLE_MAX_FILE_SIZE:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"File size must be between 1 byte and {RESUMABLE_MAX_FILE_SIZE // 1024 // 1024}MB."
+            )
+        
+        upload_doc = await resumable_uploads.create(
+            db, current_user.id, upload_data.filename, file_ext, upload_data.size, upload_data.sha256
+        )
+        
+        return {
+            "success": True,
+            "message": "Upload started",
+            "data": {"upload": resumable_uploads.format(upload_doc)}
+        }
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Create upload session error: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Internal server error"
+        )
+
+@router.get("/sessions/{upload_id}", response_model=dict)
+async def get_upload_session(
+    upload_id: str,
+    current_user: User = Depends(get_current_user),
+    db = Depends(get_database)
+):
+    """Get a resumable upload with its received byte ranges and missing chunks"""
+    try:
+        upload_doc = await resumable_uploads.get(db, current_user.id, upload_id)
+        
+        if not upload_doc:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Upload not found"
+            )
+        
+        return {
+            "success": True,
+            "data": {"upload": resumable_uploads.format(upload_doc)}
+        }
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Get upload session error: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Internal server error"
+        )
+
+@router.put("/sessions/{upload_id}/chunks/{index}", response_model=dict)
+async def upload_chunk(
+    upload_id: str,
+    index: int,
+    request: Request,
+    offset: Optional[int] = Query(None, ge=0),
+    x_chunk_sha256: str = Header(...),
+    current_user: User = Depends(get_current_user),
+    db = Depends(get_database)
+):
+    """Store one chunk of a resumable upload (raw body, verified against the X-Chunk-SHA256 header)"""
+    try:
+        upload_doc = await resumable_uploads.get(db, current_user.id, upload_id)
+        
+        if not upload_doc:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Upload not found"
+            )
+        
+        try:
+            upload_doc = await resumable_uploads.write_chunk(
+                db, upload_doc, index, offset, request.stream(), x_chunk_sha256
+            )
+        except ChunkRejected as chunk_error:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=str(chunk_error)
+            )
+        
+        return {
+            "success": True,
+            "message": f"Chunk {index} received",
+            "data": {"upload": resumable_uploads.format(upload_doc)}
+        }
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Upload chunk error: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Chunk upload failed"
+        )
+
+@router.post("/sessions/{upload_id}/complete", response_model=dict)
+async def complete_upload_session(
+    upload_id: str,
+    current_user: User = Depends(get_current_user),
+    db = Depends(get_database)
+):
+    """Assemble a fully received upload and extract its text"""
+    try:
+        upload_doc = await resumable_uploads.get(db, current_user.id, upload_id)
+        
+        if not upload_doc:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Upload not found"
+            )
+        
+        if upload_doc["status"] == UploadStatus.COMPLETED:
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="Upload is already complete"
+            )
+        
+        missing_chunks = resumable_uploads.missing_chunks(upload_doc)
+        if missing_chunks:
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail=f"{len(missing_chunks)} chunks are still missing"
+            )
+        
+        try:
+            async with resumable_uploads.assemble(upload_doc) as (source, digest):
+                processed_file = await extract_and_store(
+                    db, current_user.id, upload_doc["filename"], upload_doc["file_type"], source, digest
+                )
+        except ChunkRejected as chunk_error:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=str(chunk_error)
+            )
+        
+        upload_doc = await resumable_uploads.complete(db, upload_doc, processed_file["documentId"])
+        
+        return {
+            "success": True,
+            "message": "File processed successfully",
+            "data": {
+                **processed_file,
+                "upload": resumable_uploads.format(upload_doc)
+            }
+        }
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Complete upload session error: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="File upload failed"
+        )
+
+@router.delete("/sessions/{upload_id}", response_model=dict)
+async def cancel_upload_session(
+    upload_id: str,
+    current_user: User = Depends(get_current_user),
+    db = Depends(get_database)
+):
+    """Cancel a resumable upload and delete its chunks"""
     try:
-        pdf_file = io.BytesIO(file_content)
-        pdf_reader = PyPDF2.PdfReader(pdf_file)
+        upload_doc = await resumable_uploads.get(db, current_user.id, upload_id)
         
-        text = ""
-        for page in pdf_reader.pages:
-            text += page.extract_text() + "\n"
+        if not upload_doc:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Upload not found"
+            )
         
-        return text.strip()
+        await resumable_uploads.discard(db, upload_doc)
+        
+        return {
+            "success": True,
+            "message": "Upload cancelled"
+        }
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Cancel upload session error: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Internal server error"
+        )
+
+@router.get("/documents", response_model=dict)
+async def get_documents(
+    page: int = Query(1, ge=1),
+    limit: int = Query(20, ge=1, le=100),
+    current_user: User = Depends(get_current_user),
+    db = Depends(get_database)
+):
+    """Get the user's uploaded documents"""
+    try:
+        skip = (page - 1) * limit
+        
+        cursor = db.database.documents.find({"user_id": current_user.id}).sort("updated_at", -1).skip(skip).limit(limit)
+        documents = [document_store.format(document_doc) async for document_doc in cursor]
+        
+        total = await db.database.documents.count_documents({"user_id": current_user.id})
+        
+        return {
+            "success": True,
+            "data": {
+                "documents": documents,
+                "pagination": {
+                    "page": page,
+                    "limit": limit,
+                    "total": total,
+                    "pages": (total + limit - 1) // limit
+                }
+            }
+        }
+        
+    except Exception as e:
+        logger.error(f"Get documents error: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Internal server error"
+        )
+
+@router.get("/documents/{document_id}", response_model=dict)
+async def get_document(
+    document_id: str,
+    current_user: User = Depends(get_current_user),
+    db = Depends(get_database)
+):
+    """Get an uploaded document with its extracted text"""
+    try:
+        document_doc = await document_store.get(db, current_user.id, document_id)
+        extracted_text = await document_store.load_extracted_text(document_doc["digest"]) if document_doc else None
+        
+        if extracted_text is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Document not found"
+            )
+        
+        return {
+            "success": True,
+            "data": {
+                "document": {
+                    **document_store.format(document_doc),
+                    "extractedText": extracted_text
+                }
+            }
+        }
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Get document error: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Internal server error"
+        )
+
+@router.get("/cache/stats", response_model=dict)
+async def get_extraction_stats(
+    current_user: User = Depends(get_current_user)
+):
+    """Get PDF page cache, document store, retrieval and parser pool counters"""
+    return {
+        "success": True,
+        "data": {
+            "pageCache": page_cache.get_stats(),
+            "documentStore": document_store.get_stats(),
+            "retrieval": retrieval_index.get_stats(),
+            "parsers": extraction_pool.get_stats()
+        }
+    }
+
+async def process_upload(db, user_id: str, file: UploadFile, first_page: Optional[int] = None, last_page: Optional[int] = None) -> dict:
+    """Validate an uploaded file, extract its text and store it, raising HTTPException on rejection"""
+    file_ext = validate_upload(file)
+    
+    async with spool_upload(file) as (source, digest):
+        return await extract_and_store(db, user_id, file.filename, file_ext, source, digest, first_page, last_page)
+
+def validate_upload(file: UploadFile) -> str:
+    """Check an upload's name, type and recorded size, returning its extension"""
+    if not file.filename:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="No file provided"
+        )
+    
+    # Check file extension
+    file_ext = os.path.splitext(file.filename)[1].lower()
+    if file_ext not in ALLOWED_EXTENSIONS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid file type. Only PDF, DOCX, DOC, and TXT files are allowed."
+        )
+    
+    # Reject on the size recorded by the multipart parser before reading anything
+    if file.size is not None and file.size > MAX_FILE_SIZE:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"File too large. Maximum size is {MAX_FILE_SIZE // 1024 // 1024}MB."
+        )
+    
+    return file_ext
+
+async def extract_and_store(db, user_id: str, filename: str, file_ext: str, source: Union[bytes, str], digest: str, first_page: Optional[int] = None, last_page: Optional[int] = None) -> dict:
+    """Extract a spooled file's text, store whole documents by digest and record them for the user"""
+    # Whole documents are stored by content; page ranges are served from the page cache
+    whole_document = first_page is None and last_page is None
+    
+    # Re-uploads of a stored file skip parsing entirely
+    extracted_text = await document_store.load_extracted_text(digest) if whole_document else None
+    
+    if extracted_text is None:
+        try:
+            if file_ext == ".pdf":
+                extracted_text = await extract_pdf_text(source, digest, first_page, last_page)
+            elif file_ext in [".docx", ".doc"]:
+                extracted_text = await extract_docx_text(source)
+            elif file_ext == ".txt":
+                extracted_text = await read_text_file(source)
+            
+        except DocumentTooLarge as extraction_error:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=str(extraction_error)
+            )
+        except ExtractionTimeout as extraction_error:
+            raise HTTPException(
+                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                detail=str(extraction_error)
+            )
+        except Exception as extraction_error:
+            logger.error(f"File extraction error: {extraction_error}")
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail="Failed to extract text from file"
+            )
+        
+        # Validate extracted text
+        if not extracted_text or len(extracted_text.strip()) < 50:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Could not extract sufficient text from the file"
+            )
+        
+        extracted_text = extracted_text.strip()
+        if whole_document:
+            await document_store.save(digest, source, extracted_text)
+    
+    document_id = None
+    if whole_document:
+        document_doc = await document_store.register(db, user_id, digest, filename, file_ext, extracted_text)
+        document_id = str(document_doc["_id"])
+        await retrieval_index.add_document(user_id, document_id, filename, extracted_text)
+    
+    return {
+        "documentId": document_id,
+        "originalName": filename,
+        "fileType": file_ext,
+        "extractedText": extracted_text,
+        "wordCount": len(extracted_text.split()),
+        "characterCount": len(extracted_text)
+    }
+
+@asynccontextmanager
+async def spool_upload(file: UploadFile):
+    """Hash and size-check an upload where the multipart parser spooled it, yielding its SHA-256 digest and its bytes when small or a file path once past the spool threshold"""
+    sha256 = hashlib.sha256()
+    buffer = bytearray()
+    size = 0
+    
+    # First pass reads the parser's own spool in place; nothing is copied yet
+    await file.seek(0)
+    while True:
+        chunk = await file.read(UPLOAD_CHUNK_SIZE)
+        if not chunk:
+            break
+        
+        size += len(chunk)
+        sha256.update(chunk)
+        if size > MAX_FILE_SIZE:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"File too large. Maximum size is {MAX_FILE_SIZE // 1024 // 1024}MB."
+            )
+        if size <= UPLOAD_SPOOL_THRESHOLD:
+            buffer.extend(chunk)
+    digest = sha256.hexdigest()
+    
+    if size <= UPLOAD_SPOOL_THRESHOLD:
+        yield bytes(buffer), digest
+        return
+    
+    # Parsers run in other processes and need a path; a stored copy of the same file serves as one
+    stored_path = document_store.stored_path(digest)
+    if stored_path:
+        yield stored_path, digest
+        return
+    
+    # Otherwise copy it once; document_store.save moves this file into place instead of copying it again
+    spool_path = os.path.join(UPLOAD_DIR, f".spool-{uuid.uuid4().hex}")
+    try:
+        await file.seek(0)
+        async with aiofiles.open(spool_path, "wb") as spool:
+            while True:
+                chunk = await file.read(UPLOAD_CHUNK_SIZE)
+                if not chunk:
+                    break
+                await spool.write(chunk)
+        
+        yield spool_path, digest
+    finally:
+        if os.path.exists(spool_path):
+            os.remove(spool_path)
+
+async def extracted_blocks(file_ext: str, source: Union[bytes, str], digest: str, first_page: Optional[int], last_page: Optional[int], stored_text: Optional[str] = None) -> AsyncIterator[tuple]:
+    """Yield ("page", number, text) for PDFs or ("block", number, text) for other files and stored text"""
+    if stored_text is None and file_ext == ".pdf":
+        async for page, text in stream_pdf_document(source, digest, (first_page or 1) - 1, last_page):
+            yield "page", page + 1, text
+        return
+    
+    text = stored_text
+    if text is None:
+        if file_ext in [".docx", ".doc"]:
+            text = await extract_docx_text(source)
+        else:
+            text = await read_text_file(source)
+    
+    for number, block in enumerate(text_blocks(text, EXTRACTION_STREAM_BLOCK_CHARS), start=1):
+        yield "block", number, block
+
+async def read_text_file(source: Union[bytes, str]) -> str:
+    """Decode a UTF-8 text file, reading a spooled file a chunk at a time and stopping once it passes MAX_TEXT_CHARS"""
+    if isinstance(source, bytes):
+        parts = [source.decode("utf-8")]
+    else:
+        decoder = codecs.getincrementaldecoder("utf-8")()
+        parts = []
+        length = 0
+        async with aiofiles.open(source, "rb") as spool:
+            while length <= MAX_TEXT_CHARS:
+                chunk = await spool.read(UPLOAD_CHUNK_SIZE)
+                parts.append(decoder.decode(chunk, final=not chunk))
+                length += len(parts[-1])
+                if not chunk:
+                    break
+    
+    text = "".join(parts)
+    if len(text) > MAX_TEXT_CHARS:
+        raise DocumentTooLarge(f"Text file is longer than the maximum of {MAX_TEXT_CHARS} characters")
+    return text
+
+async def extract_pdf_text(source: Union[bytes, str], digest: str, first_page: Optional[int] = None, last_page: Optional[int] = None) -> str:
+    """Extract text from PDF file, optionally limited to an inclusive 1-based page range"""
+    try:
+        return await extract_pdf_document(source, digest, (first_page or 1) - 1, last_page)
     except Exception as e:
         logger.error(f"PDF extraction error: {e}")
         raise
 
-async def extract_docx_text(file_content: bytes) -> str:
+async def extract_docx_text(source: Union[bytes, str]) -> str:
     """Extract text from DOCX file"""
     try:
-        # Create a temporary file
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".docx") as temp_file:
-            temp_file.write(file_content)
-            temp_file.flush()
-            
-            # Open with python-docx
-            doc = Document(temp_file.name)
-            
-            # Extract text from all paragraphs
-            text = ""
-            for paragraph in doc.paragraphs:
-                text += paragraph.text + "\n"
-            
-            # Clean up temporary file
-            os.unlink(temp_file.name)
-            
-            return text.strip()
+        return await extraction_pool.run(extract_docx, source)
     except Exception as e:
         logger.error(f"DOCX extraction error: {e}")
         raise
-
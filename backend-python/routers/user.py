@@ -1,5 +1,5 @@
-from fastapi import APIRouter, HTTPException, Depends, status
-from datetime import datetime
+from fastapi import APIRouter, HTTPException, Depends, status, Query
+from datetime import datetime, timedelta
 from bson import ObjectId
 from typing import Optional
 import logging
@@ -7,6 +7,8 @@ import logging
 from database import get_database
 from models.user import User, UserResponse, UserProgress, Achievement, UserAchievement
 from middleware.auth import get_current_user
+from services.document_store import document_store
+from services.retrieval import retrieval_index
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
@@ -307,6 +309,44 @@ async def get_user_achievements(
             detail="Internal server error"
         )
 
+@router.get("/usage", response_model=dict)
+async def get_user_ai_usage(
+    days: int = Query(30, ge=1, le=365),
+    current_user: User = Depends(get_current_user),
+    db = Depends(get_database)
+):
+    """Get the user's daily AI usage"""
+    try:
+        since = (datetime.utcnow() - timedelta(days=days - 1)).strftime("%Y-%m-%d")
+        
+        daily_usage = []
+        async for usage_doc in db.database.ai_usage.find(
+            {"user_id": current_user.id, "date": {"$gte": since}},
+            {"_id": 0, "user_id": 0}
+        ).sort("date", -1):
+            daily_usage.append(usage_doc)
+        
+        totals = {}
+        for usage_doc in daily_usage:
+            for name in ("calls", "prompt_tokens", "completion_tokens", "latency_ms", "errors", "fallback", "cache_hit"):
+                totals[name] = totals.get(name, 0) + usage_doc.get(name, 0)
+        
+        return {
+            "success": True,
+            "data": {
+                "since": since,
+                "totals": totals,
+                "daily": daily_usage
+            }
+        }
+        
+    except Exception as e:
+        logger.error(f"Get AI usage error: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Internal server error"
+        )
+
 @router.delete("/account", response_model=dict)
 async def delete_user_account(
     current_user: User = Depends(get_current_user),
@@ -325,6 +365,11 @@ async def delete_user_account(
         await db.database.quiz_results.delete_many({"user_id": user_id})
         await db.database.chat_sessions.delete_many({"user_id": user_id})
         await db.database.user_achievements.delete_many({"user_id": user_id})
+        await db.database.ai_usage.delete_many({"user_id": user_id})
+        await document_store.delete_user_documents(db, user_id)
+        await db.database.upload_sessions.delete_many({"user_id": user_id})
+        retrieval_index.remove_user(user_id)
+        await db.database.jobs.delete_many({"user_id": user_id})
         
         # Delete questions for user's quizzes
         user_quiz_ids = []
@@ -12,6 +12,8 @@ from dotenv import load_dotenv
 # Load environment variables
 load_dotenv()
 
+from services.chat_store import message_preview
+
 async def seed_database():
     """Seed the database with sample data"""
     # Connect to MongoDB
@@ -239,6 +241,14 @@ async def seed_database():
         ]
         
         await db.chat_messages.insert_many(messages)
+        await db.chat_sessions.update_one(
+            {"_id": session_result.inserted_id},
+            {"$set": {
+                "message_count": len(messages),
+                "last_message": message_preview(messages[-1]["content"]),
+                "last_message_at": messages[-1]["created_at"]
+            }}
+        )
         print(f"✅ Created {len(messages)} chat messages")
         
         # Award some achievements to the demo user
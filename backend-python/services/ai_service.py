@@ -1,19 +1,460 @@
 import openai
+import httpx
+import asyncio
 import os
+import re
 import json
+import hashlib
 import logging
-from typing import List, Dict, Any
+import time
+from contextlib import aclosing
+from typing import List, Dict, Any, AsyncIterator, Tuple
 from models.summary import SummaryType
 from models.quiz import QuestionType, Difficulty
+from services.summary_cache import summary_cache
+from services.semantic_cache import semantic_cache, CHAT_CACHE_ENABLED
+from services import extractive_summarizer
+from services.resilience import CircuitBreaker, CircuitOpenError, LatencyTracker
+from services.streaming import JSONArrayStream
+from services.telemetry import telemetry
+from services.rate_limiter import rate_limiter, retry_delay, AI_RETRY_BASE_DELAY
+from services.token_counter import count_tokens, count_message_tokens
 
 logger = logging.getLogger(__name__)
 
 # Initialize OpenAI client
 openai.api_key = os.getenv("OPENAI_API_KEY")
 
+# Configure client pool and concurrency settings
+OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL") or None
+AI_MODEL = os.getenv("AI_MODEL", "gpt-3.5-turbo")
+AI_MAX_CONCURRENCY = int(os.getenv("AI_MAX_CONCURRENCY", "16"))  # in-flight model calls per process
+AI_QUEUE_TIMEOUT = float(os.getenv("AI_QUEUE_TIMEOUT", "30"))  # seconds to wait for a free slot
+AI_REQUEST_TIMEOUT = float(os.getenv("AI_REQUEST_TIMEOUT", "60"))  # seconds per model call
+AI_STREAM_TIMEOUT = float(os.getenv("AI_STREAM_TIMEOUT", "120"))  # seconds per streamed model call, first token to last
+AI_MAX_CONNECTIONS = int(os.getenv("AI_MAX_CONNECTIONS", "32"))
+AI_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("AI_MAX_KEEPALIVE_CONNECTIONS", "16"))
+AI_MAX_RETRIES = int(os.getenv("AI_MAX_RETRIES", "2"))
+AI_HEDGE_CHAT = os.getenv("AI_HEDGE_CHAT", "true").lower() == "true"  # duplicate slow chat calls after p95
+AI_HEDGE_MIN_DELAY = float(os.getenv("AI_HEDGE_MIN_DELAY", "1.0"))  # never hedge sooner than this
+
+# Configure long document summarization
+SUMMARY_CHUNK_CHARS = int(os.getenv("SUMMARY_CHUNK_CHARS", "10000"))  # ~2500 tokens per map call
+SUMMARY_MAP_CONCURRENCY = int(os.getenv("SUMMARY_MAP_CONCURRENCY", "8"))  # parallel chunk summaries per document
+
+# Configure quiz generation sharding
+QUIZ_SHARD_SIZE = int(os.getenv("QUIZ_SHARD_SIZE", "5"))  # questions per concurrent completion
+QUIZ_SHARD_RETRIES = int(os.getenv("QUIZ_SHARD_RETRIES", "1"))  # extra attempts for a failed shard
+QUIZ_DUPLICATE_THRESHOLD = float(os.getenv("QUIZ_DUPLICATE_THRESHOLD", "0.8"))  # word-set similarity
+
+QUIZ_SYSTEM_PROMPT = "You are an expert educator who creates high-quality quiz questions. Always provide accurate answers and clear explanations. Return only valid JSON."
+
+SUMMARY_SYSTEM_PROMPT = "You are an expert at creating clear, accurate, and helpful summaries. Always respond in the requested language and maintain the original meaning while making the content more accessible."
+
+class AIQueueTimeout(Exception):
+    """Raised when no model call slot frees up within AI_QUEUE_TIMEOUT"""
+
+class InFlightCall:
+    """A shared upstream model call and the number of callers waiting on it"""
+    
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+class InFlightStream:
+    """A shared upstream streamed call; subscribers that join late replay the chunks already received"""
+    
+    def __init__(self):
+        self.task = None
+        self.chunks = []
+        self.done = False
+        self.error = None
+        self.subscribers = 0
+        self.changed = asyncio.Event()
+    
+    def notify(self):
+        changed, self.changed = self.changed, asyncio.Event()
+        changed.set()
+
 class AIService:
     def __init__(self):
-        self.client = openai.OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+        # Shared connection pool reused by every model call in this process
+        self.http_client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=AI_MAX_CONNECTIONS,
+                max_keepalive_connections=AI_MAX_KEEPALIVE_CONNECTIONS
+            ),
+            timeout=httpx.Timeout(AI_REQUEST_TIMEOUT, connect=10.0)
+        )
+        self.client = openai.AsyncOpenAI(
+            api_key=os.getenv("OPENAI_API_KEY"),
+            base_url=OPENAI_BASE_URL,
+            max_retries=0,  # retries go through the rate limiter in _run_completion
+            http_client=self.http_client
+        )
+        # Caps in-flight model calls; extra callers queue here instead of piling onto the provider
+        self.semaphore = asyncio.Semaphore(AI_MAX_CONCURRENCY)
+        self.in_flight = 0
+        self.waiting = 0
+        # Identical concurrent requests share one upstream call (single-flight)
+        self.in_flight_calls: Dict[str, InFlightCall] = {}
+        self.in_flight_streams: Dict[str, InFlightStream] = {}
+        self.coalesced = 0
+        # Per model/endpoint circuit breakers and latency windows
+        self.breakers: Dict[str, CircuitBreaker] = {}
+        self.latencies: Dict[str, LatencyTracker] = {}
+        self.hedged = 0
+    
+    async def _acquire_slot(self):
+        """Wait for a free model call slot"""
+        self.waiting += 1
+        try:
+            await asyncio.wait_for(self.semaphore.acquire(), timeout=AI_QUEUE_TIMEOUT)
+        except asyncio.TimeoutError:
+            raise AIQueueTimeout(f"No AI slot available after {AI_QUEUE_TIMEOUT}s")
+        finally:
+            self.waiting -= 1
+        self.in_flight += 1
+    
+    def _release_slot(self):
+        """Return a model call slot to the pool"""
+        self.in_flight -= 1
+        self.semaphore.release()
+    
+    async def _create_completion(self, endpoint: str, hedge: bool = False, **kwargs):
+        """Run a chat completion, coalescing identical concurrent requests into one upstream call (hedged when hedge is set)"""
+        key = self._call_key(endpoint, kwargs)
+        
+        call = self.in_flight_calls.get(key)
+        if call is None:
+            run = self._hedged_completion if hedge else self._run_completion
+            call = InFlightCall(asyncio.ensure_future(run(endpoint, **kwargs)))
+            self.in_flight_calls[key] = call
+            call.task.add_done_callback(lambda _task: self._forget_call(key, call))
+        else:
+            self.coalesced += 1
+            telemetry.record_event(endpoint, kwargs["model"], "coalesced")
+        
+        call.waiters += 1
+        try:
+            # Shielded so one caller going away does not cancel the call for everyone else
+            return await asyncio.shield(call.task)
+        except asyncio.CancelledError:
+            # Last waiter cancelled: nobody needs the result any more. Forget the call first so a
+            # caller arriving while the task unwinds starts a fresh one instead of inheriting the cancel
+            if call.waiters == 1 and not call.task.done():
+                self._forget_call(key, call)
+                call.task.cancel()
+            raise
+        finally:
+            call.waiters -= 1
+    
+    @staticmethod
+    def _call_key(endpoint: str, kwargs: Dict[str, Any]) -> str:
+        return hashlib.sha256(json.dumps([endpoint, kwargs], sort_keys=True, default=str).encode("utf-8")).hexdigest()
+    
+    def _forget_call(self, key: str, call: InFlightCall):
+        """Drop a finished call so later requests go upstream again"""
+        if self.in_flight_calls.get(key) is call:
+            del self.in_flight_calls[key]
+    
+    def _forget_stream(self, key: str, call: InFlightStream):
+        """Drop a finished stream so later requests go upstream again"""
+        if self.in_flight_streams.get(key) is call:
+            del self.in_flight_streams[key]
+    
+    def _get_breaker(self, endpoint: str, model: str) -> CircuitBreaker:
+        name = f"{model}:{endpoint}"
+        if name not in self.breakers:
+            self.breakers[name] = CircuitBreaker(name)
+        return self.breakers[name]
+    
+    def _get_latency_tracker(self, endpoint: str, model: str) -> LatencyTracker:
+        name = f"{model}:{endpoint}"
+        if name not in self.latencies:
+            self.latencies[name] = LatencyTracker()
+        return self.latencies[name]
+    
+    async def _run_completion(self, endpoint: str, **kwargs):
+        """Run a chat completion under the rate limiter, concurrency limit, circuit breaker and adaptive timeout"""
+        breaker = self._get_breaker(endpoint, kwargs["model"])
+        if not breaker.allow():
+            telemetry.record_event(endpoint, kwargs["model"], "circuit_open")
+            raise CircuitOpenError(f"Circuit open for {breaker.name}")
+        
+        tracker = self._get_latency_tracker(endpoint, kwargs["model"])
+        estimated_tokens = self._estimate_tokens(kwargs)
+        deadline = time.monotonic() + AI_QUEUE_TIMEOUT
+        
+        for attempt in range(AI_MAX_RETRIES + 1):
+            try:
+                await rate_limiter.acquire(estimated_tokens, deadline)
+                await self._acquire_slot()
+            except BaseException:
+                breaker.abandon()
+                raise
+            
+            started = time.monotonic()
+            try:
+                response = await asyncio.wait_for(
+                    self.client.chat.completions.create(**kwargs),
+                    timeout=tracker.timeout(AI_REQUEST_TIMEOUT)
+                )
+            except asyncio.CancelledError:
+                breaker.abandon()
+                raise
+            except Exception as e:
+                telemetry.record_call(
+                    endpoint, kwargs["model"], time.monotonic() - started,
+                    error="timeout" if isinstance(e, asyncio.TimeoutError) else type(e).__name__
+                )
+                delay = self._retry_delay(e, attempt, deadline)
+                if delay is None:
+                    self._record_failure(breaker, e, time.monotonic() - started)
+                    raise
+            else:
+                latency = time.monotonic() - started
+                breaker.record(True, latency)
+                tracker.record(latency)
+                telemetry.record_call(
+                    endpoint, kwargs["model"], latency,
+                    response.usage.prompt_tokens if response.usage else 0,
+                    response.usage.completion_tokens if response.usage else 0
+                )
+                return response
+            finally:
+                self._release_slot()
+            
+            # Back off outside the slot so other calls can use it meanwhile
+            telemetry.record_event(endpoint, kwargs["model"], "retry")
+            try:
+                await asyncio.sleep(delay)
+            except asyncio.CancelledError:
+                breaker.abandon()
+                raise
+    
+    def _estimate_tokens(self, kwargs: Dict[str, Any]) -> int:
+        """Tokens a request counts against TPM: its prompt plus the max_tokens it reserves"""
+        return sum(count_message_tokens(message) for message in kwargs["messages"]) + kwargs.get("max_tokens", 0)
+    
+    def _retry_delay(self, error: Exception, attempt: int, deadline: float) -> float:
+        """Seconds to wait before retrying a failed call, or None if it should not be retried"""
+        delay = retry_delay(error, attempt)
+        if isinstance(error, openai.RateLimitError):
+            # Hold every queued call, not just this one, until the provider's limit resets
+            rate_limiter.pause(delay if delay is not None else AI_RETRY_BASE_DELAY)
+        if delay is None or attempt >= AI_MAX_RETRIES or time.monotonic() + delay > deadline:
+            return None
+        return delay
+    
+    def _record_failure(self, breaker: CircuitBreaker, error: Exception, latency: float):
+        """Report a failed call to the breaker; quota rejections say nothing about upstream health"""
+        if isinstance(error, openai.RateLimitError):
+            breaker.abandon()
+        else:
+            breaker.record(False, latency)
+    
+    async def _hedged_completion(self, endpoint: str, **kwargs):
+        """Run a completion, firing a duplicate if the first is slower than the observed p95"""
+        p95 = self._get_latency_tracker(endpoint, kwargs["model"]).percentile(95)
+        if p95 is None:
+            return await self._run_completion(endpoint, **kwargs)
+        
+        attempts = [asyncio.ensure_future(self._run_completion(endpoint, **kwargs))]
+        try:
+            done, _ = await asyncio.wait(attempts, timeout=max(AI_HEDGE_MIN_DELAY, p95))
+            if done:
+                return attempts[0].result()
+            
+            self.hedged += 1
+            telemetry.record_event(endpoint, kwargs["model"], "hedge")
+            attempts.append(asyncio.ensure_future(self._run_completion(endpoint, **kwargs)))
+            
+            # First successful attempt wins; only fail if every attempt fails
+            pending = set(attempts)
+            error = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for attempt in done:
+                    if attempt.exception() is None:
+                        return attempt.result()
+                    error = attempt.exception()
+            raise error
+        finally:
+            for attempt in attempts:
+                if not attempt.done():
+                    attempt.cancel()
+    
+    async def _stream_completion(self, endpoint: str, **kwargs) -> AsyncIterator[str]:
+        """Stream chat completion content deltas, coalescing identical concurrent requests into one upstream stream"""
+        key = self._call_key(endpoint, kwargs)
+        
+        call = self.in_flight_streams.get(key)
+        if call is None:
+            call = InFlightStream()
+            call.task = asyncio.ensure_future(self._pump_stream(key, call, endpoint, kwargs))
+            self.in_flight_streams[key] = call
+            # Also covers a task cancelled before it started running
+            call.task.add_done_callback(lambda _task: self._forget_stream(key, call))
+        else:
+            self.coalesced += 1
+            telemetry.record_event(endpoint, kwargs["model"], "coalesced")
+        
+        call.subscribers += 1
+        position = 0
+        try:
+            while True:
+                changed = call.changed
+                while position < len(call.chunks):
+                    yield call.chunks[position]
+                    position += 1
+                if call.done:
+                    if call.error is not None:
+                        raise call.error
+                    return
+                await changed.wait()
+        finally:
+            call.subscribers -= 1
+            # Last subscriber gone: stop the upstream stream and free its slot
+            if call.subscribers == 0 and not call.task.done():
+                self._forget_stream(key, call)
+                call.task.cancel()
+    
+    async def _pump_stream(self, key: str, call: InFlightStream, endpoint: str, kwargs: Dict[str, Any]):
+        """Read one upstream stream into a shared InFlightStream"""
+        try:
+            async with aclosing(self._run_stream(endpoint, **kwargs)) as chunks:
+                async for chunk in chunks:
+                    call.chunks.append(chunk)
+                    call.notify()
+        except Exception as e:
+            call.error = e
+        finally:
+            # Unregister before waking subscribers, so one that retries straight away goes upstream again
+            self._forget_stream(key, call)
+            call.done = True
+            call.notify()
+    
+    async def _run_stream(self, endpoint: str, **kwargs) -> AsyncIterator[str]:
+        """Stream content deltas under the rate limiter, concurrency limit, circuit breaker and adaptive first-token timeout"""
+        breaker = self._get_breaker(endpoint, kwargs["model"])
+        if not breaker.allow():
+            telemetry.record_event(endpoint, kwargs["model"], "circuit_open")
+            raise CircuitOpenError(f"Circuit open for {breaker.name}")
+        
+        # Time to first token is tracked separately from whole-call latency
+        tracker = self._get_latency_tracker(f"{endpoint}_first_token", kwargs["model"])
+        deadline = time.monotonic() + AI_QUEUE_TIMEOUT
+        # Streamed responses carry no usage block, so tokens are counted locally
+        prompt_tokens = sum(count_message_tokens(message) for message in kwargs["messages"])
+        completion_tokens = 0
+        
+        # Opening the stream can be retried; once tokens flow the attempt is final
+        attempt = 0
+        while True:
+            try:
+                await rate_limiter.acquire(prompt_tokens + kwargs.get("max_tokens", 0), deadline)
+                await self._acquire_slot()
+            except BaseException:
+                breaker.abandon()
+                raise
+            
+            started = time.monotonic()
+            first_token_timeout = tracker.timeout(AI_REQUEST_TIMEOUT)
+            try:
+                stream = await asyncio.wait_for(
+                    self.client.chat.completions.create(stream=True, **kwargs),
+                    timeout=first_token_timeout
+                )
+                break
+            except asyncio.CancelledError:
+                self._release_slot()
+                breaker.abandon()
+                raise
+            except Exception as e:
+                self._release_slot()
+                telemetry.record_call(
+                    endpoint, kwargs["model"], time.monotonic() - started,
+                    error="timeout" if isinstance(e, asyncio.TimeoutError) else type(e).__name__
+                )
+                delay = self._retry_delay(e, attempt, deadline)
+                if delay is None:
+                    self._record_failure(breaker, e, time.monotonic() - started)
+                    raise
+            
+            telemetry.record_event(endpoint, kwargs["model"], "retry")
+            attempt += 1
+            try:
+                await asyncio.sleep(delay)
+            except asyncio.CancelledError:
+                breaker.abandon()
+                raise
+        
+        first_token_latency = None
+        try:
+            try:
+                chunks = stream.__aiter__()
+                while True:
+                    # Wait for the first token within the adaptive timeout, and for the rest within AI_STREAM_TIMEOUT
+                    if first_token_latency is None:
+                        remaining = started + first_token_timeout - time.monotonic()
+                    else:
+                        remaining = started + AI_STREAM_TIMEOUT - time.monotonic()
+                    try:
+                        chunk = await asyncio.wait_for(chunks.__anext__(), timeout=max(0, remaining))
+                    except StopAsyncIteration:
+                        break
+                    if chunk.choices and chunk.choices[0].delta.content:
+                        if first_token_latency is None:
+                            first_token_latency = time.monotonic() - started
+                            tracker.record(first_token_latency)
+                        completion_tokens += count_tokens(chunk.choices[0].delta.content)
+                        yield chunk.choices[0].delta.content
+            finally:
+                await stream.response.aclose()
+            # Time to first token is what users feel, so that is what trips the breaker
+            breaker.record(True, first_token_latency if first_token_latency is not None else time.monotonic() - started)
+            telemetry.record_call(
+                endpoint, kwargs["model"], time.monotonic() - started,
+                prompt_tokens, completion_tokens, first_token_latency=first_token_latency
+            )
+        except (asyncio.CancelledError, GeneratorExit) as e:
+            breaker.abandon()
+            # GeneratorExit means the caller stopped reading on purpose, not that the call was lost
+            telemetry.record_call(
+                endpoint, kwargs["model"], time.monotonic() - started,
+                prompt_tokens, completion_tokens, cancelled=isinstance(e, asyncio.CancelledError),
+                first_token_latency=first_token_latency
+            )
+            raise
+        except Exception as e:
+            breaker.record(False, time.monotonic() - started)
+            telemetry.record_call(
+                endpoint, kwargs["model"], time.monotonic() - started, prompt_tokens, completion_tokens,
+                error="timeout" if isinstance(e, asyncio.TimeoutError) else type(e).__name__,
+                first_token_latency=first_token_latency
+            )
+            raise
+        finally:
+            self._release_slot()
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get current concurrency governor state"""
+        return {
+            "maxConcurrency": AI_MAX_CONCURRENCY,
+            "inFlight": self.in_flight,
+            "waiting": self.waiting,
+            "coalesced": self.coalesced,
+            "hedged": self.hedged,
+            "rateLimiter": rate_limiter.get_stats(),
+            "chatCache": semantic_cache.get_stats(),
+            "breakers": {name: breaker.get_stats() for name, breaker in self.breakers.items()},
+            "timeouts": {name: round(tracker.timeout(AI_REQUEST_TIMEOUT), 2) for name, tracker in self.latencies.items()}
+        }
+    
+    async def close(self):
+        """Close the shared HTTP connection pool"""
+        await self.client.close()
     
     async def generate_summary(
         self, 
@@ -22,30 +463,161 @@ class AIService:
         language: str = "english"
     ) -> str:
         """Generate AI summary of text"""
+        cache_key = summary_cache.make_key(text, summary_type, language)
+        cached_summary = await summary_cache.get(cache_key)
+        if cached_summary:
+            telemetry.record_event("summary", AI_MODEL, "cache_hit")
+            return cached_summary
+        
         try:
-            prompt = self._get_summary_prompt(text, summary_type, language)
+            used_fallback = False
+            if len(text) > SUMMARY_CHUNK_CHARS:
+                summary_text, used_fallback = await self._generate_long_summary(text, summary_type, language)
+            else:
+                summary_text = await self._complete_summary(
+                    self._get_summary_prompt(text, summary_type, language)
+                )
             
-            response = self.client.chat.completions.create(
-                model="gpt-3.5-turbo",
-                messages=[
-                    {
-                        "role": "system",
-                        "content": "You are an expert at creating clear, accurate, and helpful summaries. Always respond in the requested language and maintain the original meaning while making the content more accessible."
-                    },
-                    {
-                        "role": "user",
-                        "content": prompt
-                    }
-                ],
-                max_tokens=1000,
-                temperature=0.3
-            )
+            if not summary_text:
+                return "Unable to generate summary"
             
-            return response.choices[0].message.content or "Unable to generate summary"
+            # Only cache real model output, never fallbacks, so a passing upstream failure is not remembered
+            if not used_fallback:
+                await summary_cache.set(cache_key, summary_text)
+            return summary_text
             
         except Exception as e:
             logger.error(f"OpenAI API error: {e}")
-            return self._generate_fallback_summary(text, summary_type)
+            telemetry.record_event("summary", AI_MODEL, "fallback")
+            return await asyncio.to_thread(self._generate_fallback_summary, text, summary_type, language)
+    
+    async def generate_instant_summary(
+        self,
+        text: str,
+        summary_type: SummaryType,
+        language: str = "english"
+    ) -> str:
+        """Generate a local extractive summary without calling the model"""
+        # CPU-bound ranking runs off the event loop
+        return await asyncio.to_thread(extractive_summarizer.summarize, text, summary_type, language)
+    
+    async def _complete_summary(self, prompt: str, max_tokens: int = 1000) -> str:
+        """Run a single summarization completion"""
+        response = await self._create_completion(
+            "summary",
+            model=AI_MODEL,
+            messages=[
+                {
+                    "role": "system",
+                    "content": SUMMARY_SYSTEM_PROMPT
+                },
+                {
+                    "role": "user",
+                    "content": prompt
+                }
+            ],
+            max_tokens=max_tokens,
+            temperature=0.3
+        )
+        
+        return response.choices[0].message.content
+    
+    async def _generate_long_summary(self, text: str, summary_type: SummaryType, language: str) -> Tuple[str, bool]:
+        """Map-reduce summary for text that does not fit in one prompt; also returns whether any section fell back to an extractive summary"""
+        chunks = self._split_text(text, SUMMARY_CHUNK_CHARS)
+        partials, used_fallback = await self._summarize_chunks(chunks, language)
+        combined = "\n\n".join(partials)
+        
+        # Keep folding partial summaries until they fit in a single reduce prompt,
+        # stopping as soon as a pass does not shrink the notes
+        while len(combined) > SUMMARY_CHUNK_CHARS:
+            groups = self._split_text(combined, SUMMARY_CHUNK_CHARS)
+            folded_partials, folded_fallback = await self._summarize_chunks(groups, language)
+            folded = "\n\n".join(folded_partials)
+            if len(folded) >= len(combined):
+                break
+            partials, combined = folded_partials, folded
+            used_fallback = used_fallback or folded_fallback
+        
+        if len(combined) > SUMMARY_CHUNK_CHARS:
+            # Last resort: trim every section evenly to its most central sentences,
+            # so the end of the document is still represented
+            logger.warning(f"Summary notes still {len(combined)} chars after folding; trimming {len(partials)} sections to fit {SUMMARY_CHUNK_CHARS}")
+            telemetry.record_event("summary", AI_MODEL, "truncated")
+            share = max(1, SUMMARY_CHUNK_CHARS // len(partials) - 2)
+            trimmed = await asyncio.to_thread(
+                lambda: [extractive_summarizer.trim(partial, share, language) for partial in partials]
+            )
+            combined = "\n\n".join(trimmed)
+        
+        summary_text = await self._complete_summary(
+            self._get_reduce_prompt(combined, summary_type, language)
+        )
+        return summary_text, used_fallback
+    
+    async def _summarize_chunks(self, chunks: List[str], language: str) -> Tuple[List[str], bool]:
+        """Summarize chunks concurrently under SUMMARY_MAP_CONCURRENCY, preserving order; also returns whether any chunk fell back"""
+        fan_out = asyncio.Semaphore(SUMMARY_MAP_CONCURRENCY)
+        fell_back = []
+        
+        async def summarize_chunk(index: int, chunk: str) -> str:
+            async with fan_out:
+                try:
+                    partial = await self._complete_summary(
+                        self._get_map_prompt(chunk, index + 1, len(chunks), language),
+                        max_tokens=400
+                    )
+                    if partial:
+                        return partial
+                except CircuitOpenError:
+                    # Upstream is down: fail the whole document fast instead of per chunk
+                    raise
+                except Exception as e:
+                    logger.error(f"OpenAI chunk summary error (part {index + 1}/{len(chunks)}): {e}")
+                # One failed chunk should not sink the whole document
+                telemetry.record_event("summary", AI_MODEL, "fallback")
+                fell_back.append(index)
+                return await asyncio.to_thread(self._generate_fallback_summary, chunk, SummaryType.BULLET, language)
+        
+        partials = await asyncio.gather(*[
+            summarize_chunk(index, chunk) for index, chunk in enumerate(chunks)
+        ])
+        return partials, bool(fell_back)
+    
+    def _split_text(self, text: str, max_chars: int) -> List[str]:
+        """Split text into chunks of at most max_chars on page and paragraph boundaries"""
+        pieces = []
+        for block in re.split(r"\f|\n\s*\n", text):
+            block = block.strip()
+            if not block:
+                continue
+            if len(block) <= max_chars:
+                pieces.append(block)
+                continue
+            # Oversized block: break on lines and sentences, hard-splitting as a last resort
+            for piece in re.split(r"\n|(?<=[.!?])\s+", block):
+                piece = piece.strip()
+                while len(piece) > max_chars:
+                    pieces.append(piece[:max_chars])
+                    piece = piece[max_chars:]
+                if piece:
+                    pieces.append(piece)
+        
+        # Pack pieces greedily into chunks
+        chunks = []
+        current = []
+        current_size = 0
+        for piece in pieces:
+            if current and current_size + len(piece) + 2 > max_chars:
+                chunks.append("\n\n".join(current))
+                current = []
+                current_size = 0
+            current.append(piece)
+            current_size += len(piece) + 2
+        if current:
+            chunks.append("\n\n".join(current))
+        
+        return chunks
     
     async def generate_quiz_questions(
         self,
@@ -56,70 +628,384 @@ class AIService:
         difficulty: Difficulty,
         question_types: List[QuestionType]
     ) -> List[Dict[str, Any]]:
-        """Generate AI quiz questions"""
+        """Generate AI quiz questions in concurrent shards, then merge and de-duplicate"""
+        async with aclosing(self.stream_quiz_questions(
+            content, subject, topic, num_questions, difficulty, question_types
+        )) as questions:
+            return [question async for question in questions]
+    
+    async def stream_quiz_questions(
+        self,
+        content: str,
+        subject: str,
+        topic: str,
+        num_questions: int,
+        difficulty: Difficulty,
+        question_types: List[QuestionType]
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Yield validated, de-duplicated quiz questions as soon as the shards stream them in"""
+        accepted = []
+        accepted_words = []
+        
+        def accept(question: Dict[str, Any]) -> bool:
+            words = set(re.findall(r"\w+", question["question"].lower()))
+            if any(
+                words and len(words & other) / len(words | other) >= QUIZ_DUPLICATE_THRESHOLD
+                for other in accepted_words
+            ):
+                return False
+            accepted.append(question["question"])
+            accepted_words.append(words)
+            return True
+        
         try:
-            prompt = self._get_quiz_prompt(
-                content, subject, topic, num_questions, difficulty, question_types
-            )
+            num_shards = max(1, -(-num_questions // QUIZ_SHARD_SIZE))
+            shard_sizes = [num_questions // num_shards + (1 if i < num_questions % num_shards else 0) for i in range(num_shards)]
             
-            response = self.client.chat.completions.create(
-                model="gpt-3.5-turbo",
-                messages=[
-                    {
-                        "role": "system",
-                        "content": "You are an expert educator who creates high-quality quiz questions. Always provide accurate answers and clear explanations. Return only valid JSON."
-                    },
-                    {
-                        "role": "user",
-                        "content": prompt
-                    }
-                ],
-                max_tokens=2000,
-                temperature=0.5
-            )
+            # With several shards and several types, give each shard one type so batches differ
+            shards = []
+            for i, size in enumerate(shard_sizes):
+                shard_types = [question_types[i % len(question_types)]] if num_shards > 1 and question_types else question_types
+                shards.append(self._stream_quiz_shard(content, subject, topic, size, difficulty, shard_types, i + 1, num_shards))
+            
+            # aclosing stops the remaining shard streams as soon as we have enough
+            async with aclosing(self._merge_streams(shards)) as merged:
+                async for question in merged:
+                    if accept(question):
+                        yield question
+                        if len(accepted) >= num_questions:
+                            return
             
-            content = response.choices[0].message.content
-            if not content:
-                raise Exception("No content generated")
+            # Top up once if failures or duplicates left us short
+            missing = num_questions - len(accepted)
+            if accepted and missing > 0:
+                async with aclosing(self._stream_quiz_shard(
+                    content, subject, topic, missing, difficulty, question_types,
+                    num_shards + 1, num_shards + 1, list(accepted)
+                )) as extra:
+                    async for question in extra:
+                        if accept(question):
+                            yield question
+                            if len(accepted) >= num_questions:
+                                return
             
-            # Parse JSON response
-            questions = json.loads(content)
-            return questions if isinstance(questions, list) else []
+            if not accepted:
+                raise Exception("No valid questions generated")
             
         except Exception as e:
             logger.error(f"OpenAI quiz generation error: {e}")
-            return self._generate_fallback_questions(subject, topic, num_questions)
+            if not accepted:
+                telemetry.record_event("quiz", AI_MODEL, "fallback")
+                for question in self._generate_fallback_questions(subject, topic, num_questions):
+                    yield question
+    
+    async def _stream_quiz_shard(
+        self,
+        content: str,
+        subject: str,
+        topic: str,
+        num_questions: int,
+        difficulty: Difficulty,
+        question_types: List[QuestionType],
+        batch: int,
+        total_batches: int,
+        avoid_questions: List[str] = None
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Stream one shard of quiz questions, validating each as its JSON object closes"""
+        prompt = self._get_quiz_prompt(
+            content, subject, topic, num_questions, difficulty, question_types,
+            batch, total_batches, avoid_questions
+        )
+        
+        for attempt in range(QUIZ_SHARD_RETRIES + 1):
+            if attempt:
+                telemetry.record_event("quiz", AI_MODEL, "retry")
+            produced = 0
+            try:
+                parser = JSONArrayStream()
+                async with aclosing(self._stream_completion(
+                    "quiz",
+                    model=AI_MODEL,
+                    messages=[
+                        {
+                            "role": "system",
+                            "content": QUIZ_SYSTEM_PROMPT
+                        },
+                        {
+                            "role": "user",
+                            "content": prompt
+                        }
+                    ],
+                    max_tokens=min(2000, 300 * num_questions + 200),
+                    temperature=0.5
+                )) as chunks:
+                    async for chunk in chunks:
+                        for item in parser.feed(chunk):
+                            question = self._validate_question(item, difficulty)
+                            if question:
+                                produced += 1
+                                yield question
+                        if parser.finished:
+                            # Nothing after the closing bracket is worth waiting for
+                            break
+                
+                if produced:
+                    return
+                raise Exception("No valid questions in shard")
+                
+            except CircuitOpenError:
+                # Retrying cannot help while the circuit is open
+                raise
+            except Exception as e:
+                logger.error(f"OpenAI quiz shard error (batch {batch}/{total_batches}, attempt {attempt + 1}): {e}")
+                if produced:
+                    # Keep what already streamed; the top-up shard covers the rest
+                    return
+    
+    async def _merge_streams(self, streams: List[AsyncIterator]) -> AsyncIterator:
+        """Interleave several async iterators, yielding items in arrival order"""
+        queue = asyncio.Queue()
+        finished = object()
+        
+        async def pump(stream: AsyncIterator):
+            try:
+                async for item in stream:
+                    queue.put_nowait(item)
+            except Exception as e:
+                queue.put_nowait(e)
+            finally:
+                queue.put_nowait(finished)
+        
+        tasks = [asyncio.create_task(pump(stream)) for stream in streams]
+        try:
+            remaining = len(tasks)
+            while remaining:
+                item = await queue.get()
+                if item is finished:
+                    remaining -= 1
+                elif isinstance(item, Exception):
+                    raise item
+                else:
+                    yield item
+        finally:
+            # Stop the other streams once the consumer is done or one failed
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+    
+    def _validate_question(self, question: Any, difficulty: Difficulty) -> Dict[str, Any]:
+        """Normalize a generated question, or return None if it is unusable"""
+        if not isinstance(question, dict):
+            return None
+        
+        question_type = str(question.get("type", "")).strip().lower().replace("-", "_")
+        if question_type.upper() not in QuestionType.__members__:
+            return None
+        
+        text = str(question.get("question", "")).strip()
+        if not text or question.get("correctAnswer") is None:
+            return None
+        
+        options = question.get("options") or []
+        if question_type == "mcq":
+            if not isinstance(options, list) or len(options) < 2:
+                return None
+            try:
+                if not 0 <= int(question["correctAnswer"]) < len(options):
+                    return None
+            except (TypeError, ValueError):
+                return None
+        
+        question_difficulty = str(question.get("difficulty") or difficulty.value).upper()
+        if question_difficulty not in Difficulty.__members__:
+            question_difficulty = difficulty.value
+        
+        normalized = {
+            "type": question_type,
+            "question": text,
+            "options": options if question_type == "mcq" else [],
+            "correctAnswer": question["correctAnswer"],
+            "explanation": str(question.get("explanation") or ""),
+            "difficulty": question_difficulty.lower()
+        }
+        if question.get("topic"):
+            normalized["topic"] = question["topic"]
+        return normalized
     
     async def generate_chat_response(
         self,
         message: str,
         subject: str,
-        conversation_history: List[Dict[str, str]] = None
+        conversation_history: List[Dict[str, str]] = None,
+        memory_digest: str = None,
+        context_passages: List[Dict[str, Any]] = None
     ) -> str:
         """Generate AI chat response"""
+        # Opening questions carry no context, so equivalent ones share an answer; answers grounded in a
+        # student's own documents are never shared
+        cacheable = CHAT_CACHE_ENABLED and not conversation_history and not memory_digest and not context_passages
+        if cacheable:
+            cached_answer = semantic_cache.get(subject, message)
+            if cached_answer:
+                telemetry.record_event("chat", AI_MODEL, "cache_hit")
+                return cached_answer
+        
         try:
-            system_prompt = f"You are an AI study assistant specializing in {subject}. You help students understand concepts, solve problems, and learn effectively. Be encouraging, clear, and educational in your responses. If you don't know something, admit it and suggest how the student can find the answer."
+            messages = self._get_chat_messages(message, subject, conversation_history, memory_digest, context_passages)
             
-            messages = [{"role": "system", "content": system_prompt}]
+            completion_args = dict(
+                model=AI_MODEL,
+                messages=messages,
+                max_tokens=1000,
+                temperature=0.7
+            )
+            response = await self._create_completion("chat", hedge=AI_HEDGE_CHAT, **completion_args)
+            
+            answer = response.choices[0].message.content
+            if not answer:
+                return "I apologize, but I cannot provide a response at this time."
             
-            # Add conversation history
-            if conversation_history:
-                messages.extend(conversation_history[-10:])  # Keep last 10 messages
+            if cacheable:
+                semantic_cache.set(subject, message, answer)
+            return answer
             
-            messages.append({"role": "user", "content": message})
+        except Exception as e:
+            logger.error(f"OpenAI chat error: {e}")
+            telemetry.record_event("chat", AI_MODEL, "fallback")
+            return self._generate_fallback_chat_response(message, subject)
+    
+    async def stream_chat_response(
+        self,
+        message: str,
+        subject: str,
+        conversation_history: List[Dict[str, str]] = None,
+        memory_digest: str = None,
+        context_passages: List[Dict[str, Any]] = None
+    ) -> AsyncIterator[str]:
+        """Stream AI chat response tokens as they are generated"""
+        cacheable = CHAT_CACHE_ENABLED and not conversation_history and not memory_digest and not context_passages
+        if cacheable:
+            cached_answer = semantic_cache.get(subject, message)
+            if cached_answer:
+                telemetry.record_event("chat", AI_MODEL, "cache_hit")
+                yield cached_answer
+                return
+        
+        has_content = False
+        try:
+            messages = self._get_chat_messages(message, subject, conversation_history, memory_digest, context_passages)
             
-            response = self.client.chat.completions.create(
-                model="gpt-3.5-turbo",
+            tokens = []
+            # aclosing releases the slot and upstream stream as soon as the client goes away
+            async with aclosing(self._stream_completion(
+                "chat",
+                model=AI_MODEL,
                 messages=messages,
                 max_tokens=1000,
                 temperature=0.7
+            )) as chunks:
+                async for token in chunks:
+                    has_content = True
+                    tokens.append(token)
+                    yield token
+            
+            # Only complete replies are cached
+            if cacheable and has_content:
+                semantic_cache.set(subject, message, "".join(tokens))
+            
+        except Exception as e:
+            logger.error(f"OpenAI chat stream error: {e}")
+            # Only fall back if nothing was sent; a partial reply is kept as-is
+            if not has_content:
+                has_content = True
+                telemetry.record_event("chat", AI_MODEL, "fallback")
+                yield self._generate_fallback_chat_response(message, subject)
+        
+        if not has_content:
+            yield "I apologize, but I cannot provide a response at this time."
+    
+    async def generate_conversation_digest(
+        self,
+        subject: str,
+        previous_digest: str,
+        turns: List[Dict[str, str]],
+        max_tokens: int = 400
+    ) -> str:
+        """Fold older chat turns into the running conversation digest; returns None on failure"""
+        try:
+            transcript = "\n".join(
+                f"{'Student' if turn['role'] == 'user' else 'Tutor'}: {turn['content']}" for turn in turns
+            )
+            
+            response = await self._create_completion(
+                "memory",
+                model=AI_MODEL,
+                messages=[
+                    {
+                        "role": "system",
+                        "content": "You maintain a compact running memory of a tutoring conversation. Keep facts about the student, their goals, topics covered, explanations given and open questions. Drop small talk."
+                    },
+                    {
+                        "role": "user",
+                        "content": self._get_digest_prompt(subject, previous_digest, transcript, max_tokens)
+                    }
+                ],
+                max_tokens=max_tokens,
+                temperature=0.2
             )
             
-            return response.choices[0].message.content or "I apologize, but I cannot provide a response at this time."
+            return response.choices[0].message.content or None
             
         except Exception as e:
-            logger.error(f"OpenAI chat error: {e}")
-            return self._generate_fallback_chat_response(message, subject)
+            logger.error(f"OpenAI conversation digest error: {e}")
+            return None
+    
+    def _get_digest_prompt(self, subject: str, previous_digest: str, transcript: str, max_tokens: int) -> str:
+        """Get the prompt for updating a conversation digest"""
+        return f"""Update the memory of this {subject} tutoring session with the new turns below.
+        Keep it under {int(max_tokens * 0.75)} words and write it as plain notes.
+        
+        Current memory: {previous_digest or "(empty)"}
+        
+        New turns:
+        {transcript}"""
+    
+    def _get_chat_messages(
+        self,
+        message: str,
+        subject: str,
+        conversation_history: List[Dict[str, str]] = None,
+        memory_digest: str = None,
+        context_passages: List[Dict[str, Any]] = None
+    ) -> List[Dict[str, str]]:
+        """Build the chat completion message list"""
+        system_prompt = f"You are an AI study assistant specializing in {subject}. You help students understand concepts, solve problems, and learn effectively. Be encouraging, clear, and educational in your responses. If you don't know something, admit it and suggest how the student can find the answer."
+        
+        messages = [{"role": "system", "content": system_prompt}]
+        
+        # Add the running digest of turns older than the history window
+        if memory_digest:
+            messages.append({
+                "role": "system",
+                "content": f"Summary of the earlier conversation with this student: {memory_digest}"
+            })
+        
+        # Add passages retrieved from the student's uploaded documents
+        if context_passages:
+            excerpts = "\n\n".join(
+                f"[{i}] {passage['name']}: {passage['text']}" for i, passage in enumerate(context_passages, 1)
+            )
+            messages.append({
+                "role": "system",
+                "content": f"Excerpts from the student's uploaded study materials. Use them when they are relevant to the question and mention which document an answer comes from.\n\n{excerpts}"
+            })
+        
+        # Add conversation history (already trimmed to CHAT_HISTORY_TOKEN_BUDGET by the caller)
+        if conversation_history:
+            messages.extend(conversation_history)
+        
+        messages.append({"role": "user", "content": message})
+        return messages
     
     def _get_summary_prompt(self, text: str, summary_type: SummaryType, language: str) -> str:
         """Get the appropriate prompt for summary generation"""
@@ -132,6 +1018,22 @@ class AIService:
         else:
             return f"Summarize the following text. Language: {language}\n\nText: {text}"
     
+    def _get_map_prompt(self, chunk: str, part: int, total_parts: int, language: str) -> str:
+        """Get the prompt for summarizing one section of a long document"""
+        return f"This is part {part} of {total_parts} of a longer document. Summarize it into concise notes that keep every key concept, definition and important detail. Language: {language}\n\nText: {chunk}"
+    
+    def _get_reduce_prompt(self, partials: str, summary_type: SummaryType, language: str) -> str:
+        """Get the prompt for merging section summaries into the final summary"""
+        intro = "The following are notes summarizing consecutive sections of one long document."
+        if summary_type == SummaryType.BULLET:
+            return f"{intro} Combine them into clear, concise bullet points covering the key concepts and main ideas of the whole document. Language: {language}\n\nNotes: {partials}"
+        elif summary_type == SummaryType.PARAGRAPH:
+            return f"{intro} Combine them into a well-structured paragraph that captures the main ideas and key points of the whole document. Language: {language}\n\nNotes: {partials}"
+        elif summary_type == SummaryType.DETAILED:
+            return f"{intro} Combine them into a comprehensive summary of the whole document, including main concepts, key details, and important insights. Language: {language}\n\nNotes: {partials}"
+        else:
+            return f"{intro} Combine them into a summary of the whole document. Language: {language}\n\nNotes: {partials}"
+    
     def _get_quiz_prompt(
         self, 
         content: str, 
@@ -139,12 +1041,22 @@ class AIService:
         topic: str, 
         num_questions: int, 
         difficulty: Difficulty, 
-        question_types: List[QuestionType]
+        question_types: List[QuestionType],
+        batch: int = 1,
+        total_batches: int = 1,
+        avoid_questions: List[str] = None
     ) -> str:
         """Get the appropriate prompt for quiz generation"""
+        batch_note = ""
+        if total_batches > 1:
+            batch_note = f"This is batch {batch} of {total_batches} generated in parallel; focus on a different aspect of the content than other batches would (e.g. part {batch} of the material)."
+        if avoid_questions:
+            batch_note += " Do not repeat any of these existing questions: " + " | ".join(avoid_questions)
+        
         return f"""Generate {num_questions} quiz questions about {topic} in {subject}. 
-        Difficulty: {difficulty}
-        Question types: {', '.join(question_types)}
+        Difficulty: {difficulty.value}
+        Question types: {', '.join(t.value for t in question_types)}
+        {batch_note}
         
         Content to base questions on: {content}
         
@@ -161,19 +1073,9 @@ class AIService:
             }}
         ]"""
     
-    def _generate_fallback_summary(self, text: str, summary_type: SummaryType) -> str:
-        """Generate a fallback summary when AI is unavailable"""
-        sentences = [s.strip() for s in text.split('.') if s.strip()]
-        key_sentences = sentences[:5]  # Take first 5 sentences
-        
-        if summary_type == SummaryType.BULLET:
-            return '\n'.join([f"• {sentence}" for sentence in key_sentences])
-        elif summary_type == SummaryType.PARAGRAPH:
-            return '. '.join(key_sentences) + '.'
-        elif summary_type == SummaryType.DETAILED:
-            return f"Summary:\n\n{'. '.join(key_sentences)}.\n\nKey points:\n" + '\n'.join([f"- {sentence}" for sentence in key_sentences])
-        else:
-            return '. '.join(key_sentences) + '.'
+    def _generate_fallback_summary(self, text: str, summary_type: SummaryType, language: str = "english") -> str:
+        """Generate a local extractive summary when AI is unavailable"""
+        return extractive_summarizer.summarize(text, summary_type, language)
     
     def _generate_fallback_questions(self, subject: str, topic: str, num_questions: int) -> List[Dict[str, Any]]:
         """Generate fallback questions when AI is unavailable"""
@@ -0,0 +1,136 @@
+import logging
+import os
+from typing import List, Dict, Any
+
+from bson import ObjectId
+
+from models.chat import MessageType
+from services.ai_service import ai_service
+from services.token_counter import count_tokens, MESSAGE_TOKEN_OVERHEAD
+
+logger = logging.getLogger(__name__)
+
+# Configure conversation history sent with each message
+CHAT_HISTORY_TOKEN_BUDGET = int(os.getenv("CHAT_HISTORY_TOKEN_BUDGET", "2000"))
+CHAT_HISTORY_MAX_MESSAGES = int(os.getenv("CHAT_HISTORY_MAX_MESSAGES", "50"))  # upper bound on messages scanned
+
+# Configure rolling session memory
+CHAT_MEMORY_TRIGGER_TOKENS = int(os.getenv("CHAT_MEMORY_TRIGGER_TOKENS", str(CHAT_HISTORY_TOKEN_BUDGET)))  # undigested tokens before folding
+CHAT_MEMORY_KEEP_TOKENS = int(os.getenv("CHAT_MEMORY_KEEP_TOKENS", str(CHAT_HISTORY_TOKEN_BUDGET // 2)))  # newest tokens left verbatim
+CHAT_MEMORY_FOLD_TOKENS = int(os.getenv("CHAT_MEMORY_FOLD_TOKENS", "3000"))  # max transcript tokens per digest call
+CHAT_MEMORY_DIGEST_TOKENS = int(os.getenv("CHAT_MEMORY_DIGEST_TOKENS", "400"))
+
+# Sessions with a digest update running in this process
+_updating_sessions = set()
+
+def message_tokens(msg_doc: Dict[str, Any]) -> int:
+    """Prompt tokens of a stored message, counting legacy messages on the fly"""
+    token_count = msg_doc.get("token_count")
+    if token_count is None:
+        token_count = count_tokens(msg_doc["content"])
+    return token_count + MESSAGE_TOKEN_OVERHEAD
+
+def to_chat_turn(msg_doc: Dict[str, Any]) -> Dict[str, str]:
+    return {
+        "role": "user" if msg_doc["type"] == MessageType.USER.value else "assistant",
+        "content": msg_doc["content"]
+    }
+
+async def get_conversation_history(db, session_doc: Dict[str, Any]) -> List[dict]:
+    """Get the most recent undigested messages of a session that fit in CHAT_HISTORY_TOKEN_BUDGET"""
+    query = {"session_id": str(session_doc["_id"])}
+    if session_doc.get("memory_until"):
+        # Older turns are already folded into the session digest
+        query["_id"] = {"$gt": session_doc["memory_until"]}
+    
+    history = []
+    budget = CHAT_HISTORY_TOKEN_BUDGET
+    
+    async for msg_doc in db.database.chat_messages.find(
+        query,
+        {"type": 1, "content": 1, "token_count": 1}
+    ).sort("_id", -1).limit(CHAT_HISTORY_MAX_MESSAGES):
+        budget -= message_tokens(msg_doc)
+        if budget < 0:
+            break
+        history.append(to_chat_turn(msg_doc))
+    
+    # Reverse to get chronological order
+    history.reverse()
+    return history
+
+async def update_session_memory(db, session_id: str):
+    """Fold turns older than the recent window into the session's running digest"""
+    if session_id in _updating_sessions:
+        return
+    _updating_sessions.add(session_id)
+    
+    try:
+        session_doc = await db.database.chat_sessions.find_one(
+            {"_id": ObjectId(session_id)},
+            {"subject": 1, "memory_digest": 1, "memory_until": 1}
+        )
+        if not session_doc:
+            return
+        
+        query = {"session_id": session_id}
+        if session_doc.get("memory_until"):
+            query["_id"] = {"$gt": session_doc["memory_until"]}
+        
+        messages = await db.database.chat_messages.find(
+            query,
+            {"type": 1, "content": 1, "token_count": 1}
+        ).sort("_id", 1).to_list(None)
+        
+        tokens = [message_tokens(msg_doc) for msg_doc in messages]
+        if sum(tokens) <= CHAT_MEMORY_TRIGGER_TOKENS:
+            return
+        
+        # Keep the newest CHAT_MEMORY_KEEP_TOKENS verbatim; everything before is folded
+        split = len(messages)
+        kept = 0
+        while split > 0 and kept + tokens[split - 1] <= CHAT_MEMORY_KEEP_TOKENS:
+            split -= 1
+            kept += tokens[split]
+        
+        digest = session_doc.get("memory_digest")
+        memory_until = session_doc.get("memory_until")
+        start = 0
+        while start < split:
+            # Fold in batches so a long backlog never becomes one huge prompt
+            end = start
+            batch_tokens = 0
+            while end < split and (end == start or batch_tokens + tokens[end] <= CHAT_MEMORY_FOLD_TOKENS):
+                batch_tokens += tokens[end]
+                end += 1
+            
+            new_digest = await ai_service.generate_conversation_digest(
+                session_doc.get("subject", "general"),
+                digest,
+                [to_chat_turn(msg_doc) for msg_doc in messages[start:end]],
+                CHAT_MEMORY_DIGEST_TOKENS
+            )
+            if not new_digest:
+                # Model unavailable: leave the turns undigested and retry on a later message
+                return
+            
+            # Only advance if nobody else moved the digest meanwhile
+            result = await db.database.chat_sessions.update_one(
+                {"_id": ObjectId(session_id), "memory_until": memory_until},
+                {"$set": {
+                    "memory_digest": new_digest,
+                    "memory_until": messages[end - 1]["_id"],
+                    "memory_token_count": count_tokens(new_digest)
+                }}
+            )
+            if result.modified_count == 0:
+                return
+            
+            digest = new_digest
+            memory_until = messages[end - 1]["_id"]
+            start = end
+    
+    except Exception as e:
+        logger.error(f"Update session memory error: {e}")
+    finally:
+        _updating_sessions.discard(session_id)
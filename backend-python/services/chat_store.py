@@ -0,0 +1,34 @@
+import os
+from datetime import datetime
+from typing import Dict, Any
+
+from bson import ObjectId
+
+# Configure the last-message preview kept on each chat session
+CHAT_PREVIEW_CHARS = int(os.getenv("CHAT_PREVIEW_CHARS", "200"))
+
+def message_preview(content: str) -> str:
+    """Shortened message text stored on the session for session lists"""
+    content = " ".join(content.split())
+    if len(content) <= CHAT_PREVIEW_CHARS:
+        return content
+    return content[:CHAT_PREVIEW_CHARS - 1].rstrip() + "…"
+
+async def insert_message(db, message_doc: Dict[str, Any]) -> ObjectId:
+    """Store a chat message and update its session's message count and last-message preview"""
+    result = await db.database.chat_messages.insert_one(message_doc)
+    
+    # One atomic update keeps the session's denormalized fields in step with its messages
+    await db.database.chat_sessions.update_one(
+        {"_id": ObjectId(message_doc["session_id"])},
+        {
+            "$inc": {"message_count": 1},
+            "$set": {
+                "last_message": message_preview(message_doc["content"]),
+                "last_message_at": message_doc["created_at"],
+                "updated_at": datetime.utcnow()
+            }
+        }
+    )
+    
+    return result.inserted_id
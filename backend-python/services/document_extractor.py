@@ -0,0 +1,227 @@
+import asyncio
+import io
+import logging
+import multiprocessing
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable, Dict, Union, Optional, List, Tuple, AsyncIterator
+
+from services.page_cache import page_cache
+
+logger = logging.getLogger(__name__)
+
+# Configure document text extraction
+EXTRACTION_WORKERS = int(os.getenv("EXTRACTION_WORKERS", str(min(4, os.cpu_count() or 1))))  # parser processes
+EXTRACTION_TIMEOUT = float(os.getenv("EXTRACTION_TIMEOUT", "60"))  # seconds of parsing per document, not counting time queued for a worker
+EXTRACTION_MAX_PAGES = int(os.getenv("EXTRACTION_MAX_PAGES", "500"))  # longer PDFs are rejected
+EXTRACTION_PAGES_PER_JOB = int(os.getenv("EXTRACTION_PAGES_PER_JOB", "25"))  # PDF pages parsed per worker job
+
+class DocumentTooLarge(Exception):
+    """Raised when a document exceeds EXTRACTION_MAX_PAGES or a text file exceeds the upload character limit"""
+
+class ExtractionTimeout(Exception):
+    """Raised when a document is not parsed within EXTRACTION_TIMEOUT"""
+
+def extract_pdf_pages(source: Union[bytes, str], start: int, end: int, max_pages: int = EXTRACTION_MAX_PAGES) -> Tuple[int, List[str]]:
+    """Extract the text of pages [start, end) from PDF bytes or a spooled file path (runs in a worker process)"""
+    import PyPDF2
+    
+    pdf_reader = PyPDF2.PdfReader(io.BytesIO(source) if isinstance(source, bytes) else source)
+    page_count = len(pdf_reader.pages)
+    if page_count > max_pages:
+        raise DocumentTooLarge(f"PDF has {page_count} pages; the maximum is {max_pages}")
+    
+    return page_count, [pdf_reader.pages[index].extract_text() for index in range(start, min(end, page_count))]
+
+def extract_docx(source: Union[bytes, str]) -> str:
+    """Extract text from DOCX bytes or a spooled file path (runs in a worker process)"""
+    from docx import Document
+    
+    doc = Document(io.BytesIO(source) if isinstance(source, bytes) else source)
+    
+    return "\n".join(paragraph.text for paragraph in doc.paragraphs).strip()
+
+class ExtractionBudget:
+    """Time allowed for one document, counted from when its first parser job starts running"""
+    
+    def __init__(self, seconds: float = EXTRACTION_TIMEOUT):
+        self.seconds = seconds
+        self.deadline = None
+    
+    def remaining(self, now: float) -> float:
+        if self.deadline is None:
+            self.deadline = now + self.seconds
+        return self.deadline - now
+
+class ExtractionPool:
+    """Runs CPU-bound document parsers in a process pool, replacing workers that hang or crash"""
+    
+    def __init__(self, workers: int = EXTRACTION_WORKERS, timeout: float = EXTRACTION_TIMEOUT):
+        self.workers = workers
+        self.timeout = timeout
+        self.pool = None
+        # At most one job per worker is submitted, so a job's timeout never includes time queued in the pool
+        self.slots = asyncio.Semaphore(workers)
+        self.pool_jobs: Dict[ProcessPoolExecutor, int] = {}  # pool -> jobs submitted to it and not yet returned
+        self.retiring = set()  # pools with a hung worker, killed once their other jobs return
+        self.running = 0
+        self.waiting = 0
+        self.timeouts = 0
+        self.crashes = 0
+    
+    def _get_pool(self) -> ProcessPoolExecutor:
+        if self.pool is None:
+            # Spawned workers do not inherit the event loop, sockets or threads of the API process
+            self.pool = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+            self.pool_jobs[self.pool] = 0
+        return self.pool
+    
+    def _retire(self, pool: ProcessPoolExecutor):
+        """Send new jobs to a fresh pool; the old one is killed when its last job returns"""
+        if self.pool is pool:
+            self.pool = None
+        self.retiring.add(pool)
+        if not self.pool_jobs.get(pool):
+            self._kill(pool)
+    
+    def _kill(self, pool: ProcessPoolExecutor):
+        """Kill a pool's workers"""
+        if self.pool is pool:
+            self.pool = None
+        self.retiring.discard(pool)
+        self.pool_jobs.pop(pool, None)
+        for process in list((pool._processes or {}).values()):
+            if process.is_alive():
+                process.kill()
+        pool.shutdown(wait=False, cancel_futures=True)
+    
+    async def run(self, func: Callable, *args, budget: Optional[ExtractionBudget] = None):
+        """Run func(*args) in a worker process, timing it out after self.timeout or the document's budget"""
+        loop = asyncio.get_running_loop()
+        self.waiting += 1
+        try:
+            await self.slots.acquire()
+        finally:
+            self.waiting -= 1
+        
+        self.running += 1
+        try:
+            for attempt in range(2):
+                # The clock starts once a worker is free for this job
+                timeout = self.timeout if budget is None else min(self.timeout, budget.remaining(loop.time()))
+                if timeout <= 0:
+                    self.timeouts += 1
+                    raise ExtractionTimeout(f"Document took longer than {budget.seconds:.0f}s to process")
+                
+                pool = self._get_pool()
+                self.pool_jobs[pool] += 1
+                try:
+                    return await asyncio.wait_for(loop.run_in_executor(pool, func, *args), timeout=timeout)
+                except asyncio.TimeoutError:
+                    self.timeouts += 1
+                    logger.error(f"Document extraction timed out after {timeout:.1f}s, retiring parser pool")
+                    self._retire(pool)
+                    raise ExtractionTimeout(f"Document took longer than {self.timeout if budget is None else budget.seconds:.0f}s to process")
+                except BrokenProcessPool:
+                    # A worker died and took the pool with it; retry once on a fresh pool
+                    self.crashes += 1
+                    logger.error("Document parser process died, restarting parser pool")
+                    self._kill(pool)
+                    if attempt:
+                        raise
+                finally:
+                    if pool in self.pool_jobs:
+                        self.pool_jobs[pool] -= 1
+                        if pool in self.retiring and not self.pool_jobs[pool]:
+                            self._kill(pool)
+        finally:
+            self.running -= 1
+            self.slots.release()
+    
+    def shutdown(self):
+        for pool in list(self.retiring):
+            self._kill(pool)
+        if self.pool is not None:
+            self.pool.shutdown(wait=False, cancel_futures=True)
+            self.pool = None
+    
+    def get_stats(self):
+        return {
+            "workers": self.workers,
+            "running": self.running,
+            "waiting": self.waiting,
+            "retiring": len(self.retiring),
+            "timeouts": self.timeouts,
+            "crashes": self.crashes
+        }
+
+# Global extraction pool instance
+extraction_pool = ExtractionPool()
+
+async def extract_pdf_document(source: Union[bytes, str], digest: str, first_page: int = 0, last_page: Optional[int] = None) -> str:
+    """Extract pages [first_page, last_page) of a PDF as one string"""
+    texts = [text async for _, text in stream_pdf_document(source, digest, first_page, last_page)]
+    return "\n".join(texts).strip()
+
+async def stream_pdf_document(source: Union[bytes, str], digest: str, first_page: int = 0, last_page: Optional[int] = None) -> AsyncIterator[Tuple[int, str]]:
+    """Yield (page index, text) in order, reusing cached pages and parsing the rest in parallel ranges within one EXTRACTION_TIMEOUT budget"""
+    pages = {}
+    budget = ExtractionBudget()
+    page_count = await page_cache.get_page_count(digest)
+    
+    if page_count is None:
+        # The first range also reports the page count needed to plan the rest
+        page_count, texts = await extraction_pool.run(
+            extract_pdf_pages, source, first_page, first_page + EXTRACTION_PAGES_PER_JOB, EXTRACTION_MAX_PAGES,
+            budget=budget
+        )
+        pages = dict(zip(range(first_page, first_page + len(texts)), texts))
+        await page_cache.set_pages(digest, page_count, pages)
+    
+    end = page_count if last_page is None else min(last_page, page_count)
+    wanted = list(range(first_page, end))
+    pages.update(await page_cache.get_pages(digest, [page for page in wanted if page not in pages]))
+    
+    # Split uncached pages into contiguous ranges of at most EXTRACTION_PAGES_PER_JOB
+    ranges = []
+    for page in wanted:
+        if page in pages:
+            continue
+        if ranges and ranges[-1][1] == page and page - ranges[-1][0] < EXTRACTION_PAGES_PER_JOB:
+            ranges[-1][1] = page + 1
+        else:
+            ranges.append([page, page + 1])
+    
+    # At most one range per parser worker is in flight; pages are yielded in order as their range finishes
+    queued = deque(ranges)
+    tasks = {}
+    
+    def start_ranges():
+        while queued and len(tasks) < extraction_pool.workers:
+            start, stop = queued.popleft()
+            tasks[start] = asyncio.ensure_future(
+                extraction_pool.run(extract_pdf_pages, source, start, stop, EXTRACTION_MAX_PAGES, budget=budget)
+            )
+    
+    start_ranges()
+    try:
+        for page in wanted:
+            if page in tasks:
+                _, texts = await tasks.pop(page)
+                start_ranges()
+                extracted = dict(zip(range(page, page + len(texts)), texts))
+                await page_cache.set_pages(digest, page_count, extracted)
+                pages.update(extracted)
+            if page in pages:
+                yield page, pages.pop(page)
+    finally:
+        for task in tasks.values():
+            if task.done() and not task.cancelled():
+                task.exception()
+            else:
+                task.cancel()
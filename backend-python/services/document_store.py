@@ -0,0 +1,151 @@
+import logging
+import os
+import shutil
+import uuid
+from datetime import datetime
+from typing import Optional, Dict, Any, Union
+
+import aiofiles
+from bson import ObjectId
+from pymongo import ReturnDocument
+
+logger = logging.getLogger(__name__)
+
+# Configure document store settings
+DOCUMENT_STORE_PATH = os.getenv("DOCUMENT_STORE_PATH", os.path.join(os.getenv("UPLOAD_PATH", "./uploads"), "documents"))
+
+class DocumentStore:
+    """Content-addressed store of uploaded files and their extracted text, keyed by SHA-256"""
+    
+    def __init__(self, root: str = DOCUMENT_STORE_PATH):
+        self.root = root
+        self.hits = 0
+        self.misses = 0
+        self.stored = 0
+    
+    def _path(self, digest: str, suffix: str = "") -> str:
+        return os.path.join(self.root, digest[:2], digest + suffix)
+    
+    def stored_path(self, digest: str) -> Optional[str]:
+        """Path of the stored file with this digest, or None"""
+        path = self._path(digest)
+        return path if os.path.exists(path) else None
+    
+    async def load_extracted_text(self, digest: str) -> Optional[str]:
+        """Text previously extracted from the file with this digest, or None"""
+        path = self._path(digest, ".txt")
+        if not os.path.exists(path):
+            self.misses += 1
+            return None
+        
+        async with aiofiles.open(path, "r", encoding="utf-8") as text_file:
+            text = await text_file.read()
+        self.hits += 1
+        return text
+    
+    async def save(self, digest: str, source: Union[bytes, str], text: str):
+        """Store a file and its extracted text; a spooled file is moved into place rather than copied"""
+        os.makedirs(os.path.dirname(self._path(digest)), exist_ok=True)
+        
+        blob_path = self._path(digest)
+        if not os.path.exists(blob_path):
+            if isinstance(source, str):
+                try:
+                    os.replace(source, blob_path)
+                except OSError:
+                    # Spool and store on different filesystems
+                    temp_path = f"{blob_path}.{uuid.uuid4().hex}.tmp"
+                    shutil.copyfile(source, temp_path)
+                    os.replace(temp_path, blob_path)
+            else:
+                await self._write_atomic(blob_path, source, "wb")
+        
+        # Text is written last, so its presence means the document is complete
+        await self._write_atomic(self._path(digest, ".txt"), text, "w")
+        self.stored += 1
+    
+    async def _write_atomic(self, path: str, content: Union[bytes, str], mode: str):
+        temp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        try:
+            if "b" in mode:
+                async with aiofiles.open(temp_path, mode) as temp_file:
+                    await temp_file.write(content)
+            else:
+                async with aiofiles.open(temp_path, mode, encoding="utf-8") as temp_file:
+                    await temp_file.write(content)
+            os.replace(temp_path, path)
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+    
+    async def register(self, db, user_id: str, digest: str, original_name: str, file_type: str, text: str) -> Dict[str, Any]:
+        """Record that a user uploaded a stored document and return the user's document record"""
+        now = datetime.utcnow()
+        return await db.database.documents.find_one_and_update(
+            {"user_id": user_id, "digest": digest},
+            {
+                "$set": {
+                    "original_name": original_name,
+                    "file_type": file_type,
+                    "word_count": len(text.split()),
+                    "character_count": len(text),
+                    "updated_at": now
+                },
+                "$setOnInsert": {"created_at": now}
+            },
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+    
+    async def get(self, db, user_id: str, document_id: str) -> Optional[Dict[str, Any]]:
+        """A user's document record, or None if it does not exist or belongs to someone else"""
+        if not ObjectId.is_valid(document_id):
+            return None
+        return await db.database.documents.find_one({"_id": ObjectId(document_id), "user_id": user_id})
+    
+    async def load_text(self, db, user_id: str, document_id: str) -> Optional[str]:
+        """Extracted text of a user's document"""
+        document_doc = await self.get(db, user_id, document_id)
+        if not document_doc:
+            return None
+        return await self.load_extracted_text(document_doc["digest"])
+    
+    async def delete_user_documents(self, db, user_id: str) -> int:
+        """Delete a user's document records, then the stored file and text of every digest no other record references"""
+        digests = await db.database.documents.distinct("digest", {"user_id": user_id})
+        await db.database.documents.delete_many({"user_id": user_id})
+        
+        removed = 0
+        for digest in digests:
+            if await db.database.documents.find_one({"digest": digest}, {"_id": 1}):
+                continue
+            # Text first: without it the document reads as missing rather than complete
+            for path in (self._path(digest, ".txt"), self._path(digest)):
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+            removed += 1
+        return removed
+    
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "stored": self.stored
+        }
+    
+    @staticmethod
+    def format(document_doc: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "id": str(document_doc["_id"]),
+            "originalName": document_doc["original_name"],
+            "fileType": document_doc["file_type"],
+            "wordCount": document_doc["word_count"],
+            "characterCount": document_doc["character_count"],
+            "createdAt": document_doc["created_at"],
+            "updatedAt": document_doc["updated_at"]
+        }
+
+# Global document store instance
+document_store = DocumentStore()
@@ -0,0 +1,126 @@
+import logging
+import os
+import re
+from typing import List
+
+import numpy as np
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+from models.summary import SummaryType
+
+logger = logging.getLogger(__name__)
+
+# Configure extractive summarization
+TEXTRANK_MAX_SENTENCES = int(os.getenv("TEXTRANK_MAX_SENTENCES", "2000"))  # candidates ranked by TextRank
+TEXTRANK_DAMPING = 0.85
+TEXTRANK_MAX_ITERATIONS = 50
+TEXTRANK_TOLERANCE = 1e-6
+
+# Sentences picked per summary type
+SUMMARY_SENTENCES = {
+    SummaryType.BULLET: 7,
+    SummaryType.PARAGRAPH: 5,
+    SummaryType.DETAILED: 12,
+}
+
+_SENTENCE_SPLIT = re.compile(r"(?<=[.!?])\s+|\n+")
+
+def split_sentences(text: str) -> List[str]:
+    """Split text into sentences, dropping fragments too short to stand alone"""
+    sentences = []
+    for sentence in _SENTENCE_SPLIT.split(text):
+        sentence = " ".join(sentence.split())
+        if len(sentence.split()) >= 4:
+            sentences.append(sentence)
+    return sentences
+
+def rank_sentences(sentences: List[str], language: str = "english") -> np.ndarray:
+    """Score sentences by TextRank centrality over TF-IDF cosine similarity"""
+    vectorizer = TfidfVectorizer(
+        stop_words="english" if language.lower() == "english" else None,
+        sublinear_tf=True,
+        dtype=np.float32
+    )
+    vectors = vectorizer.fit_transform(sentences)  # rows are L2-normalized
+    
+    # Prefilter very long documents by similarity to the document centroid,
+    # keeping the dense similarity matrix below TEXTRANK_MAX_SENTENCES squared
+    scores = np.zeros(len(sentences), dtype=np.float32)
+    candidates = np.arange(len(sentences))
+    if len(sentences) > TEXTRANK_MAX_SENTENCES:
+        centroid = np.asarray(vectors.mean(axis=0)).ravel()
+        centrality = vectors @ centroid
+        candidates = np.sort(np.argpartition(-centrality, TEXTRANK_MAX_SENTENCES)[:TEXTRANK_MAX_SENTENCES])
+        vectors = vectors[candidates]
+    
+    similarity = (vectors @ vectors.T).toarray()
+    np.fill_diagonal(similarity, 0.0)
+    
+    # Row-normalize into a transition matrix; isolated sentences jump uniformly
+    row_sums = similarity.sum(axis=1, keepdims=True)
+    count = similarity.shape[0]
+    transition = np.divide(similarity, row_sums, out=np.full_like(similarity, 1.0 / count), where=row_sums > 0)
+    
+    # Power iteration for the stationary distribution
+    rank = np.full(count, 1.0 / count, dtype=np.float32)
+    teleport = (1.0 - TEXTRANK_DAMPING) / count
+    for _ in range(TEXTRANK_MAX_ITERATIONS):
+        updated = teleport + TEXTRANK_DAMPING * (transition.T @ rank)
+        if np.abs(updated - rank).sum() < TEXTRANK_TOLERANCE:
+            rank = updated
+            break
+        rank = updated
+    
+    scores[candidates] = rank
+    return scores
+
+def summarize(text: str, summary_type: SummaryType, language: str = "english") -> str:
+    """Build an extractive summary from the most central sentences, in document order"""
+    sentences = split_sentences(text)
+    if not sentences:
+        sentences = [" ".join(text.split())] if text.strip() else []
+    
+    num_sentences = SUMMARY_SENTENCES.get(summary_type, 5)
+    if len(sentences) > num_sentences:
+        try:
+            scores = rank_sentences(sentences, language)
+            top = np.sort(np.argpartition(-scores, num_sentences)[:num_sentences])
+            key_sentences = [sentences[i] for i in top]
+        except ValueError as e:
+            # e.g. empty vocabulary after stop-word removal
+            logger.warning(f"Extractive ranking failed, using leading sentences: {e}")
+            key_sentences = sentences[:num_sentences]
+    else:
+        key_sentences = sentences
+    
+    if summary_type == SummaryType.BULLET:
+        return '\n'.join([f"• {sentence}" for sentence in key_sentences])
+    elif summary_type == SummaryType.DETAILED:
+        overview = ' '.join(key_sentences[:5])
+        return f"Summary:\n\n{overview}\n\nKey points:\n" + '\n'.join([f"- {sentence}" for sentence in key_sentences])
+    else:
+        return ' '.join(key_sentences)
+
+def trim(text: str, max_chars: int, language: str = "english") -> str:
+    """Keep the most central sentences of text that fit in max_chars, in document order"""
+    if len(text) <= max_chars:
+        return text
+    sentences = split_sentences(text)
+    if len(sentences) < 2:
+        return text[:max_chars]
+    
+    try:
+        order = np.argsort(-rank_sentences(sentences, language), kind="stable")
+    except ValueError:
+        order = np.arange(len(sentences))
+    
+    kept = []
+    size = 0
+    for index in order:
+        if size + len(sentences[index]) + 1 > max_chars:
+            continue
+        kept.append(index)
+        size += len(sentences[index]) + 1
+    if not kept:
+        return text[:max_chars]
+    return " ".join(sentences[i] for i in sorted(kept))
@@ -0,0 +1,229 @@
+import asyncio
+import logging
+import os
+from datetime import datetime, timedelta
+from typing import Dict, Any, Callable, Awaitable, Optional
+
+from bson import ObjectId
+from pymongo import ReturnDocument
+
+logger = logging.getLogger(__name__)
+
+# Configure background generation jobs
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "4"))  # jobs generated concurrently per process
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))  # runs before a job is marked failed
+JOB_HEARTBEAT_INTERVAL = float(os.getenv("JOB_HEARTBEAT_INTERVAL", "10"))  # seconds between running-job heartbeats
+JOB_STALE_AFTER = float(os.getenv("JOB_STALE_AFTER", "60"))  # running jobs without a heartbeat this long are re-queued
+JOB_SWEEP_INTERVAL = float(os.getenv("JOB_SWEEP_INTERVAL", "30"))  # seconds between re-queue sweeps
+
+class JobStatus:
+    QUEUED = "queued"
+    RUNNING = "running"
+    COMPLETED = "completed"
+    FAILED = "failed"
+
+# handler(db, user_id, payload, report_progress, job_id) -> result dict
+# A job can run more than once (retries, stale re-queues), so handlers tag what
+# they store with job_id and clean it up or reuse it on the next run
+JobHandler = Callable[..., Awaitable[Dict[str, Any]]]
+
+class JobQueue:
+    """Mongo-backed job queue drained by a bounded pool of in-process workers"""
+    
+    def __init__(self, workers: int = JOB_WORKERS):
+        self.workers = workers
+        self.handlers: Dict[str, JobHandler] = {}
+        self.queue: Optional[asyncio.Queue] = None
+        self.tasks = []
+        self.db = None
+        self.pending = set()  # job ids sitting in the local queue
+        self.running = 0
+    
+    def register(self, job_type: str, handler: JobHandler):
+        """Register the coroutine that runs jobs of job_type"""
+        self.handlers[job_type] = handler
+    
+    async def start(self, db):
+        """Start the workers and re-queue jobs left behind by a previous process"""
+        self.db = db
+        self.queue = asyncio.Queue()
+        self.tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        self.tasks.append(asyncio.create_task(self._sweeper()))
+    
+    async def stop(self):
+        for task in self.tasks:
+            task.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+        self.tasks = []
+    
+    async def submit(self, job_type: str, user_id: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """Persist a new job and queue it; returns the job document"""
+        now = datetime.utcnow()
+        job_doc = {
+            "type": job_type,
+            "user_id": user_id,
+            "status": JobStatus.QUEUED,
+            "payload": payload,
+            "progress": 0.0,
+            "stage": None,
+            "result": None,
+            "error": None,
+            "attempts": 0,
+            "created_at": now,
+            "updated_at": now,
+            "started_at": None,
+            "finished_at": None,
+            "heartbeat_at": None
+        }
+        result = await self.db.database.jobs.insert_one(job_doc)
+        job_doc["_id"] = result.inserted_id
+        self._enqueue(result.inserted_id)
+        return job_doc
+    
+    async def get(self, job_id: str, user_id: str) -> Optional[Dict[str, Any]]:
+        return await self.db.database.jobs.find_one(
+            {"_id": ObjectId(job_id), "user_id": user_id},
+            {"payload": 0}
+        )
+    
+    def _enqueue(self, job_id: ObjectId):
+        if job_id not in self.pending:
+            self.pending.add(job_id)
+            self.queue.put_nowait(job_id)
+    
+    async def _worker(self):
+        while True:
+            job_id = await self.queue.get()
+            self.pending.discard(job_id)
+            try:
+                await self._run(job_id)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Job worker error: {e}")
+    
+    async def _run(self, job_id: ObjectId):
+        now = datetime.utcnow()
+        # Atomically claim the job so no other worker or process runs it too
+        job_doc = await self.db.database.jobs.find_one_and_update(
+            {"_id": job_id, "status": JobStatus.QUEUED},
+            {
+                "$set": {
+                    "status": JobStatus.RUNNING,
+                    "started_at": now,
+                    "heartbeat_at": now,
+                    "updated_at": now
+                },
+                "$inc": {"attempts": 1}
+            },
+            return_document=ReturnDocument.AFTER
+        )
+        if not job_doc:
+            return
+        
+        if job_doc["attempts"] > JOB_MAX_ATTEMPTS:
+            # Recovered too many times, most likely it keeps taking its worker down
+            await self._finish(job_id, JobStatus.FAILED, error="Job exceeded the maximum number of attempts")
+            return
+        
+        handler = self.handlers.get(job_doc["type"])
+        if not handler:
+            await self._finish(job_id, JobStatus.FAILED, error=f"Unknown job type: {job_doc['type']}")
+            return
+        
+        async def report_progress(progress: float, stage: str = None):
+            await self.db.database.jobs.update_one(
+                {"_id": job_id, "status": JobStatus.RUNNING},
+                {"$set": {"progress": progress, "stage": stage, "updated_at": datetime.utcnow()}}
+            )
+        
+        self.running += 1
+        heartbeat = asyncio.create_task(self._heartbeat(job_id))
+        try:
+            result = await handler(self.db, job_doc["user_id"], job_doc["payload"], report_progress, str(job_id))
+            await self._finish(job_id, JobStatus.COMPLETED, result=result)
+        except asyncio.CancelledError:
+            # Shutting down: hand the job back so the next start picks it up
+            await asyncio.shield(self._requeue(job_id))
+            raise
+        except Exception as e:
+            logger.error(f"Job {job_id} ({job_doc['type']}) error: {e}")
+            if job_doc["attempts"] < JOB_MAX_ATTEMPTS:
+                await self._requeue(job_id)
+                self._enqueue(job_id)
+            else:
+                await self._finish(job_id, JobStatus.FAILED, error=str(e))
+        finally:
+            heartbeat.cancel()
+            self.running -= 1
+    
+    async def _heartbeat(self, job_id: ObjectId):
+        while True:
+            await asyncio.sleep(JOB_HEARTBEAT_INTERVAL)
+            await self.db.database.jobs.update_one(
+                {"_id": job_id, "status": JobStatus.RUNNING},
+                {"$set": {"heartbeat_at": datetime.utcnow()}}
+            )
+    
+    async def _requeue(self, job_id: ObjectId):
+        await self.db.database.jobs.update_one(
+            {"_id": job_id, "status": JobStatus.RUNNING},
+            {"$set": {"status": JobStatus.QUEUED, "updated_at": datetime.utcnow()}}
+        )
+    
+    async def _finish(self, job_id: ObjectId, job_status: str, result: Dict[str, Any] = None, error: str = None):
+        now = datetime.utcnow()
+        update = {"status": job_status, "finished_at": now, "updated_at": now, "error": error}
+        if job_status == JobStatus.COMPLETED:
+            update.update({"progress": 1.0, "stage": "done", "result": result})
+        await self.db.database.jobs.update_one({"_id": job_id}, {"$set": update})
+    
+    async def _sweeper(self):
+        """Periodically pick up queued jobs and jobs whose worker died"""
+        while True:
+            try:
+                await self._recover()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Job recovery error: {e}")
+            await asyncio.sleep(JOB_SWEEP_INTERVAL)
+    
+    async def _recover(self):
+        stale_before = datetime.utcnow() - timedelta(seconds=JOB_STALE_AFTER)
+        await self.db.database.jobs.update_many(
+            {"status": JobStatus.RUNNING, "heartbeat_at": {"$lt": stale_before}},
+            {"$set": {"status": JobStatus.QUEUED, "updated_at": datetime.utcnow()}}
+        )
+        
+        # Jobs already claimed by another worker are skipped when dequeued
+        async for job_doc in self.db.database.jobs.find({"status": JobStatus.QUEUED}, {"_id": 1}).sort("_id", 1):
+            self._enqueue(job_doc["_id"])
+    
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "workers": self.workers,
+            "running": self.running,
+            "queued": self.queue.qsize() if self.queue else 0
+        }
+    
+    @staticmethod
+    def format(job_doc: Dict[str, Any]) -> Dict[str, Any]:
+        """Job document as returned by the API"""
+        return {
+            "id": str(job_doc["_id"]),
+            "type": job_doc["type"],
+            "status": job_doc["status"],
+            "progress": job_doc.get("progress", 0.0),
+            "stage": job_doc.get("stage"),
+            "result": job_doc.get("result"),
+            "error": job_doc.get("error"),
+            "attempts": job_doc.get("attempts", 0),
+            "created_at": job_doc["created_at"],
+            "updated_at": job_doc["updated_at"],
+            "started_at": job_doc.get("started_at"),
+            "finished_at": job_doc.get("finished_at")
+        }
+
+# Global job queue instance
+job_queue = JobQueue()
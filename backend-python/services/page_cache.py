@@ -0,0 +1,115 @@
+import logging
+import os
+from collections import OrderedDict
+from datetime import datetime
+from typing import Optional, Dict, Any, List
+
+from pymongo import UpdateOne
+
+from database import db
+
+logger = logging.getLogger(__name__)
+
+# Configure PDF page cache settings
+PDF_PAGE_CACHE_SIZE = int(os.getenv("PDF_PAGE_CACHE_SIZE", "5000"))  # in-process pages
+PDF_PAGE_CACHE_DB_TTL = int(os.getenv("PDF_PAGE_CACHE_DB_TTL", str(30 * 24 * 3600)))  # Mongo TTL in seconds
+
+class PageCache:
+    """Two-tier cache of extracted PDF page text keyed by file digest and page index"""
+    
+    def __init__(self, max_size: int = PDF_PAGE_CACHE_SIZE):
+        self.max_size = max_size
+        self.pages: "OrderedDict[tuple, str]" = OrderedDict()  # (digest, page) -> text
+        self.page_counts: "OrderedDict[str, int]" = OrderedDict()  # digest -> page count
+        self.memory_hits = 0
+        self.db_hits = 0
+        self.misses = 0
+    
+    async def get_page_count(self, digest: str) -> Optional[int]:
+        """Page count of a previously seen PDF, or None"""
+        if digest in self.page_counts:
+            self.page_counts.move_to_end(digest)
+            return self.page_counts[digest]
+        
+        if db.database is not None:
+            try:
+                page_doc = await db.database.pdf_pages.find_one({"digest": digest}, {"page_count": 1})
+                if page_doc:
+                    self._remember_count(digest, page_doc["page_count"])
+                    return page_doc["page_count"]
+            except Exception as e:
+                logger.error(f"Page cache lookup error: {e}")
+        
+        return None
+    
+    async def get_pages(self, digest: str, pages: List[int]) -> Dict[int, str]:
+        """Cached text for whichever of the requested pages are available"""
+        found = {}
+        for page in pages:
+            text = self.pages.get((digest, page))
+            if text is not None:
+                self.pages.move_to_end((digest, page))
+                found[page] = text
+        self.memory_hits += len(found)
+        
+        missing = [page for page in pages if page not in found]
+        if missing and db.database is not None:
+            try:
+                cursor = db.database.pdf_pages.find({"digest": digest, "page": {"$in": missing}}, {"page": 1, "text": 1})
+                async for page_doc in cursor:
+                    found[page_doc["page"]] = page_doc["text"]
+                    self._remember(digest, page_doc["page"], page_doc["text"])
+                    self.db_hits += 1
+            except Exception as e:
+                logger.error(f"Page cache lookup error: {e}")
+        
+        self.misses += len(pages) - len(found)
+        return found
+    
+    async def set_pages(self, digest: str, page_count: int, pages: Dict[int, str]):
+        """Store extracted pages in both tiers"""
+        self._remember_count(digest, page_count)
+        for page, text in pages.items():
+            self._remember(digest, page, text)
+        
+        if pages and db.database is not None:
+            try:
+                now = datetime.utcnow()
+                await db.database.pdf_pages.bulk_write([
+                    UpdateOne(
+                        {"_id": f"{digest}:{page}"},
+                        {"$set": {"digest": digest, "page": page, "page_count": page_count, "text": text, "created_at": now}},
+                        upsert=True
+                    )
+                    for page, text in pages.items()
+                ], ordered=False)
+            except Exception as e:
+                logger.error(f"Page cache store error: {e}")
+    
+    def _remember(self, digest: str, page: int, text: str):
+        """Insert into the in-process LRU, evicting the oldest pages past max_size"""
+        self.pages[(digest, page)] = text
+        self.pages.move_to_end((digest, page))
+        while len(self.pages) > self.max_size:
+            self.pages.popitem(last=False)
+    
+    def _remember_count(self, digest: str, page_count: int):
+        self.page_counts[digest] = page_count
+        self.page_counts.move_to_end(digest)
+        while len(self.page_counts) > self.max_size:
+            self.page_counts.popitem(last=False)
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get hit/miss counters"""
+        lookups = self.memory_hits + self.db_hits + self.misses
+        return {
+            "size": len(self.pages),
+            "maxSize": self.max_size,
+            "memoryHits": self.memory_hits,
+            "dbHits": self.db_hits,
+            "misses": self.misses,
+            "hitRate": round((self.memory_hits + self.db_hits) / lookups, 4) if lookups else 0
+        }
+
+# Global page cache instance
+page_cache = PageCache()
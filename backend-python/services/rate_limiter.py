@@ -0,0 +1,188 @@
+import asyncio
+import logging
+import os
+import random
+import re
+import time
+from email.utils import parsedate_to_datetime
+from typing import Dict, Any, Optional
+
+import openai
+
+logger = logging.getLogger(__name__)
+
+# Configure provider quota (0 disables a limit; set these to your account's limits)
+AI_RPM_LIMIT = int(os.getenv("AI_RPM_LIMIT", "0"))  # requests per minute
+AI_TPM_LIMIT = int(os.getenv("AI_TPM_LIMIT", "0"))  # tokens per minute, prompt plus max_tokens
+AI_RATE_LIMIT_HEADROOM = float(os.getenv("AI_RATE_LIMIT_HEADROOM", "0.95"))  # fraction of the quota actually used
+
+# Configure retries of rate-limited and transient failures
+AI_RETRY_BASE_DELAY = float(os.getenv("AI_RETRY_BASE_DELAY", "0.5"))  # seconds, doubled per attempt
+AI_RETRY_MAX_DELAY = float(os.getenv("AI_RETRY_MAX_DELAY", "20"))
+AI_RETRY_JITTER = float(os.getenv("AI_RETRY_JITTER", "0.5"))  # up to this fraction is added to each delay
+
+_DURATION_PART = re.compile(r"([\d.]+)(ms|s|m|h)")
+_DURATION_UNITS = {"ms": 0.001, "s": 1, "m": 60, "h": 3600}
+
+class RateLimitTimeout(Exception):
+    """Raised when the quota will not allow a request before its deadline"""
+
+class TokenBucket:
+    """Continuously refilling budget of units per minute"""
+    
+    def __init__(self, per_minute: float):
+        self.capacity = per_minute
+        self.rate = per_minute / 60.0
+        self.level = per_minute
+        self.updated = time.monotonic()
+    
+    def _refill(self, now: float):
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+    
+    def wait_time(self, amount: float, now: float) -> float:
+        """Seconds until amount is available"""
+        self._refill(now)
+        # A request larger than a whole minute of quota waits for a full bucket
+        amount = min(amount, self.capacity)
+        return max(0.0, (amount - self.level) / self.rate)
+    
+    def consume(self, amount: float):
+        self.level -= min(amount, self.capacity)
+    
+    def drain(self):
+        """Empty the bucket after the provider reported the limit was hit"""
+        self.level = min(self.level, 0.0)
+
+class RateLimiter:
+    """Queues outbound model calls so they stay within the provider's RPM and TPM limits"""
+    
+    def __init__(self, rpm: int = AI_RPM_LIMIT, tpm: int = AI_TPM_LIMIT):
+        self.rpm = rpm
+        self.tpm = tpm
+        self.requests = TokenBucket(rpm * AI_RATE_LIMIT_HEADROOM) if rpm else None
+        self.tokens = TokenBucket(tpm * AI_RATE_LIMIT_HEADROOM) if tpm else None
+        # One waiter at a time, so a large request is not starved by a stream of small ones
+        self.lock = asyncio.Lock()
+        self.paused_until = 0.0
+        self.waiting = 0
+        self.delayed = 0
+        self.timeouts = 0
+        self.rate_limited = 0
+    
+    async def acquire(self, tokens: int, deadline: float):
+        """Wait until one request of the given token cost fits the quota, or raise RateLimitTimeout"""
+        if not self.requests and not self.tokens and time.monotonic() >= self.paused_until:
+            return
+        
+        self.waiting += 1
+        try:
+            try:
+                await asyncio.wait_for(self.lock.acquire(), timeout=max(0.01, deadline - time.monotonic()))
+            except asyncio.TimeoutError:
+                self.timeouts += 1
+                raise RateLimitTimeout("Timed out queueing for AI quota")
+            
+            try:
+                while True:
+                    now = time.monotonic()
+                    wait = max(
+                        self.paused_until - now,
+                        self.requests.wait_time(1, now) if self.requests else 0.0,
+                        self.tokens.wait_time(tokens, now) if self.tokens else 0.0
+                    )
+                    if wait <= 0:
+                        break
+                    if now + wait > deadline:
+                        self.timeouts += 1
+                        raise RateLimitTimeout(f"AI quota exhausted for another {wait:.1f}s")
+                    self.delayed += 1
+                    await asyncio.sleep(wait)
+                
+                if self.requests:
+                    self.requests.consume(1)
+                if self.tokens:
+                    self.tokens.consume(tokens)
+            finally:
+                self.lock.release()
+        finally:
+            self.waiting -= 1
+    
+    def pause(self, seconds: float):
+        """Hold every queued request after a 429 until the provider's reset time"""
+        self.rate_limited += 1
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+        for bucket in (self.requests, self.tokens):
+            if bucket:
+                bucket.drain()
+    
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "rpmLimit": self.rpm or None,
+            "tpmLimit": self.tpm or None,
+            "requestsAvailable": round(self.requests.level, 1) if self.requests else None,
+            "tokensAvailable": round(self.tokens.level) if self.tokens else None,
+            "waiting": self.waiting,
+            "delayed": self.delayed,
+            "timeouts": self.timeouts,
+            "rateLimited": self.rate_limited,
+            "pausedFor": round(max(0.0, self.paused_until - time.monotonic()), 2)
+        }
+
+def _parse_duration(value: str) -> Optional[float]:
+    """Parse a reset hint such as "20ms", "1.5s", "6m0s" or "30" """
+    value = value.strip()
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    parts = _DURATION_PART.findall(value)
+    if not parts:
+        return None
+    return sum(float(number) * _DURATION_UNITS[unit] for number, unit in parts)
+
+def retry_after_hint(error: Exception) -> Optional[float]:
+    """Seconds the provider asked us to wait before retrying, if it said"""
+    response = getattr(error, "response", None)
+    if response is None:
+        return None
+    headers = response.headers
+    
+    if headers.get("retry-after-ms"):
+        try:
+            return float(headers["retry-after-ms"]) / 1000
+        except ValueError:
+            pass
+    
+    if headers.get("retry-after"):
+        seconds = _parse_duration(headers["retry-after"])
+        if seconds is not None:
+            return seconds
+        try:
+            return max(0.0, parsedate_to_datetime(headers["retry-after"]).timestamp() - time.time())
+        except (TypeError, ValueError):
+            pass
+    
+    resets = [
+        _parse_duration(headers[name])
+        for name in ("x-ratelimit-reset-requests", "x-ratelimit-reset-tokens")
+        if headers.get(name)
+    ]
+    resets = [seconds for seconds in resets if seconds is not None]
+    return max(resets) if resets else None
+
+def retry_delay(error: Exception, attempt: int) -> Optional[float]:
+    """Jittered delay before retrying a failed call, or None if the error is not worth retrying"""
+    if not isinstance(error, (openai.RateLimitError, openai.InternalServerError, openai.APIConnectionError)):
+        return None
+    if getattr(error, "code", None) == "insufficient_quota":
+        # Billing limit, not a rate limit: waiting will not help
+        return None
+    
+    hint = retry_after_hint(error)
+    delay = hint if hint is not None else min(AI_RETRY_MAX_DELAY, AI_RETRY_BASE_DELAY * 2 ** attempt)
+    # Never retry sooner than asked; spread retries so queued callers do not stampede together
+    return delay * (1 + random.uniform(0, AI_RETRY_JITTER))
+
+# Global rate limiter instance
+rate_limiter = RateLimiter()
@@ -0,0 +1,117 @@
+import os
+import time
+from collections import deque
+from typing import Dict, Any, Optional
+
+# Configure circuit breaker settings
+AI_BREAKER_WINDOW = float(os.getenv("AI_BREAKER_WINDOW", "60"))  # seconds of outcomes considered
+AI_BREAKER_MIN_REQUESTS = int(os.getenv("AI_BREAKER_MIN_REQUESTS", "10"))  # outcomes needed before tripping
+AI_BREAKER_ERROR_RATE = float(os.getenv("AI_BREAKER_ERROR_RATE", "0.5"))  # trip at this failure ratio
+AI_BREAKER_SLOW_CALL_SECONDS = float(os.getenv("AI_BREAKER_SLOW_CALL_SECONDS", "30"))  # trip when p95 exceeds this
+AI_BREAKER_COOLDOWN = float(os.getenv("AI_BREAKER_COOLDOWN", "30"))  # seconds open before a probe
+
+# Configure adaptive timeouts
+AI_LATENCY_SAMPLES = int(os.getenv("AI_LATENCY_SAMPLES", "200"))  # recent successful latencies kept
+AI_LATENCY_MIN_SAMPLES = int(os.getenv("AI_LATENCY_MIN_SAMPLES", "20"))  # before this, use the static timeout
+AI_TIMEOUT_MULTIPLIER = float(os.getenv("AI_TIMEOUT_MULTIPLIER", "2.0"))  # timeout = p99 * multiplier
+AI_TIMEOUT_MIN = float(os.getenv("AI_TIMEOUT_MIN", "5"))
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling the model while a circuit is open"""
+
+class LatencyTracker:
+    """Rolling window of recent successful call latencies"""
+    
+    def __init__(self, max_samples: int = AI_LATENCY_SAMPLES):
+        self.samples = deque(maxlen=max_samples)
+    
+    def record(self, latency: float):
+        self.samples.append(latency)
+    
+    def percentile(self, pct: float) -> Optional[float]:
+        """Nearest-rank percentile, or None until AI_LATENCY_MIN_SAMPLES are collected"""
+        if len(self.samples) < AI_LATENCY_MIN_SAMPLES:
+            return None
+        ordered = sorted(self.samples)
+        index = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered))) - 1))
+        return ordered[index]
+    
+    def timeout(self, default: float) -> float:
+        """Timeout derived from observed p99, bounded by [AI_TIMEOUT_MIN, default]"""
+        p99 = self.percentile(99)
+        if p99 is None:
+            return default
+        return max(AI_TIMEOUT_MIN, min(default, p99 * AI_TIMEOUT_MULTIPLIER))
+
+class CircuitBreaker:
+    """Closed/open/half-open breaker tripped by error rate or slow calls"""
+    
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+    
+    def __init__(self, name: str):
+        self.name = name
+        self.state = self.CLOSED
+        self.outcomes = deque()  # (timestamp, ok, latency)
+        self.opened_at = 0.0
+        self.probe_in_flight = False
+        self.trips = 0
+        self.rejected = 0
+    
+    def allow(self) -> bool:
+        """Whether a call may go upstream right now"""
+        if self.state == self.CLOSED:
+            return True
+        if self.state == self.OPEN and time.monotonic() - self.opened_at >= AI_BREAKER_COOLDOWN:
+            self.state = self.HALF_OPEN
+            self.probe_in_flight = False
+        if self.state == self.HALF_OPEN and not self.probe_in_flight:
+            # Let exactly one probe through to test the upstream
+            self.probe_in_flight = True
+            return True
+        self.rejected += 1
+        return False
+    
+    def record(self, ok: bool, latency: float):
+        """Record a call outcome and update the breaker state"""
+        now = time.monotonic()
+        
+        if self.state == self.HALF_OPEN:
+            self.probe_in_flight = False
+            if ok:
+                self.state = self.CLOSED
+                self.outcomes.clear()
+            else:
+                self._trip(now)
+            return
+        
+        self.outcomes.append((now, ok, latency))
+        while self.outcomes and now - self.outcomes[0][0] > AI_BREAKER_WINDOW:
+            self.outcomes.popleft()
+        
+        if self.state == self.CLOSED and len(self.outcomes) >= AI_BREAKER_MIN_REQUESTS:
+            failures = sum(1 for _, success, _ in self.outcomes if not success)
+            latencies = sorted(latency for _, _, latency in self.outcomes)
+            p95 = latencies[max(0, int(round(0.95 * len(latencies))) - 1)]
+            if failures / len(self.outcomes) >= AI_BREAKER_ERROR_RATE or p95 > AI_BREAKER_SLOW_CALL_SECONDS:
+                self._trip(now)
+    
+    def abandon(self):
+        """Forget a call that was cancelled before it produced an outcome"""
+        if self.state == self.HALF_OPEN:
+            self.probe_in_flight = False
+    
+    def _trip(self, now: float):
+        self.state = self.OPEN
+        self.opened_at = now
+        self.outcomes.clear()
+        self.trips += 1
+    
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "state": self.state,
+            "trips": self.trips,
+            "rejected": self.rejected,
+            "recentCalls": len(self.outcomes)
+        }
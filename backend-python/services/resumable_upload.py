@@ -0,0 +1,209 @@
+import hashlib
+import logging
+import os
+import shutil
+import time
+import uuid
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta
+from typing import Optional, Dict, Any, List, AsyncIterator
+
+import aiofiles
+from bson import ObjectId
+from pymongo import ReturnDocument
+
+logger = logging.getLogger(__name__)
+
+# Configure resumable upload settings
+RESUMABLE_UPLOAD_PATH = os.getenv("RESUMABLE_UPLOAD_PATH", os.path.join(os.getenv("UPLOAD_PATH", "./uploads"), "resumable"))
+RESUMABLE_CHUNK_SIZE = int(os.getenv("RESUMABLE_CHUNK_SIZE", str(5 * 1024 * 1024)))  # bytes per numbered chunk
+RESUMABLE_MAX_FILE_SIZE = int(os.getenv("RESUMABLE_MAX_FILE_SIZE", str(200 * 1024 * 1024)))  # 200MB
+RESUMABLE_UPLOAD_TTL = int(os.getenv("RESUMABLE_UPLOAD_TTL", str(24 * 3600)))  # seconds an unfinished upload is kept
+
+class UploadStatus:
+    OPEN = "open"
+    COMPLETED = "completed"
+
+class ChunkRejected(Exception):
+    """Raised when a chunk's index, offset, length or checksum does not match the upload"""
+
+class ResumableUploadStore:
+    """Uploads received as numbered, checksummed chunks that survive dropped connections"""
+    
+    def __init__(self, root: str = RESUMABLE_UPLOAD_PATH, chunk_size: int = RESUMABLE_CHUNK_SIZE):
+        self.root = root
+        self.chunk_size = chunk_size
+    
+    def _dir(self, upload_id) -> str:
+        return os.path.join(self.root, str(upload_id))
+    
+    async def create(self, db, user_id: str, filename: str, file_type: str, size: int, sha256: Optional[str] = None) -> Dict[str, Any]:
+        """Start an upload of a file of known size"""
+        self._prune()
+        
+        now = datetime.utcnow()
+        upload_doc = {
+            "user_id": user_id,
+            "filename": filename,
+            "file_type": file_type,
+            "size": size,
+            "sha256": sha256.lower() if sha256 else None,
+            "chunk_size": self.chunk_size,
+            "received": [],
+            "status": UploadStatus.OPEN,
+            "document_id": None,
+            "created_at": now,
+            "updated_at": now,
+            "expires_at": now + timedelta(seconds=RESUMABLE_UPLOAD_TTL)
+        }
+        result = await db.database.upload_sessions.insert_one(upload_doc)
+        upload_doc["_id"] = result.inserted_id
+        os.makedirs(self._dir(result.inserted_id), exist_ok=True)
+        return upload_doc
+    
+    async def get(self, db, user_id: str, upload_id: str) -> Optional[Dict[str, Any]]:
+        if not ObjectId.is_valid(upload_id):
+            return None
+        return await db.database.upload_sessions.find_one({"_id": ObjectId(upload_id), "user_id": user_id})
+    
+    @staticmethod
+    def chunk_count(upload_doc: Dict[str, Any]) -> int:
+        return max(1, -(-upload_doc["size"] // upload_doc["chunk_size"]))
+    
+    @classmethod
+    def missing_chunks(cls, upload_doc: Dict[str, Any]) -> List[int]:
+        received = set(upload_doc["received"])
+        return [index for index in range(cls.chunk_count(upload_doc)) if index not in received]
+    
+    async def write_chunk(self, db, upload_doc: Dict[str, Any], index: int, offset: Optional[int], body: AsyncIterator[bytes], checksum: str) -> Dict[str, Any]:
+        """Stream one chunk to its own file, keeping it only if its length and SHA-256 match"""
+        if upload_doc["status"] != UploadStatus.OPEN:
+            raise ChunkRejected("Upload is already complete")
+        if not 0 <= index < self.chunk_count(upload_doc):
+            raise ChunkRejected(f"Chunk index must be between 0 and {self.chunk_count(upload_doc) - 1}")
+        
+        start = index * upload_doc["chunk_size"]
+        if offset is not None and offset != start:
+            raise ChunkRejected(f"Chunk {index} starts at offset {start}, not {offset}")
+        expected_length = min(upload_doc["chunk_size"], upload_doc["size"] - start)
+        
+        upload_dir = self._dir(upload_doc["_id"])
+        os.makedirs(upload_dir, exist_ok=True)
+        chunk_path = os.path.join(upload_dir, f"{index}.chunk")
+        temp_path = f"{chunk_path}.{uuid.uuid4().hex}.tmp"
+        sha256 = hashlib.sha256()
+        length = 0
+        
+        try:
+            async with aiofiles.open(temp_path, "wb") as chunk_file:
+                async for data in body:
+                    length += len(data)
+                    if length > expected_length:
+                        raise ChunkRejected(f"Chunk {index} must be {expected_length} bytes")
+                    sha256.update(data)
+                    await chunk_file.write(data)
+            
+            if length != expected_length:
+                raise ChunkRejected(f"Chunk {index} must be {expected_length} bytes, received {length}")
+            if sha256.hexdigest() != checksum.lower():
+                raise ChunkRejected(f"Chunk {index} checksum mismatch")
+            
+            # Verified chunks are renamed into place, so a retried chunk never leaves a partial file behind
+            os.replace(temp_path, chunk_path)
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+        
+        return await db.database.upload_sessions.find_one_and_update(
+            {"_id": upload_doc["_id"]},
+            {
+                "$addToSet": {"received": index},
+                "$set": {"updated_at": datetime.utcnow()}
+            },
+            return_document=ReturnDocument.AFTER
+        )
+    
+    @asynccontextmanager
+    async def assemble(self, upload_doc: Dict[str, Any]):
+        """Concatenate the chunks in order, yielding the assembled file path and its SHA-256 digest"""
+        upload_dir = self._dir(upload_doc["_id"])
+        assembled_path = os.path.join(upload_dir, f"assembled-{uuid.uuid4().hex}")
+        sha256 = hashlib.sha256()
+        
+        try:
+            async with aiofiles.open(assembled_path, "wb") as assembled:
+                for index in range(self.chunk_count(upload_doc)):
+                    async with aiofiles.open(os.path.join(upload_dir, f"{index}.chunk"), "rb") as chunk_file:
+                        while True:
+                            data = await chunk_file.read(1024 * 1024)
+                            if not data:
+                                break
+                            sha256.update(data)
+                            await assembled.write(data)
+            
+            digest = sha256.hexdigest()
+            if upload_doc.get("sha256") and upload_doc["sha256"] != digest:
+                raise ChunkRejected("Assembled file does not match the declared SHA-256")
+            
+            yield assembled_path, digest
+        finally:
+            if os.path.exists(assembled_path):
+                os.remove(assembled_path)
+    
+    async def complete(self, db, upload_doc: Dict[str, Any], document_id: Optional[str]) -> Dict[str, Any]:
+        """Mark an upload finished and delete its chunks"""
+        shutil.rmtree(self._dir(upload_doc["_id"]), ignore_errors=True)
+        return await db.database.upload_sessions.find_one_and_update(
+            {"_id": upload_doc["_id"]},
+            {"$set": {"status": UploadStatus.COMPLETED, "document_id": document_id, "updated_at": datetime.utcnow()}},
+            return_document=ReturnDocument.AFTER
+        )
+    
+    async def discard(self, db, upload_doc: Dict[str, Any]):
+        """Abort an upload and delete its chunks"""
+        shutil.rmtree(self._dir(upload_doc["_id"]), ignore_errors=True)
+        await db.database.upload_sessions.delete_one({"_id": upload_doc["_id"]})
+    
+    def _prune(self):
+        """Delete chunk directories of uploads abandoned for longer than RESUMABLE_UPLOAD_TTL"""
+        if not os.path.isdir(self.root):
+            return
+        cutoff = time.time() - RESUMABLE_UPLOAD_TTL
+        for entry in os.scandir(self.root):
+            try:
+                if entry.is_dir() and entry.stat().st_mtime < cutoff:
+                    shutil.rmtree(entry.path, ignore_errors=True)
+            except OSError as e:
+                logger.error(f"Resumable upload prune error: {e}")
+    
+    @classmethod
+    def format(cls, upload_doc: Dict[str, Any]) -> Dict[str, Any]:
+        chunk_size = upload_doc["chunk_size"]
+        
+        # Collapse received chunk indexes into byte ranges [start, end)
+        received_ranges = []
+        for index in sorted(upload_doc["received"]):
+            start = index * chunk_size
+            end = min(start + chunk_size, upload_doc["size"])
+            if received_ranges and received_ranges[-1][1] == start:
+                received_ranges[-1][1] = end
+            else:
+                received_ranges.append([start, end])
+        
+        return {
+            "id": str(upload_doc["_id"]),
+            "filename": upload_doc["filename"],
+            "size": upload_doc["size"],
+            "chunkSize": chunk_size,
+            "chunkCount": cls.chunk_count(upload_doc),
+            "receivedChunks": sorted(upload_doc["received"]),
+            "receivedRanges": received_ranges,
+            "missingChunks": cls.missing_chunks(upload_doc),
+            "status": upload_doc["status"],
+            "documentId": upload_doc.get("document_id"),
+            "createdAt": upload_doc["created_at"],
+            "expiresAt": upload_doc["expires_at"]
+        }
+
+# Global resumable upload store instance
+resumable_uploads = ResumableUploadStore()
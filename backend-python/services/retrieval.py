@@ -0,0 +1,241 @@
+import asyncio
+import heapq
+import json
+import logging
+import math
+import os
+import re
+import shutil
+import time
+import uuid
+from collections import Counter, OrderedDict, defaultdict
+from typing import Optional, Dict, Any, List
+
+from services.token_counter import count_tokens
+
+logger = logging.getLogger(__name__)
+
+# Configure uploaded document retrieval for chat
+RETRIEVAL_ENABLED = os.getenv("RETRIEVAL_ENABLED", "true").lower() == "true"
+RETRIEVAL_INDEX_PATH = os.getenv("RETRIEVAL_INDEX_PATH", os.path.join(os.getenv("UPLOAD_PATH", "./uploads"), "index"))
+RETRIEVAL_CHUNK_WORDS = int(os.getenv("RETRIEVAL_CHUNK_WORDS", "150"))  # words per indexed passage
+RETRIEVAL_CHUNK_OVERLAP = int(os.getenv("RETRIEVAL_CHUNK_OVERLAP", "30"))  # words shared by neighbouring passages
+RETRIEVAL_TOP_K = int(os.getenv("RETRIEVAL_TOP_K", "4"))  # passages added to a chat prompt
+RETRIEVAL_TOKEN_BUDGET = int(os.getenv("RETRIEVAL_TOKEN_BUDGET", "800"))  # prompt tokens spent on passages
+RETRIEVAL_MIN_SCORE = float(os.getenv("RETRIEVAL_MIN_SCORE", "0.5"))  # weaker BM25 matches are left out
+RETRIEVAL_CACHED_USERS = int(os.getenv("RETRIEVAL_CACHED_USERS", "64"))  # user indexes kept in memory
+
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+STOP_WORDS = {
+    "a", "about", "after", "all", "also", "an", "and", "any", "are", "as", "at", "be", "because", "been",
+    "before", "being", "between", "both", "but", "by", "can", "could", "did", "do", "does", "each", "for",
+    "from", "had", "has", "have", "he", "her", "his", "how", "i", "if", "in", "into", "is", "it", "its",
+    "me", "more", "most", "my", "no", "not", "of", "on", "one", "or", "other", "our", "she", "so", "some",
+    "such", "than", "that", "the", "their", "them", "then", "there", "these", "they", "this", "those",
+    "through", "to", "too", "under", "up", "very", "was", "we", "were", "what", "when", "where", "which",
+    "while", "who", "why", "will", "with", "would", "you", "your"
+}
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+
+def index_terms(text: str) -> List[str]:
+    """Lowercased content words of a text"""
+    return [word for word in _TOKEN.findall(text.lower()) if word not in STOP_WORDS]
+
+def chunk_text(text: str, chunk_words: int = RETRIEVAL_CHUNK_WORDS, overlap: int = RETRIEVAL_CHUNK_OVERLAP) -> List[str]:
+    """Split text into overlapping passages of chunk_words words"""
+    words = text.split()
+    step = max(1, chunk_words - overlap)
+    return [" ".join(words[start:start + chunk_words]) for start in range(0, max(1, len(words) - overlap), step)]
+
+def build_segment(document_id: str, name: str, text: str) -> Dict[str, Any]:
+    """Passages of one document with their term frequencies"""
+    passages = []
+    for passage in chunk_text(text):
+        terms = index_terms(passage)
+        if terms:
+            passages.append({"text": passage, "terms": dict(Counter(terms)), "length": len(terms)})
+    return {"document_id": document_id, "name": name, "passages": passages}
+
+class UserIndex:
+    """In-memory BM25 inverted index over one user's document segments"""
+    
+    def __init__(self):
+        self.postings: Dict[str, Dict[str, int]] = defaultdict(dict)  # term -> {passage id: term frequency}
+        self.passages: Dict[str, tuple] = {}  # passage id -> (document id, name, text, length)
+        self.segments: Dict[str, List[str]] = {}  # document id -> passage ids
+        self.total_length = 0
+        self.mtime = None
+    
+    def add(self, segment: Dict[str, Any]):
+        document_id = segment["document_id"]
+        if document_id in self.segments:
+            return
+        passage_ids = []
+        for i, passage in enumerate(segment["passages"]):
+            passage_id = f"{document_id}:{i}"
+            self.passages[passage_id] = (document_id, segment["name"], passage["text"], passage["length"])
+            for term, frequency in passage["terms"].items():
+                self.postings[term][passage_id] = frequency
+            self.total_length += passage["length"]
+            passage_ids.append(passage_id)
+        self.segments[document_id] = passage_ids
+    
+    def remove(self, document_id: str):
+        for passage_id in self.segments.pop(document_id, []):
+            _, _, text, length = self.passages.pop(passage_id)
+            self.total_length -= length
+            for term in set(index_terms(text)):
+                postings = self.postings.get(term)
+                if postings is not None:
+                    postings.pop(passage_id, None)
+                    if not postings:
+                        del self.postings[term]
+    
+    def search(self, terms: List[str], k: int) -> List[tuple]:
+        """Top k (score, passage id) pairs by BM25"""
+        passage_count = len(self.passages)
+        if not passage_count:
+            return []
+        average_length = self.total_length / passage_count
+        
+        scores = defaultdict(float)
+        for term in set(terms):
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (passage_count - len(postings) + 0.5) / (len(postings) + 0.5))
+            for passage_id, frequency in postings.items():
+                length = self.passages[passage_id][3]
+                scores[passage_id] += idf * frequency * (BM25_K1 + 1) / (
+                    frequency + BM25_K1 * (1 - BM25_B + BM25_B * length / average_length)
+                )
+        
+        return heapq.nlargest(k, ((score, passage_id) for passage_id, score in scores.items()))
+
+class RetrievalIndex:
+    """Per-user BM25 indexes over uploaded documents, persisted as one segment file per document"""
+    
+    def __init__(self, root: str = RETRIEVAL_INDEX_PATH, max_users: int = RETRIEVAL_CACHED_USERS):
+        self.root = root
+        self.max_users = max_users
+        self.indexes: "OrderedDict[str, UserIndex]" = OrderedDict()
+        self.searches = 0
+        self.hits = 0
+        self.search_seconds = 0.0
+    
+    def _user_dir(self, user_id: str) -> str:
+        return os.path.join(self.root, user_id)
+    
+    async def add_document(self, user_id: str, document_id: str, name: str, text: str):
+        """Index a stored document; documents that are already indexed are skipped"""
+        if not RETRIEVAL_ENABLED:
+            return
+        try:
+            segment_path = os.path.join(self._user_dir(user_id), f"{document_id}.json")
+            if os.path.exists(segment_path):
+                return
+            
+            segment = await asyncio.to_thread(build_segment, document_id, name, text)
+            await asyncio.to_thread(self._write_segment, segment_path, segment)
+            
+            # Update a loaded index in place rather than reloading it
+            index = self.indexes.get(user_id)
+            if index is not None:
+                index.add(segment)
+                index.mtime = os.stat(self._user_dir(user_id)).st_mtime_ns
+        except Exception as e:
+            logger.error(f"Document indexing error: {e}")
+    
+    @staticmethod
+    def _write_segment(segment_path: str, segment: Dict[str, Any]):
+        os.makedirs(os.path.dirname(segment_path), exist_ok=True)
+        temp_path = f"{segment_path}.{uuid.uuid4().hex}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as segment_file:
+            json.dump(segment, segment_file)
+        os.replace(temp_path, segment_path)
+    
+    def remove_user(self, user_id: str):
+        """Delete a user's index"""
+        self.indexes.pop(user_id, None)
+        shutil.rmtree(self._user_dir(user_id), ignore_errors=True)
+    
+    async def _get_index(self, user_id: str) -> Optional[UserIndex]:
+        """The user's index, synced with segments written by other processes"""
+        user_dir = self._user_dir(user_id)
+        if not os.path.isdir(user_dir):
+            return None
+        
+        mtime = os.stat(user_dir).st_mtime_ns
+        index = self.indexes.get(user_id)
+        if index is None or index.mtime != mtime:
+            index = await asyncio.to_thread(self._sync, user_dir, index or UserIndex())
+            index.mtime = mtime
+        
+        self.indexes[user_id] = index
+        self.indexes.move_to_end(user_id)
+        while len(self.indexes) > self.max_users:
+            self.indexes.popitem(last=False)
+        return index
+    
+    @staticmethod
+    def _sync(user_dir: str, index: UserIndex) -> UserIndex:
+        """Load segments missing from the index and drop those deleted from disk"""
+        on_disk = {name[:-5] for name in os.listdir(user_dir) if name.endswith(".json")}
+        for document_id in set(index.segments) - on_disk:
+            index.remove(document_id)
+        for document_id in on_disk - set(index.segments):
+            try:
+                with open(os.path.join(user_dir, f"{document_id}.json"), encoding="utf-8") as segment_file:
+                    index.add(json.load(segment_file))
+            except (OSError, ValueError) as e:
+                logger.error(f"Index segment load error: {e}")
+        return index
+    
+    async def search(self, user_id: str, query: str, k: int = RETRIEVAL_TOP_K, token_budget: int = RETRIEVAL_TOKEN_BUDGET) -> List[Dict[str, Any]]:
+        """Best matching passages from the user's documents that fit within token_budget"""
+        if not RETRIEVAL_ENABLED:
+            return []
+        try:
+            terms = index_terms(query)
+            index = await self._get_index(user_id) if terms else None
+            if index is None:
+                return []
+            
+            started = time.perf_counter()
+            ranked = index.search(terms, k)
+            self.search_seconds += time.perf_counter() - started
+            self.searches += 1
+            
+            passages = []
+            used_tokens = 0
+            for score, passage_id in ranked:
+                if score < RETRIEVAL_MIN_SCORE:
+                    break
+                document_id, name, text, _ = index.passages[passage_id]
+                tokens = count_tokens(text)
+                if used_tokens + tokens > token_budget:
+                    continue
+                used_tokens += tokens
+                passages.append({"documentId": document_id, "name": name, "text": text, "score": round(score, 3)})
+            
+            if passages:
+                self.hits += 1
+            return passages
+        except Exception as e:
+            logger.error(f"Document retrieval error: {e}")
+            return []
+    
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": RETRIEVAL_ENABLED,
+            "loadedUsers": len(self.indexes),
+            "searches": self.searches,
+            "hits": self.hits,
+            "averageSearchMs": round(self.search_seconds / self.searches * 1000, 3) if self.searches else 0
+        }
+
+# Global retrieval index instance
+retrieval_index = RetrievalIndex()
@@ -0,0 +1,157 @@
+import logging
+import os
+import re
+import time
+from collections import OrderedDict
+from typing import Optional, Dict, Any, List, Tuple
+
+import scipy.sparse as sp
+from sklearn.feature_extraction.text import HashingVectorizer
+
+logger = logging.getLogger(__name__)
+
+# Configure semantic chat answer cache
+CHAT_CACHE_ENABLED = os.getenv("CHAT_CACHE_ENABLED", "true").lower() == "true"
+CHAT_CACHE_SIZE = int(os.getenv("CHAT_CACHE_SIZE", "1024"))  # cached answers across all subjects
+CHAT_CACHE_TTL = int(os.getenv("CHAT_CACHE_TTL", str(24 * 3600)))  # seconds an answer stays valid
+CHAT_CACHE_THRESHOLD = float(os.getenv("CHAT_CACHE_THRESHOLD", "0.9"))  # cosine similarity needed for a hit
+CHAT_CACHE_DUPLICATE_THRESHOLD = float(os.getenv("CHAT_CACHE_DUPLICATE_THRESHOLD", "0.98"))  # refresh instead of adding above this
+CHAT_CACHE_MIN_TERMS = int(os.getenv("CHAT_CACHE_MIN_TERMS", "3"))  # content words needed before a question is cached
+
+# Filler words that do not change what is being asked
+QUESTION_FILLER_WORDS = {
+    "a", "about", "an", "are", "can", "could", "define", "describe", "do", "does", "explain",
+    "i", "is", "know", "like", "me", "of", "please", "tell", "the", "to", "what", "whats", "would", "you"
+}
+
+# Words, plus single symbols other than sentence punctuation (operators such as + - * / ^ = < >)
+_TOKEN = re.compile(r"[a-z0-9]+|[^\w\s.,?!;:'\"]")
+
+def question_tokens(question: str) -> List[str]:
+    """Content words and symbols of a question"""
+    return [
+        token for token in _TOKEN.findall(question.lower().replace("'s", ""))
+        if token not in QUESTION_FILLER_WORDS
+    ]
+
+def question_terms(question: str) -> List[str]:
+    """Content words and symbols of a question followed by their bigrams"""
+    tokens = question_tokens(question)
+    return tokens + [f"{first} {second}" for first, second in zip(tokens, tokens[1:])]
+
+def exact_terms(question: str) -> Tuple[str, ...]:
+    """Numbers and symbols of a question, which must match exactly for a cached answer to apply"""
+    return tuple(token for token in question_tokens(question) if not token.isalpha())
+
+class SemanticAnswerCache:
+    """Per-subject nearest-neighbour cache of answers to first-turn chat questions"""
+    
+    def __init__(self, max_size: int = CHAT_CACHE_SIZE, ttl: int = CHAT_CACHE_TTL):
+        self.max_size = max_size
+        self.ttl = ttl
+        # Stateless hashing vectors, so nothing has to be refitted as questions arrive
+        self.vectorizer = HashingVectorizer(
+            analyzer=question_terms,
+            n_features=2 ** 18,
+            alternate_sign=False,
+            norm="l2"
+        )
+        self.entries: "OrderedDict[Tuple[str, str], tuple]" = OrderedDict()  # (subject, question) -> (expires_at, vector, answer, exact terms)
+        self.indexes: Dict[tuple, tuple] = {}  # (subject, exact terms) -> (keys, stacked vectors), rebuilt after changes
+        self.hits = 0
+        self.misses = 0
+        self.skipped = 0
+        self.stores = 0
+        self.evictions = 0
+    
+    @staticmethod
+    def _subject_key(subject: str) -> str:
+        return (subject or "general").strip().lower()
+    
+    def _vectorize(self, question: str):
+        """Vector for a question, or None when it has too few content words to match safely"""
+        if len({token for token in question_tokens(question) if token.isalnum()}) < CHAT_CACHE_MIN_TERMS:
+            return None
+        return self.vectorizer.transform([question])
+    
+    def _nearest(self, subject: str, exact: Tuple[str, ...], vector) -> Tuple[Optional[Tuple[str, str]], float]:
+        """Most similar cached question with the same numbers and symbols in a subject, and its cosine similarity"""
+        index = self.indexes.get((subject, exact))
+        if index is None:
+            keys = [key for key, entry in self.entries.items() if key[0] == subject and entry[3] == exact]
+            if not keys:
+                return None, 0.0
+            index = (keys, sp.vstack([self.entries[key][1] for key in keys]).tocsr())
+            self.indexes[(subject, exact)] = index
+        
+        keys, matrix = index
+        scores = (matrix @ vector.T).toarray().ravel()
+        best = int(scores.argmax())
+        return keys[best], float(scores[best])
+    
+    def get(self, subject: str, question: str) -> Optional[str]:
+        """Answer to the closest cached question in the subject, if similar enough"""
+        vector = self._vectorize(question)
+        if vector is None:
+            self.skipped += 1
+            return None
+        
+        subject = self._subject_key(subject)
+        key, score = self._nearest(subject, exact_terms(question), vector)
+        if key is not None and score >= CHAT_CACHE_THRESHOLD:
+            expires_at, _, answer, _ = self.entries[key]
+            if expires_at > time.monotonic():
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return answer
+            self._remove(key)
+        
+        self.misses += 1
+        return None
+    
+    def set(self, subject: str, question: str, answer: str):
+        """Cache an answer, replacing a near-identical question already stored"""
+        vector = self._vectorize(question)
+        if vector is None:
+            return
+        
+        subject = self._subject_key(subject)
+        exact = exact_terms(question)
+        key, score = self._nearest(subject, exact, vector)
+        if key is not None and score >= CHAT_CACHE_DUPLICATE_THRESHOLD:
+            self._remove(key)
+        
+        key = (subject, " ".join(question.lower().split()))
+        self._remove(key)
+        self.entries[key] = (time.monotonic() + self.ttl, vector, answer, exact)
+        self.indexes.pop((subject, exact), None)
+        self.stores += 1
+        
+        while len(self.entries) > self.max_size:
+            self._remove(next(iter(self.entries)))
+            self.evictions += 1
+    
+    def _remove(self, key: Tuple[str, str]):
+        entry = self.entries.pop(key, None)
+        if entry is not None:
+            self.indexes.pop((key[0], entry[3]), None)
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get hit/miss counters"""
+        lookups = self.hits + self.misses
+        return {
+            "enabled": CHAT_CACHE_ENABLED,
+            "size": len(self.entries),
+            "maxSize": self.max_size,
+            "subjects": len({subject for subject, _ in self.entries}),
+            "threshold": CHAT_CACHE_THRESHOLD,
+            "hits": self.hits,
+            "misses": self.misses,
+            "skipped": self.skipped,
+            "stores": self.stores,
+            "evictions": self.evictions,
+            "hitRate": round(self.hits / lookups, 4) if lookups else 0
+        }
+
+# Global semantic answer cache instance
+semantic_cache = SemanticAnswerCache()
@@ -0,0 +1,80 @@
+import json
+import logging
+from typing import Any, Iterator
+
+logger = logging.getLogger(__name__)
+
+def format_sse(event: str, data: dict) -> str:
+    """Format a server-sent event"""
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+def format_ndjson(record: dict) -> str:
+    """Format one newline-delimited JSON record"""
+    return json.dumps(record, default=str) + "\n"
+
+def text_blocks(text: str, max_chars: int) -> Iterator[str]:
+    """Split text into blocks of whole paragraphs of up to max_chars (longer paragraphs form their own block)"""
+    block = []
+    size = 0
+    for paragraph in text.split("\n"):
+        if block and size + len(paragraph) > max_chars:
+            yield "\n".join(block)
+            block = []
+            size = 0
+        block.append(paragraph)
+        size += len(paragraph) + 1
+    if block:
+        yield "\n".join(block)
+
+class JSONArrayStream:
+    """Incrementally yields the objects of a streamed JSON array"""
+    
+    def __init__(self):
+        self.started = False
+        self.finished = False
+        self.depth = 0
+        self.in_string = False
+        self.escaped = False
+        self.current = []  # characters of the element being read
+    
+    def feed(self, chunk: str) -> Iterator[Any]:
+        """Consume a chunk of text and yield every element it completes"""
+        for char in chunk:
+            if self.finished:
+                return
+            
+            if not self.started:
+                if char == "[":
+                    self.started = True
+                continue
+            
+            if self.depth == 0:
+                # Between elements only an opening brace or the closing bracket matters
+                if char == "{":
+                    self.depth = 1
+                    self.current = [char]
+                elif char == "]":
+                    self.finished = True
+                continue
+            
+            self.current.append(char)
+            if self.in_string:
+                if self.escaped:
+                    self.escaped = False
+                elif char == "\\":
+                    self.escaped = True
+                elif char == '"':
+                    self.in_string = False
+            elif char == '"':
+                self.in_string = True
+            elif char in "{[":
+                self.depth += 1
+            elif char in "}]":
+                self.depth -= 1
+                if self.depth == 0:
+                    text = "".join(self.current)
+                    self.current = []
+                    try:
+                        yield json.loads(text)
+                    except json.JSONDecodeError as e:
+                        logger.error(f"Skipping malformed streamed JSON element: {e}")
@@ -0,0 +1,99 @@
+import hashlib
+import logging
+import os
+import time
+import unicodedata
+from collections import OrderedDict
+from datetime import datetime
+from typing import Optional, Dict, Any
+
+from database import db
+from models.summary import SummaryType
+
+logger = logging.getLogger(__name__)
+
+# Configure summary cache settings
+SUMMARY_CACHE_SIZE = int(os.getenv("SUMMARY_CACHE_SIZE", "512"))  # in-process entries
+SUMMARY_CACHE_TTL = int(os.getenv("SUMMARY_CACHE_TTL", "3600"))  # in-process TTL in seconds
+SUMMARY_CACHE_DB_TTL = int(os.getenv("SUMMARY_CACHE_DB_TTL", str(7 * 24 * 3600)))  # Mongo TTL in seconds
+
+class SummaryCache:
+    """Two-tier summary cache: in-process LRU backed by the summary_cache collection"""
+    
+    def __init__(self, max_size: int = SUMMARY_CACHE_SIZE, ttl: int = SUMMARY_CACHE_TTL):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.entries: "OrderedDict[str, tuple]" = OrderedDict()  # key -> (expires_at, summary_text)
+        self.memory_hits = 0
+        self.db_hits = 0
+        self.misses = 0
+    
+    @staticmethod
+    def make_key(text: str, summary_type: SummaryType, language: str) -> str:
+        """Digest of the normalized text, summary type and language"""
+        normalized = " ".join(unicodedata.normalize("NFKC", text).split())
+        digest = hashlib.sha256()
+        for part in (normalized, SummaryType(summary_type).value, language.strip().lower()):
+            digest.update(part.encode("utf-8"))
+            digest.update(b"\0")
+        return digest.hexdigest()
+    
+    async def get(self, key: str) -> Optional[str]:
+        """Look up a summary, checking memory first and then Mongo"""
+        entry = self.entries.get(key)
+        if entry:
+            expires_at, summary_text = entry
+            if expires_at > time.monotonic():
+                self.entries.move_to_end(key)
+                self.memory_hits += 1
+                return summary_text
+            del self.entries[key]
+        
+        if db.database is not None:
+            try:
+                cache_doc = await db.database.summary_cache.find_one({"_id": key}, {"summary_text": 1})
+                if cache_doc:
+                    self._remember(key, cache_doc["summary_text"])
+                    self.db_hits += 1
+                    return cache_doc["summary_text"]
+            except Exception as e:
+                logger.error(f"Summary cache lookup error: {e}")
+        
+        self.misses += 1
+        return None
+    
+    async def set(self, key: str, summary_text: str):
+        """Store a summary in both tiers"""
+        self._remember(key, summary_text)
+        
+        if db.database is not None:
+            try:
+                await db.database.summary_cache.update_one(
+                    {"_id": key},
+                    {"$set": {"summary_text": summary_text, "created_at": datetime.utcnow()}},
+                    upsert=True
+                )
+            except Exception as e:
+                logger.error(f"Summary cache store error: {e}")
+    
+    def _remember(self, key: str, summary_text: str):
+        """Insert into the in-process LRU, evicting the oldest entries past max_size"""
+        self.entries[key] = (time.monotonic() + self.ttl, summary_text)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get hit/miss counters"""
+        lookups = self.memory_hits + self.db_hits + self.misses
+        return {
+            "size": len(self.entries),
+            "maxSize": self.max_size,
+            "memoryHits": self.memory_hits,
+            "dbHits": self.db_hits,
+            "misses": self.misses,
+            "hitRate": round((self.memory_hits + self.db_hits) / lookups, 4) if lookups else 0
+        }
+
+# Global summary cache instance
+summary_cache = SummaryCache()
@@ -0,0 +1,175 @@
+import asyncio
+import logging
+import os
+import time
+from collections import defaultdict, deque
+from contextvars import ContextVar
+from datetime import datetime
+from typing import Dict, Any, Optional
+
+logger = logging.getLogger(__name__)
+
+# Configure AI usage telemetry
+AI_USAGE_FLUSH_INTERVAL = float(os.getenv("AI_USAGE_FLUSH_INTERVAL", "10"))  # seconds between ai_usage writes
+AI_METRICS_LATENCY_SAMPLES = int(os.getenv("AI_METRICS_LATENCY_SAMPLES", "500"))  # recent latencies kept per route
+AI_METRICS_MAX_SUBJECTS = int(os.getenv("AI_METRICS_MAX_SUBJECTS", "50"))  # subjects counted by name; later ones go under "other"
+
+# User and subject of the request a model call is made for; copied into tasks it spawns
+_request_tags: ContextVar[Dict[str, str]] = ContextVar("ai_request_tags", default={})
+
+def tag_request(user_id: str = None, subject: str = None):
+    """Attribute the model calls made by the current request to a user and subject"""
+    tags = {}
+    if user_id:
+        tags["user_id"] = user_id
+    if subject:
+        tags["subject"] = subject.strip().lower()
+    _request_tags.set(tags)
+
+def _percentile(ordered: list, pct: float) -> Optional[float]:
+    if not ordered:
+        return None
+    return ordered[max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered))) - 1))]
+
+class RouteMetrics:
+    """Counters and recent latencies for one route and model"""
+    
+    def __init__(self):
+        self.counters = defaultdict(int)
+        self.latencies = deque(maxlen=AI_METRICS_LATENCY_SAMPLES)
+        self.first_token_latencies = deque(maxlen=AI_METRICS_LATENCY_SAMPLES)
+        self.latency_total = 0.0
+    
+    def get_stats(self) -> Dict[str, Any]:
+        latencies = sorted(self.latencies)
+        first_token = sorted(self.first_token_latencies)
+        calls = self.counters["calls"]
+        return {
+            **self.counters,
+            "avgLatency": round(self.latency_total / calls, 3) if calls else None,
+            "p50Latency": _percentile(latencies, 50),
+            "p95Latency": _percentile(latencies, 95),
+            "p99Latency": _percentile(latencies, 99),
+            "p95FirstToken": _percentile(first_token, 95)
+        }
+
+class AITelemetry:
+    """Aggregates model call usage in process and accumulates per-user totals for ai_usage"""
+    
+    def __init__(self):
+        self.started_at = time.time()
+        self.routes: Dict[str, RouteMetrics] = {}
+        self.subjects = defaultdict(lambda: defaultdict(int))
+        self.pending_usage = defaultdict(lambda: defaultdict(int))  # (user_id, day) -> counters
+        self.db = None
+        self.flush_task = None
+    
+    def _route(self, route: str, model: str) -> RouteMetrics:
+        name = f"{model}:{route}"
+        if name not in self.routes:
+            self.routes[name] = RouteMetrics()
+        return self.routes[name]
+    
+    def _add_usage(self, route: str, counters: Dict[str, float]):
+        """Add counters to the current user's pending ai_usage totals"""
+        tags = _request_tags.get()
+        subject = tags.get("subject")
+        if subject:
+            # Subjects are free text, so only the first few get their own counters
+            if subject not in self.subjects and len(self.subjects) >= AI_METRICS_MAX_SUBJECTS:
+                subject = "other"
+            for name, value in counters.items():
+                self.subjects[subject][name] += value
+        
+        user_id = tags.get("user_id")
+        if not user_id:
+            return
+        usage = self.pending_usage[(user_id, datetime.utcnow().strftime("%Y-%m-%d"))]
+        for name, value in counters.items():
+            usage[name] += value
+            usage[f"routes.{route}.{name}"] += value
+    
+    def record_call(
+        self,
+        route: str,
+        model: str,
+        latency: float,
+        prompt_tokens: int = 0,
+        completion_tokens: int = 0,
+        error: str = None,
+        first_token_latency: float = None,
+        cancelled: bool = False
+    ):
+        """Record one upstream model call"""
+        metrics = self._route(route, model)
+        metrics.counters["calls"] += 1
+        metrics.counters["promptTokens"] += prompt_tokens
+        metrics.counters["completionTokens"] += completion_tokens
+        metrics.latency_total += latency
+        if error:
+            metrics.counters["errors"] += 1
+            metrics.counters[f"errors.{error}"] += 1
+        else:
+            if cancelled:
+                metrics.counters["cancelled"] += 1
+            # A call cut off before it produced anything says nothing about upstream latency
+            if not cancelled or first_token_latency is not None:
+                metrics.latencies.append(latency)
+        if first_token_latency is not None:
+            metrics.first_token_latencies.append(first_token_latency)
+        
+        self._add_usage(route, {
+            "calls": 1,
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "latency_ms": int(latency * 1000),
+            "errors": 1 if error else 0
+        })
+    
+    def record_event(self, route: str, model: str, event: str):
+        """Count a call-related event such as cache_hit, coalesced, fallback, retry or hedge"""
+        self._route(route, model).counters[event] += 1
+        self._add_usage(route, {event: 1})
+    
+    async def start(self, db):
+        self.db = db
+        self.flush_task = asyncio.create_task(self._flush_loop())
+    
+    async def stop(self):
+        if self.flush_task:
+            self.flush_task.cancel()
+            await asyncio.gather(self.flush_task, return_exceptions=True)
+            self.flush_task = None
+        await self.flush()
+    
+    async def _flush_loop(self):
+        while True:
+            await asyncio.sleep(AI_USAGE_FLUSH_INTERVAL)
+            await self.flush()
+    
+    async def flush(self):
+        """Write accumulated per-user usage to the ai_usage collection"""
+        if not self.pending_usage or self.db is None or self.db.database is None:
+            return
+        
+        pending, self.pending_usage = self.pending_usage, defaultdict(lambda: defaultdict(int))
+        now = datetime.utcnow()
+        for (user_id, day), counters in pending.items():
+            try:
+                await self.db.database.ai_usage.update_one(
+                    {"user_id": user_id, "date": day},
+                    {"$inc": dict(counters), "$set": {"updated_at": now}},
+                    upsert=True
+                )
+            except Exception as e:
+                logger.error(f"AI usage flush error: {e}")
+    
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "uptime": round(time.time() - self.started_at),
+            "routes": {name: metrics.get_stats() for name, metrics in self.routes.items()},
+            "subjects": {subject: dict(counters) for subject, counters in self.subjects.items()}
+        }
+
+# Global telemetry instance
+telemetry = AITelemetry()
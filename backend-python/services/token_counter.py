@@ -0,0 +1,36 @@
+import logging
+import os
+import re
+from typing import Dict
+
+logger = logging.getLogger(__name__)
+
+# cl100k_base is the encoding used by gpt-3.5-turbo and gpt-4
+AI_TOKEN_ENCODING = os.getenv("AI_TOKEN_ENCODING", "cl100k_base")
+
+# Tokens the chat format adds around every message (role, separators)
+MESSAGE_TOKEN_OVERHEAD = 4
+
+# Use the model's real tokenizer when available; tiktoken may be missing or unable
+# to fetch its encoding files offline, in which case fall back to an approximation
+try:
+    import tiktoken
+    _encoding = tiktoken.get_encoding(AI_TOKEN_ENCODING)
+except Exception as e:
+    logger.warning(f"tiktoken unavailable, using approximate token counts: {e}")
+    _encoding = None
+
+_TOKEN_PATTERN = re.compile(r"\w+|[^\w\s]")
+
+def count_tokens(text: str) -> int:
+    """Count tokens in text for the configured model"""
+    if not text:
+        return 0
+    if _encoding is not None:
+        return len(_encoding.encode(text, disallowed_special=()))
+    # Approximation: one token per punctuation mark, one per ~4 characters of each word
+    return sum((len(piece) + 3) // 4 for piece in _TOKEN_PATTERN.findall(text))
+
+def count_message_tokens(message: Dict[str, str]) -> int:
+    """Count tokens a chat message contributes to a prompt"""
+    return count_tokens(message.get("content", "")) + MESSAGE_TOKEN_OVERHEAD
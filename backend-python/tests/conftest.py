@@ -0,0 +1,7 @@
+import os
+import sys
+
+# Services build their clients at import time; unit tests never reach the real API
+os.environ.setdefault("OPENAI_API_KEY", "test-key")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
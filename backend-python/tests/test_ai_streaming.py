@@ -0,0 +1,199 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from services import ai_service as ai_module
+from models.quiz import Difficulty, QuestionType
+from services.ai_service import AIService
+
+def delta(text):
+    return SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=text))])
+
+class FakeStream:
+    """Upstream stream yielding chunks after the given delays"""
+    
+    def __init__(self, chunks, delays):
+        self.chunks = list(chunks)
+        self.delays = list(delays)
+        self.closed = False
+        self.response = SimpleNamespace(aclose=self.aclose)
+    
+    async def aclose(self):
+        self.closed = True
+    
+    def __aiter__(self):
+        return self
+    
+    async def __anext__(self):
+        if not self.chunks:
+            raise StopAsyncIteration
+        await asyncio.sleep(self.delays.pop(0))
+        return delta(self.chunks.pop(0))
+
+def make_service(stream):
+    service = AIService()
+    
+    async def create(**kwargs):
+        return stream
+    
+    service.client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+    return service
+
+async def collect(service, **kwargs):
+    return [chunk async for chunk in service._stream_completion("quiz", model="m", messages=[], **kwargs)]
+
+@pytest.mark.asyncio
+async def test_identical_streams_share_one_upstream_stream():
+    opened = []
+    release = asyncio.Event()
+    
+    async def run_stream(endpoint, **kwargs):
+        opened.append(kwargs)
+        yield "a"
+        await release.wait()
+        yield "b"
+    
+    service = AIService()
+    service._run_stream = run_stream
+    first = asyncio.ensure_future(collect(service))
+    await asyncio.sleep(0.01)
+    # Joins after "a" was streamed and still receives it
+    second = asyncio.ensure_future(collect(service))
+    await asyncio.sleep(0.01)
+    release.set()
+    
+    assert await asyncio.gather(first, second) == [["a", "b"], ["a", "b"]]
+    assert len(opened) == 1
+    assert service.coalesced == 1
+    assert service.in_flight_streams == {}
+
+@pytest.mark.asyncio
+async def test_stream_error_reaches_every_subscriber():
+    async def run_stream(endpoint, **kwargs):
+        yield "a"
+        raise ValueError("upstream failed")
+    
+    service = AIService()
+    service._run_stream = run_stream
+    results = await asyncio.gather(collect(service), collect(service), return_exceptions=True)
+    
+    assert all(isinstance(result, ValueError) for result in results)
+
+@pytest.mark.asyncio
+async def test_last_subscriber_leaving_cancels_upstream():
+    cancelled = asyncio.Event()
+    
+    async def run_stream(endpoint, **kwargs):
+        try:
+            yield "a"
+            await asyncio.sleep(10)
+            yield "b"
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+    
+    service = AIService()
+    service._run_stream = run_stream
+    stream = service._stream_completion("quiz", model="m", messages=[])
+    assert await stream.__anext__() == "a"
+    await stream.aclose()
+    
+    await asyncio.wait_for(cancelled.wait(), timeout=1)
+    assert service.in_flight_streams == {}
+
+@pytest.mark.asyncio
+async def test_first_token_timeout(monkeypatch):
+    service = make_service(FakeStream(["late"], [0.5]))
+    monkeypatch.setattr(ai_module, "AI_REQUEST_TIMEOUT", 0.05)
+    
+    with pytest.raises(asyncio.TimeoutError):
+        await collect(service)
+    assert service.in_flight == 0
+
+@pytest.mark.asyncio
+async def test_total_stream_timeout(monkeypatch):
+    stream = FakeStream(["a", "b", "c", "d"], [0, 0.04, 0.04, 0.04])
+    service = make_service(stream)
+    monkeypatch.setattr(ai_module, "AI_STREAM_TIMEOUT", 0.1)
+    
+    with pytest.raises(asyncio.TimeoutError):
+        await collect(service)
+    assert stream.closed
+    assert service.in_flight == 0
+
+@pytest.mark.asyncio
+async def test_first_token_latency_is_tracked():
+    service = make_service(FakeStream(["a", "b"], [0, 0]))
+    
+    assert await collect(service) == ["a", "b"]
+    assert len(service.latencies["m:quiz_first_token"].samples) == 1
+
+@pytest.mark.asyncio
+async def test_closing_chat_stream_releases_upstream():
+    closed = asyncio.Event()
+    
+    async def run_stream(endpoint, **kwargs):
+        try:
+            yield "Hello"
+            await asyncio.sleep(10)
+            yield " world"
+        finally:
+            closed.set()
+    
+    service = AIService()
+    service._run_stream = run_stream
+    reply = service.stream_chat_response("A fresh question about cells and membranes", "Biology", conversation_history=[{"role": "user", "content": "hi"}])
+    assert await reply.__anext__() == "Hello"
+    await reply.aclose()
+    
+    await asyncio.wait_for(closed.wait(), timeout=1)
+    assert service.in_flight_streams == {}
+
+@pytest.mark.asyncio
+async def test_retry_after_failed_stream_goes_upstream_again():
+    opened = []
+    
+    async def run_stream(endpoint, **kwargs):
+        opened.append(kwargs)
+        if len(opened) == 1:
+            raise RuntimeError("upstream failed")
+        yield "fresh"
+    
+    service = AIService()
+    service._run_stream = run_stream
+    
+    with pytest.raises(RuntimeError):
+        await collect(service)
+    # Retried as soon as the error arrives, before the finished stream's task callbacks run
+    assert await collect(service) == ["fresh"]
+    assert len(opened) == 2
+    assert service.coalesced == 0
+
+async def collect_shard(service):
+    shard = service._stream_quiz_shard("Fractions", "math", "fractions", 1, Difficulty.EASY, [QuestionType.MCQ], 1, 1)
+    return [question async for question in shard]
+
+@pytest.mark.parametrize("first_attempt", ["malformed", "failed"])
+@pytest.mark.asyncio
+async def test_quiz_shard_retry_gets_a_fresh_completion(first_attempt):
+    opened = []
+    question = '[{"type": "mcq", "question": "1/2 + 1/2?", "options": ["1", "2"], "correctAnswer": 0}]'
+    
+    async def run_stream(endpoint, **kwargs):
+        opened.append(kwargs)
+        if len(opened) == 1:
+            if first_attempt == "failed":
+                raise RuntimeError("stream dropped")
+            yield "[not json"
+            return
+        yield question
+    
+    service = AIService()
+    service._run_stream = run_stream
+    
+    questions = await collect_shard(service)
+    
+    assert [q["question"] for q in questions] == ["1/2 + 1/2?"]
+    assert len(opened) == 2
+    assert service.coalesced == 0
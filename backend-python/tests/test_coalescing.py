@@ -0,0 +1,137 @@
+import asyncio
+
+import pytest
+
+from services.ai_service import AIService
+
+def make_service(run):
+    """AIService whose upstream call is replaced by run(endpoint, **kwargs)"""
+    service = AIService()
+    service._run_completion = run
+    return service
+
+@pytest.mark.asyncio
+async def test_identical_calls_share_one_upstream_call():
+    calls = []
+    release = asyncio.Event()
+    
+    async def run(endpoint, **kwargs):
+        calls.append(kwargs)
+        await release.wait()
+        return "result"
+    
+    service = make_service(run)
+    first = asyncio.ensure_future(service._create_completion("summary", model="m", messages=[]))
+    second = asyncio.ensure_future(service._create_completion("summary", model="m", messages=[]))
+    await asyncio.sleep(0)
+    release.set()
+    
+    assert await asyncio.gather(first, second) == ["result", "result"]
+    assert len(calls) == 1
+    assert service.coalesced == 1
+    assert service.in_flight_calls == {}
+
+@pytest.mark.asyncio
+async def test_different_calls_do_not_share():
+    calls = []
+    
+    async def run(endpoint, **kwargs):
+        calls.append(kwargs)
+        return kwargs["temperature"]
+    
+    service = make_service(run)
+    results = await asyncio.gather(
+        service._create_completion("summary", model="m", messages=[], temperature=0.1),
+        service._create_completion("summary", model="m", messages=[], temperature=0.2)
+    )
+    
+    assert results == [0.1, 0.2]
+    assert len(calls) == 2
+
+@pytest.mark.asyncio
+async def test_error_reaches_every_waiter():
+    release = asyncio.Event()
+    
+    async def run(endpoint, **kwargs):
+        await release.wait()
+        raise ValueError("upstream failed")
+    
+    service = make_service(run)
+    first = asyncio.ensure_future(service._create_completion("summary", model="m", messages=[]))
+    second = asyncio.ensure_future(service._create_completion("summary", model="m", messages=[]))
+    await asyncio.sleep(0)
+    release.set()
+    
+    results = await asyncio.gather(first, second, return_exceptions=True)
+    assert all(isinstance(result, ValueError) for result in results)
+
+@pytest.mark.asyncio
+async def test_one_waiter_cancelling_keeps_the_call_for_others():
+    release = asyncio.Event()
+    
+    async def run(endpoint, **kwargs):
+        await release.wait()
+        return "result"
+    
+    service = make_service(run)
+    first = asyncio.ensure_future(service._create_completion("summary", model="m", messages=[]))
+    second = asyncio.ensure_future(service._create_completion("summary", model="m", messages=[]))
+    await asyncio.sleep(0)
+    first.cancel()
+    await asyncio.sleep(0)
+    release.set()
+    
+    assert await second == "result"
+    assert first.cancelled()
+
+@pytest.mark.asyncio
+async def test_caller_after_last_waiter_cancelled_starts_a_fresh_call():
+    calls = []
+    
+    async def run(endpoint, **kwargs):
+        calls.append(kwargs)
+        try:
+            await asyncio.sleep(10 if len(calls) == 1 else 0)
+        except asyncio.CancelledError:
+            # Slow to unwind, like an HTTP request being torn down
+            await asyncio.sleep(0.01)
+            raise
+        return "fresh"
+    
+    service = make_service(run)
+    first = asyncio.ensure_future(service._create_completion("summary", model="m", messages=[]))
+    await asyncio.sleep(0)
+    first.cancel()
+    await asyncio.sleep(0)
+    
+    # The cancelled task is still unwinding; a new identical call must not attach to it
+    assert await service._create_completion("summary", model="m", messages=[]) == "fresh"
+    assert len(calls) == 2
+    with pytest.raises(asyncio.CancelledError):
+        await first
+    # Let the cancelled upstream task finish unwinding
+    await asyncio.sleep(0.02)
+
+@pytest.mark.asyncio
+async def test_identical_hedged_calls_share_one_hedged_call():
+    hedged = []
+    release = asyncio.Event()
+    
+    async def run(endpoint, **kwargs):
+        raise AssertionError("hedged calls go through _hedged_completion")
+    
+    async def hedged_completion(endpoint, **kwargs):
+        hedged.append(kwargs)
+        await release.wait()
+        return "result"
+    
+    service = make_service(run)
+    service._hedged_completion = hedged_completion
+    first = asyncio.ensure_future(service._create_completion("chat", hedge=True, model="m", messages=[]))
+    second = asyncio.ensure_future(service._create_completion("chat", hedge=True, model="m", messages=[]))
+    await asyncio.sleep(0)
+    release.set()
+    
+    assert await asyncio.gather(first, second) == ["result", "result"]
+    assert hedged == [{"model": "m", "messages": []}]
+    assert service.coalesced == 1
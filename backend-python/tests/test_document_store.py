@@ -0,0 +1,54 @@
+import os
+from types import SimpleNamespace
+
+import pytest
+
+from services.document_store import DocumentStore
+
+class FakeDocuments:
+    """In-memory documents collection with the queries the store uses"""
+    
+    def __init__(self, docs):
+        self.docs = docs
+    
+    def _matches(self, query):
+        return [doc for doc in self.docs if all(doc.get(key) == value for key, value in query.items())]
+    
+    async def distinct(self, field, query):
+        return sorted({doc[field] for doc in self._matches(query)})
+    
+    async def find_one(self, query, projection=None):
+        matches = self._matches(query)
+        return matches[0] if matches else None
+    
+    async def delete_many(self, query):
+        for doc in self._matches(query):
+            self.docs.remove(doc)
+
+@pytest.mark.asyncio
+async def test_deleting_a_user_removes_only_unreferenced_files(tmp_path):
+    store = DocumentStore(str(tmp_path))
+    for digest in ("aa11", "bb22"):
+        await store.save(digest, digest.encode(), f"text of {digest}")
+    db = SimpleNamespace(database=SimpleNamespace(documents=FakeDocuments([
+        {"user_id": "user-1", "digest": "aa11"},
+        {"user_id": "user-1", "digest": "bb22"},
+        {"user_id": "user-2", "digest": "bb22"}
+    ])))
+    
+    assert await store.delete_user_documents(db, "user-1") == 1
+    
+    assert not os.path.exists(store._path("aa11"))
+    assert not os.path.exists(store._path("aa11", ".txt"))
+    assert await store.load_extracted_text("bb22") == "text of bb22"
+    assert db.database.documents.docs == [{"user_id": "user-2", "digest": "bb22"}]
+
+@pytest.mark.asyncio
+async def test_missing_files_are_skipped(tmp_path):
+    store = DocumentStore(str(tmp_path))
+    db = SimpleNamespace(database=SimpleNamespace(documents=FakeDocuments([
+        {"user_id": "user-1", "digest": "cc33"}
+    ])))
+    
+    assert await store.delete_user_documents(db, "user-1") == 1
+    assert db.database.documents.docs == []
@@ -0,0 +1,92 @@
+import asyncio
+import time
+
+import pytest
+
+from services import document_extractor
+from services.document_extractor import ExtractionBudget, ExtractionPool, ExtractionTimeout
+
+@pytest.fixture
+def make_pool():
+    pools = []
+    
+    def make(workers, timeout):
+        pool = ExtractionPool(workers=workers, timeout=timeout)
+        pools.append(pool)
+        return pool
+    
+    yield make
+    for pool in pools:
+        pool.shutdown()
+
+@pytest.mark.asyncio
+async def test_queued_jobs_do_not_time_out(make_pool):
+    # Four 0.6s jobs on one worker take 2.4s in total, longer than the 1.5s timeout of each
+    pool = make_pool(workers=1, timeout=1.5)
+    await pool.run(time.sleep, 0)
+    
+    results = await asyncio.gather(*[pool.run(time.sleep, 0.6) for _ in range(4)], return_exceptions=True)
+    
+    assert results == [None, None, None, None]
+    assert pool.get_stats()["timeouts"] == 0
+
+@pytest.mark.asyncio
+async def test_hung_job_does_not_kill_other_jobs(make_pool):
+    pool = make_pool(workers=2, timeout=2.0)
+    await asyncio.gather(pool.run(time.sleep, 0), pool.run(time.sleep, 0))
+    
+    # Still running when the hung job times out, and well within its own timeout
+    async def later_job():
+        await asyncio.sleep(1.5)
+        return await pool.run(time.sleep, 1.0)
+    
+    hung, other = await asyncio.gather(pool.run(time.sleep, 30), later_job(), return_exceptions=True)
+    
+    assert isinstance(hung, ExtractionTimeout)
+    assert other is None
+    assert pool.get_stats()["retiring"] == 0
+    assert pool.get_stats()["crashes"] == 0
+
+@pytest.mark.asyncio
+async def test_budget_is_shared_by_a_documents_jobs(make_pool):
+    pool = make_pool(workers=1, timeout=10)
+    await pool.run(time.sleep, 0)
+    budget = ExtractionBudget(1.0)
+    
+    await pool.run(time.sleep, 0.6, budget=budget)
+    
+    with pytest.raises(ExtractionTimeout):
+        await pool.run(time.sleep, 0.6, budget=budget)
+
+@pytest.mark.asyncio
+async def test_pdf_ranges_in_flight_are_bounded_by_workers(monkeypatch):
+    in_flight = 0
+    peak = 0
+    
+    async def run(func, source, start, stop, max_pages, budget=None):
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+        return 100, [f"page {page}" for page in range(start, stop)]
+    
+    class NoCache:
+        async def get_page_count(self, digest):
+            return None
+        
+        async def get_pages(self, digest, pages):
+            return {}
+        
+        async def set_pages(self, digest, page_count, pages):
+            pass
+    
+    monkeypatch.setattr(document_extractor, "extraction_pool", ExtractionPool(workers=2))
+    monkeypatch.setattr(document_extractor.extraction_pool, "run", run)
+    monkeypatch.setattr(document_extractor, "page_cache", NoCache())
+    monkeypatch.setattr(document_extractor, "EXTRACTION_PAGES_PER_JOB", 10)
+    
+    pages = [page async for page, _ in document_extractor.stream_pdf_document(b"", "digest")]
+    
+    assert pages == list(range(100))
+    assert peak == 2
@@ -0,0 +1,178 @@
+from types import SimpleNamespace
+
+import pytest
+from bson import ObjectId
+
+from routers import quizzes, summaries
+from services import job_queue as job_queue_module
+from services.job_queue import JobQueue, JobStatus
+
+class FakeCursor:
+    def __init__(self, docs):
+        self.docs = docs
+    
+    def sort(self, *args):
+        return self
+    
+    def __aiter__(self):
+        return self._iterate()
+    
+    async def _iterate(self):
+        for doc in self.docs:
+            yield doc
+
+class FakeCollection:
+    """In-memory collection supporting the equality filters and updates used here"""
+    
+    def __init__(self):
+        self.docs = []
+    
+    def _matches(self, query):
+        return [doc for doc in self.docs if all(doc.get(key) == value for key, value in query.items())]
+    
+    @staticmethod
+    def _apply(doc, update):
+        doc.update(update.get("$set", {}))
+        for key, amount in update.get("$inc", {}).items():
+            doc[key] = doc.get(key, 0) + amount
+    
+    async def insert_one(self, doc):
+        doc.setdefault("_id", ObjectId())
+        self.docs.append(doc)
+        return SimpleNamespace(inserted_id=doc["_id"])
+    
+    async def find_one(self, query, projection=None):
+        matches = self._matches(query)
+        return dict(matches[0]) if matches else None
+    
+    def find(self, query, projection=None):
+        return FakeCursor([dict(doc) for doc in self._matches(query)])
+    
+    async def find_one_and_update(self, query, update, return_document=None):
+        matches = self._matches(query)
+        if not matches:
+            return None
+        self._apply(matches[0], update)
+        return dict(matches[0])
+    
+    async def update_one(self, query, update):
+        matches = self._matches(query)
+        if matches:
+            self._apply(matches[0], update)
+    
+    async def delete_one(self, query):
+        matches = self._matches(query)
+        if matches:
+            self.docs.remove(matches[0])
+    
+    async def delete_many(self, query):
+        for doc in self._matches(query):
+            self.docs.remove(doc)
+
+def make_db():
+    return SimpleNamespace(database=SimpleNamespace(
+        jobs=FakeCollection(),
+        quizzes=FakeCollection(),
+        questions=FakeCollection(),
+        summaries=FakeCollection()
+    ))
+
+async def make_job(queue, job_type, payload):
+    result = await queue.db.database.jobs.insert_one({
+        "type": job_type,
+        "user_id": "user-1",
+        "status": JobStatus.QUEUED,
+        "payload": payload,
+        "attempts": 0
+    })
+    return result.inserted_id
+
+@pytest.mark.asyncio
+async def test_retries_pass_the_same_job_id(monkeypatch):
+    monkeypatch.setattr(job_queue_module, "JOB_HEARTBEAT_INTERVAL", 60)
+    queue = JobQueue(workers=1)
+    queue.db = make_db()
+    queue.queue = SimpleNamespace(put_nowait=lambda job_id: None)
+    seen = []
+    
+    async def handler(db, user_id, payload, report_progress, job_id):
+        seen.append(job_id)
+        if len(seen) == 1:
+            raise RuntimeError("model unavailable")
+        return {"ok": True}
+    
+    queue.register("test", handler)
+    job_id = await make_job(queue, "test", {})
+    await queue._run(job_id)
+    await queue._run(job_id)
+    
+    assert seen == [str(job_id), str(job_id)]
+    job_doc = await queue.db.database.jobs.find_one({"_id": job_id})
+    assert job_doc["status"] == JobStatus.COMPLETED
+    assert job_doc["attempts"] == 2
+
+@pytest.mark.asyncio
+async def test_summary_job_rerun_reuses_stored_summary(monkeypatch):
+    calls = []
+    
+    async def generate_summary(text, summary_type, language):
+        calls.append(text)
+        return "short summary"
+    
+    monkeypatch.setattr(summaries, "ai_service", SimpleNamespace(generate_summary=generate_summary))
+    db = make_db()
+    payload = {"original_text": "Some long text to summarize", "type": "BULLET"}
+    
+    async def report_progress(progress, stage=None):
+        pass
+    
+    first = await summaries.run_summary_job(db, "user-1", payload, report_progress, "job-1")
+    second = await summaries.run_summary_job(db, "user-1", payload, report_progress, "job-1")
+    
+    assert len(calls) == 1
+    assert len(db.database.summaries.docs) == 1
+    assert first["summary"]["id"] == second["summary"]["id"]
+
+@pytest.mark.asyncio
+async def test_quiz_job_rerun_replaces_partial_quiz(monkeypatch):
+    runs = []
+    
+    async def stream_quiz_questions(*args):
+        runs.append(args)
+        for i in range(3):
+            if len(runs) == 1 and i == 1:
+                raise RuntimeError("stream dropped")
+            yield {
+                "type": "mcq",
+                "question": f"Question {i}",
+                "options": ["a", "b"],
+                "correctAnswer": "a",
+                "explanation": "because",
+                "difficulty": "easy"
+            }
+    
+    monkeypatch.setattr(quizzes, "ai_service", SimpleNamespace(stream_quiz_questions=stream_quiz_questions))
+    db = make_db()
+    payload = {
+        "title": "Quiz",
+        "subject": "math",
+        "content": "Numbers",
+        "num_questions": 3,
+        "time_limit": 10,
+        "difficulty": "EASY",
+        "question_types": ["MCQ"]
+    }
+    
+    async def report_progress(progress, stage=None):
+        pass
+    
+    with pytest.raises(RuntimeError):
+        await quizzes.run_quiz_job(db, "user-1", payload, report_progress, "job-1")
+    assert len(db.database.quizzes.docs) == 1
+    assert len(db.database.questions.docs) == 1
+    
+    result = await quizzes.run_quiz_job(db, "user-1", payload, report_progress, "job-1")
+    
+    assert len(db.database.quizzes.docs) == 1
+    quiz_id = result["quiz"]["id"]
+    assert [doc["quiz_id"] for doc in db.database.questions.docs] == [quiz_id] * 3
@@ -0,0 +1,110 @@
+import pytest
+
+from models.summary import SummaryType
+from services import ai_service as ai_module
+from services import extractive_summarizer
+from services.ai_service import AIService
+
+def make_document(sections: int, chars: int) -> str:
+    return "\n\n".join(f"Section{i} " + "word " * (chars // 5) for i in range(sections))
+
+def make_service(summarize):
+    """AIService whose completions are answered by summarize(text) for map prompts"""
+    service = AIService()
+    reduce_notes = []
+    
+    async def complete_summary(prompt, max_tokens=1000):
+        if "\n\nNotes: " in prompt:
+            reduce_notes.append(prompt.split("\n\nNotes: ", 1)[1])
+            return "final summary"
+        return summarize(prompt.split("\n\nText: ", 1)[1])
+    
+    service._complete_summary = complete_summary
+    return service, reduce_notes
+
+@pytest.fixture(autouse=True)
+def small_chunks(monkeypatch):
+    monkeypatch.setattr(ai_module, "SUMMARY_CHUNK_CHARS", 1000)
+
+@pytest.mark.asyncio
+async def test_notes_that_fit_are_reduced_once():
+    service, reduce_notes = make_service(lambda text: text.split()[0])
+    
+    assert await service._generate_long_summary(make_document(6, 900), SummaryType.BULLET, "english") == ("final summary", False)
+    assert reduce_notes == ["\n\n".join(f"Section{i}" for i in range(6))]
+
+@pytest.mark.asyncio
+async def test_folding_stops_when_a_pass_does_not_shrink():
+    map_calls = []
+    
+    def echo(text):
+        map_calls.append(text)
+        return text
+    
+    service, reduce_notes = make_service(echo)
+    document = make_document(10, 900)
+    
+    await service._generate_long_summary(document, SummaryType.BULLET, "english")
+    
+    # One map pass over the document and a single fold pass that did not help
+    chunk_count = len(service._split_text(document, 1000))
+    assert chunk_count < len(map_calls) <= 2 * chunk_count
+    assert len(reduce_notes) == 1
+
+@pytest.mark.asyncio
+async def test_notes_that_never_shrink_keep_every_section():
+    # A model that echoes its input never shrinks the notes
+    service, reduce_notes = make_service(lambda text: text)
+    
+    await service._generate_long_summary(make_document(10, 900), SummaryType.BULLET, "english")
+    
+    notes = reduce_notes[0]
+    assert len(notes) <= 1000
+    # The end of the document is not silently dropped
+    assert "Section9" in notes
+
+class FakeSummaryCache:
+    def __init__(self):
+        self.stored = {}
+    
+    def make_key(self, text, summary_type, language):
+        return text
+    
+    async def get(self, key):
+        return None
+    
+    async def set(self, key, value):
+        self.stored[key] = value
+
+@pytest.mark.asyncio
+async def test_summaries_with_a_fallback_section_are_not_cached(monkeypatch):
+    cache = FakeSummaryCache()
+    monkeypatch.setattr(ai_module, "summary_cache", cache)
+    
+    def flaky(text):
+        if text.startswith("Section3 "):
+            raise RuntimeError("upstream hiccup")
+        return text.split()[0]
+    
+    service, _ = make_service(flaky)
+    
+    assert await service.generate_summary(make_document(6, 900), SummaryType.BULLET) == "final summary"
+    assert cache.stored == {}
+    
+    service, _ = make_service(lambda text: text.split()[0])
+    await service.generate_summary(make_document(6, 900), SummaryType.BULLET)
+    assert list(cache.stored.values()) == ["final summary"]
+
+def test_extractive_trim_keeps_central_sentences_in_order():
+    text = " ".join([
+        "Cells divide by mitosis in the body.",
+        "The weather was pleasant that day.",
+        "Mitosis produces two identical cells.",
+        "Cells use mitosis to grow and repair."
+    ])
+    
+    trimmed = extractive_summarizer.trim(text, 80)
+    
+    assert len(trimmed) <= 80
+    assert trimmed == "Cells divide by mitosis in the body. Mitosis produces two identical cells."
+    assert extractive_summarizer.trim("short", 80) == "short"
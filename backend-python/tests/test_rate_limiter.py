@@ -0,0 +1,138 @@
+import asyncio
+import time
+
+import httpx
+import openai
+import pytest
+
+from services import rate_limiter as rate_limiter_module
+from services.rate_limiter import RateLimiter, RateLimitTimeout, TokenBucket, retry_after_hint, retry_delay
+
+REQUEST = httpx.Request("POST", "https://api.openai.com/v1/chat/completions")
+
+def rate_limit_error(headers=None, code=None):
+    response = httpx.Response(429, headers=headers or {}, request=REQUEST)
+    return openai.RateLimitError("rate limited", response=response, body={"code": code} if code else None)
+
+@pytest.fixture
+def no_jitter(monkeypatch):
+    monkeypatch.setattr(rate_limiter_module, "AI_RETRY_JITTER", 0.0)
+    monkeypatch.setattr(rate_limiter_module, "AI_RETRY_BASE_DELAY", 0.5)
+    monkeypatch.setattr(rate_limiter_module, "AI_RETRY_MAX_DELAY", 20)
+
+def test_bucket_refills_continuously():
+    bucket = TokenBucket(60)
+    now = bucket.updated
+    
+    bucket.consume(60)
+    assert bucket.wait_time(1, now) == pytest.approx(1.0)
+    assert bucket.wait_time(1, now + 0.5) == pytest.approx(0.5)
+    assert bucket.wait_time(1, now + 1) == 0.0
+
+def test_bucket_caps_requests_larger_than_capacity():
+    bucket = TokenBucket(600)
+    now = bucket.updated
+    
+    assert bucket.wait_time(1000, now) == 0.0
+    bucket.consume(1000)
+    assert bucket.level == 0
+    assert bucket.wait_time(1000, now) == pytest.approx(60.0)
+
+def test_bucket_drain_keeps_debt():
+    bucket = TokenBucket(60)
+    bucket.consume(60)
+    bucket.consume(1)
+    level = bucket.level
+    
+    bucket.drain()
+    
+    assert bucket.level == level < 0
+
+@pytest.mark.asyncio
+async def test_unlimited_limiter_does_not_wait():
+    limiter = RateLimiter(rpm=0, tpm=0)
+    
+    await limiter.acquire(1000, time.monotonic())
+    
+    assert limiter.get_stats()["delayed"] == 0
+
+@pytest.mark.asyncio
+async def test_limiter_charges_requests_and_tokens(monkeypatch):
+    monkeypatch.setattr(rate_limiter_module, "AI_RATE_LIMIT_HEADROOM", 1.0)
+    limiter = RateLimiter(rpm=60, tpm=6000)
+    
+    await limiter.acquire(1000, time.monotonic() + 1)
+    
+    assert limiter.requests.level == pytest.approx(59, abs=0.1)
+    assert limiter.tokens.level == pytest.approx(5000, abs=10)
+
+@pytest.mark.asyncio
+async def test_limiter_times_out_when_quota_cannot_refill_in_time(monkeypatch):
+    monkeypatch.setattr(rate_limiter_module, "AI_RATE_LIMIT_HEADROOM", 1.0)
+    limiter = RateLimiter(rpm=0, tpm=600)
+    await limiter.acquire(600, time.monotonic() + 1)
+    
+    with pytest.raises(RateLimitTimeout):
+        await limiter.acquire(300, time.monotonic() + 1)
+    assert limiter.get_stats()["timeouts"] == 1
+
+@pytest.mark.asyncio
+async def test_limiter_waits_for_refill(monkeypatch):
+    monkeypatch.setattr(rate_limiter_module, "AI_RATE_LIMIT_HEADROOM", 1.0)
+    limiter = RateLimiter(rpm=600, tpm=0)
+    limiter.requests.consume(600)
+    
+    started = time.monotonic()
+    await limiter.acquire(0, started + 1)
+    
+    assert time.monotonic() - started >= 0.09
+    assert limiter.get_stats()["delayed"] >= 1
+
+@pytest.mark.asyncio
+async def test_pause_holds_requests_until_reset():
+    limiter = RateLimiter(rpm=0, tpm=0)
+    limiter.pause(0.05)
+    
+    started = time.monotonic()
+    await limiter.acquire(0, started + 1)
+    
+    assert time.monotonic() - started >= 0.04
+    assert limiter.get_stats()["rateLimited"] == 1
+
+@pytest.mark.asyncio
+async def test_pause_past_deadline_times_out():
+    limiter = RateLimiter(rpm=0, tpm=0)
+    limiter.pause(10)
+    
+    with pytest.raises(RateLimitTimeout):
+        await asyncio.wait_for(limiter.acquire(0, time.monotonic() + 0.1), timeout=1)
+
+@pytest.mark.parametrize("headers, expected", [
+    ({"retry-after-ms": "250"}, 0.25),
+    ({"retry-after": "3"}, 3.0),
+    ({"retry-after": "1m30s"}, 90.0),
+    ({"x-ratelimit-reset-requests": "20ms", "x-ratelimit-reset-tokens": "1.5s"}, 1.5),
+    ({}, None)
+])
+def test_retry_after_hint(headers, expected):
+    assert retry_after_hint(rate_limit_error(headers)) == expected
+
+def test_retry_delay_prefers_the_provider_hint(no_jitter):
+    assert retry_delay(rate_limit_error({"retry-after": "4"}), 0) == 4.0
+
+def test_retry_delay_backs_off_exponentially(no_jitter):
+    error = openai.APIConnectionError(request=REQUEST)
+    
+    assert retry_delay(error, 0) == 0.5
+    assert retry_delay(error, 2) == 2.0
+    assert retry_delay(error, 10) == 20
+
+def test_retry_delay_adds_jitter(monkeypatch):
+    monkeypatch.setattr(rate_limiter_module, "AI_RETRY_JITTER", 0.5)
+    delays = [retry_delay(rate_limit_error({"retry-after": "2"}), 0) for _ in range(20)]
+    
+    assert all(2.0 <= delay <= 3.0 for delay in delays)
+
+def test_retry_delay_skips_errors_not_worth_retrying(no_jitter):
+    assert retry_delay(ValueError("bad"), 0) is None
+    assert retry_delay(rate_limit_error(code="insufficient_quota"), 0) is None
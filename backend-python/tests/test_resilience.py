@@ -0,0 +1,134 @@
+from types import SimpleNamespace
+
+import pytest
+
+from services import resilience
+from services.resilience import CircuitBreaker, LatencyTracker
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+    
+    def monotonic(self):
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(resilience, "time", SimpleNamespace(monotonic=clock.monotonic))
+    monkeypatch.setattr(resilience, "AI_BREAKER_MIN_REQUESTS", 4)
+    monkeypatch.setattr(resilience, "AI_BREAKER_ERROR_RATE", 0.5)
+    monkeypatch.setattr(resilience, "AI_BREAKER_SLOW_CALL_SECONDS", 10)
+    monkeypatch.setattr(resilience, "AI_BREAKER_COOLDOWN", 30)
+    monkeypatch.setattr(resilience, "AI_BREAKER_WINDOW", 60)
+    return clock
+
+def trip(breaker):
+    for ok in (True, True, False, False):
+        breaker.record(ok, 1.0)
+
+def test_breaker_stays_closed_below_minimum_requests(clock):
+    breaker = CircuitBreaker("test")
+    for _ in range(3):
+        breaker.record(False, 1.0)
+    
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.allow()
+
+def test_breaker_trips_on_error_rate_and_rejects(clock):
+    breaker = CircuitBreaker("test")
+    trip(breaker)
+    
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.allow()
+    assert breaker.get_stats()["trips"] == 1
+    assert breaker.get_stats()["rejected"] == 1
+
+def test_breaker_trips_on_slow_calls(clock):
+    breaker = CircuitBreaker("test")
+    for _ in range(4):
+        breaker.record(True, 11.0)
+    
+    assert breaker.state == CircuitBreaker.OPEN
+
+def test_old_outcomes_leave_the_window(clock):
+    breaker = CircuitBreaker("test")
+    breaker.record(False, 1.0)
+    breaker.record(False, 1.0)
+    clock.now += 61
+    breaker.record(True, 1.0)
+    breaker.record(True, 1.0)
+    
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.get_stats()["recentCalls"] == 2
+
+def test_half_open_lets_one_probe_through(clock):
+    breaker = CircuitBreaker("test")
+    trip(breaker)
+    clock.now += 30
+    
+    assert breaker.allow()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert not breaker.allow()
+    
+    breaker.record(True, 1.0)
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.allow()
+
+def test_failed_probe_reopens(clock):
+    breaker = CircuitBreaker("test")
+    trip(breaker)
+    clock.now += 30
+    assert breaker.allow()
+    
+    breaker.record(False, 1.0)
+    
+    assert breaker.state == CircuitBreaker.OPEN
+    assert breaker.get_stats()["trips"] == 2
+    assert not breaker.allow()
+
+def test_abandoned_probe_frees_the_slot(clock):
+    breaker = CircuitBreaker("test")
+    trip(breaker)
+    clock.now += 30
+    assert breaker.allow()
+    
+    breaker.abandon()
+    
+    assert breaker.allow()
+
+def test_latency_percentile_needs_minimum_samples(monkeypatch):
+    monkeypatch.setattr(resilience, "AI_LATENCY_MIN_SAMPLES", 5)
+    tracker = LatencyTracker(max_samples=10)
+    for latency in (1, 2, 3, 4):
+        tracker.record(latency)
+    
+    assert tracker.percentile(50) is None
+    assert tracker.timeout(60) == 60
+    
+    tracker.record(5)
+    assert tracker.percentile(50) == 2
+    assert tracker.percentile(99) == 5
+
+def test_latency_window_keeps_recent_samples(monkeypatch):
+    monkeypatch.setattr(resilience, "AI_LATENCY_MIN_SAMPLES", 1)
+    tracker = LatencyTracker(max_samples=3)
+    for latency in (100, 1, 1, 1):
+        tracker.record(latency)
+    
+    assert tracker.percentile(99) == 1
+
+def test_timeout_is_bounded(monkeypatch):
+    monkeypatch.setattr(resilience, "AI_LATENCY_MIN_SAMPLES", 1)
+    monkeypatch.setattr(resilience, "AI_TIMEOUT_MIN", 5)
+    monkeypatch.setattr(resilience, "AI_TIMEOUT_MULTIPLIER", 2.0)
+    tracker = LatencyTracker()
+    
+    tracker.record(1)
+    assert tracker.timeout(60) == 5
+    
+    tracker.record(10)
+    assert tracker.timeout(60) == 20
+    
+    tracker.record(100)
+    assert tracker.timeout(60) == 60
@@ -0,0 +1,107 @@
+import os
+
+import pytest
+
+from services import retrieval
+from services.retrieval import RetrievalIndex, UserIndex, build_segment, chunk_text, index_terms
+
+def words(count: int, prefix: str = "w") -> str:
+    return " ".join(f"{prefix}{i}" for i in range(count))
+
+def test_chunks_overlap_and_cover_every_word():
+    chunks = chunk_text(words(10), chunk_words=4, overlap=1)
+    
+    assert chunks == ["w0 w1 w2 w3", "w3 w4 w5 w6", "w6 w7 w8 w9"]
+
+def test_short_text_is_one_chunk():
+    assert chunk_text(words(3), chunk_words=4, overlap=1) == ["w0 w1 w2"]
+    assert chunk_text("", chunk_words=4, overlap=1) == [""]
+
+def test_index_terms_drop_stop_words_and_punctuation():
+    assert index_terms("What is the Krebs cycle, and why does it matter?") == ["krebs", "cycle", "matter"]
+
+def test_build_segment_skips_passages_without_terms():
+    segment = build_segment("doc", "notes.txt", "the and of")
+    
+    assert segment == {"document_id": "doc", "name": "notes.txt", "passages": []}
+
+def make_index(*documents):
+    index = UserIndex()
+    for document_id, text in documents:
+        index.add(build_segment(document_id, f"{document_id}.txt", text))
+    return index
+
+def test_bm25_ranks_rarer_and_more_frequent_terms_higher():
+    index = make_index(
+        ("bio", "mitochondria produce energy mitochondria cells"),
+        ("chem", "energy levels electrons orbitals"),
+        ("phys", "energy mass light speed")
+    )
+    
+    ranked = index.search(index_terms("mitochondria energy"), k=3)
+    
+    assert [passage_id for _, passage_id in ranked][0] == "bio:0"
+    assert ranked[0][0] > ranked[1][0] > 0
+    assert len(ranked) == 3
+
+def test_bm25_favours_shorter_passages_for_the_same_frequency():
+    index = make_index(
+        ("short", "photosynthesis leaves"),
+        ("long", "photosynthesis " + words(40, "filler"))
+    )
+    
+    ranked = index.search(["photosynthesis"], k=2)
+    
+    assert [passage_id for _, passage_id in ranked] == ["short:0", "long:0"]
+
+def test_removed_documents_leave_the_index():
+    index = make_index(("a", "enzymes catalyse reactions"), ("b", "enzymes denature heat"))
+    
+    index.remove("a")
+    
+    assert [passage_id for _, passage_id in index.search(["enzymes"], k=5)] == ["b:0"]
+    assert "catalyse" not in index.postings
+    assert index.total_length == 3
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    monkeypatch.setattr(retrieval, "RETRIEVAL_MIN_SCORE", 0.0)
+    return RetrievalIndex(str(tmp_path))
+
+@pytest.mark.asyncio
+async def test_search_returns_the_users_matching_passages(store):
+    await store.add_document("user-1", "doc1", "bio.txt", "The cell membrane controls transport")
+    await store.add_document("user-2", "doc2", "other.txt", "membrane transport in another account")
+    
+    passages = await store.search("user-1", "How does the membrane control transport?")
+    
+    assert [(passage["documentId"], passage["name"]) for passage in passages] == [("doc1", "bio.txt")]
+    assert await store.search("user-3", "membrane") == []
+
+@pytest.mark.asyncio
+async def test_search_respects_the_token_budget(store):
+    for i in range(3):
+        await store.add_document("user-1", f"doc{i}", "notes.txt", f"osmosis {words(18, f'p{i}_')}")
+    
+    assert len(await store.search("user-1", "osmosis", k=3, token_budget=10_000)) == 3
+    assert len(await store.search("user-1", "osmosis", k=3, token_budget=5)) == 0
+
+@pytest.mark.asyncio
+async def test_index_picks_up_segments_written_by_another_process(store, tmp_path):
+    await store.add_document("user-1", "doc1", "a.txt", "glycolysis pyruvate")
+    assert len(await store.search("user-1", "glycolysis")) == 1
+    
+    other = RetrievalIndex(str(tmp_path))
+    await other.add_document("user-1", "doc2", "b.txt", "glycolysis atp")
+    os.utime(os.path.join(str(tmp_path), "user-1"), ns=(0, 0))
+    
+    assert {passage["documentId"] for passage in await store.search("user-1", "glycolysis")} == {"doc1", "doc2"}
+
+@pytest.mark.asyncio
+async def test_remove_user_deletes_the_index(store, tmp_path):
+    await store.add_document("user-1", "doc1", "a.txt", "ribosome translation")
+    
+    store.remove_user("user-1")
+    
+    assert not os.path.exists(os.path.join(str(tmp_path), "user-1"))
+    assert await store.search("user-1", "ribosome") == []
@@ -0,0 +1,52 @@
+from services.semantic_cache import SemanticAnswerCache, question_terms, exact_terms
+
+def test_paraphrase_hits():
+    cache = SemanticAnswerCache()
+    cache.set("Biology", "What is the process of cell division called?", "Mitosis")
+    
+    assert cache.get("biology", "what's the process of cell division called") == "Mitosis"
+
+def test_other_subject_misses():
+    cache = SemanticAnswerCache()
+    cache.set("Biology", "What is the process of cell division called?", "Mitosis")
+    
+    assert cache.get("Chemistry", "What is the process of cell division called?") is None
+
+def test_operators_are_kept():
+    assert "+" in question_terms("what is 3+2 plus one")
+    assert exact_terms("evaluate 3+2 for me") == ("3", "+", "2")
+    assert exact_terms("evaluate 3 * 2 for me") == ("3", "*", "2")
+
+def test_different_operator_or_number_misses():
+    cache = SemanticAnswerCache()
+    cache.set("Math", "Compute the value of 3+2 using integer arithmetic", "5")
+    
+    assert cache.get("Math", "Compute the value of 3+2 using integer arithmetic") == "5"
+    assert cache.get("Math", "Compute the value of 3-2 using integer arithmetic") is None
+    assert cache.get("Math", "Compute the value of 3 * 2 using integer arithmetic") is None
+    assert cache.get("Math", "Compute the value of 3+4 using integer arithmetic") is None
+
+def test_short_questions_are_not_cached():
+    cache = SemanticAnswerCache()
+    cache.set("Math", "What is 3+2?", "5")
+    cache.set("Biology", "Define photosynthesis", "Light to sugar")
+    
+    assert cache.get("Math", "What is 3+2?") is None
+    assert cache.get("Biology", "Define photosynthesis") is None
+    assert cache.stores == 0
+
+def test_expired_entry_misses():
+    cache = SemanticAnswerCache(ttl=-1)
+    cache.set("Biology", "What is the process of cell division called?", "Mitosis")
+    
+    assert cache.get("Biology", "What is the process of cell division called?") is None
+    assert len(cache.entries) == 0
+
+def test_eviction_keeps_max_size():
+    cache = SemanticAnswerCache(max_size=2)
+    cache.set("History", "When did the French revolution begin?", "1789")
+    cache.set("History", "Who was the first Roman emperor?", "Augustus")
+    cache.set("History", "Which empire built Machu Picchu originally?", "Inca")
+    
+    assert len(cache.entries) == 2
+    assert cache.get("History", "When did the French revolution begin?") is None
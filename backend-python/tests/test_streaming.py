@@ -0,0 +1,57 @@
+import json
+
+from services.streaming import JSONArrayStream, format_sse, format_ndjson, text_blocks
+
+def feed_all(parser, chunks):
+    return [item for chunk in chunks for item in parser.feed(chunk)]
+
+def test_objects_are_yielded_as_they_close():
+    parser = JSONArrayStream()
+    
+    assert feed_all(parser, ['[{"a": 1}', ', {"b"']) == [{"a": 1}]
+    assert feed_all(parser, [': 2}]']) == [{"b": 2}]
+    assert parser.finished
+
+def test_text_around_the_array_is_skipped():
+    parser = JSONArrayStream()
+    text = 'Here you go:\n```json\n[{"a": 1}, {"b": 2}]\n```\nMore prose [ignored]'
+    
+    assert feed_all(parser, [text]) == [{"a": 1}, {"b": 2}]
+
+def test_braces_and_escaped_quotes_inside_strings():
+    parser = JSONArrayStream()
+    item = {"question": 'What does "}" or "]" close in {x: [1]}?', "options": ["a\\\\", "b"]}
+    text = json.dumps([item])
+    
+    assert feed_all(parser, list(text)) == [item]
+
+def test_nested_objects_and_arrays():
+    parser = JSONArrayStream()
+    item = {"q": {"nested": [1, {"deep": [2, 3]}]}, "options": [[1], [2]]}
+    
+    assert feed_all(parser, [json.dumps([item, item])]) == [item, item]
+
+def test_malformed_element_is_skipped():
+    parser = JSONArrayStream()
+    
+    assert feed_all(parser, ['[{"a": 1,}, {"b": 2}]']) == [{"b": 2}]
+
+def test_truncated_tail_keeps_complete_elements():
+    parser = JSONArrayStream()
+    
+    assert feed_all(parser, ['[{"a": 1}, {"b": ']) == [{"a": 1}]
+    assert not parser.finished
+
+def test_nothing_after_the_closing_bracket():
+    parser = JSONArrayStream()
+    
+    assert feed_all(parser, ['[{"a": 1}] [{"b": 2}]']) == [{"a": 1}]
+
+def test_format_sse_and_ndjson():
+    assert format_sse("token", {"content": "hi"}) == 'event: token\ndata: {"content": "hi"}\n\n'
+    assert format_ndjson({"type": "done"}) == '{"type": "done"}\n'
+
+def test_text_blocks_keep_whole_paragraphs():
+    text = "\n".join(["a" * 10, "b" * 10, "c" * 30])
+    
+    assert list(text_blocks(text, 25)) == ["a" * 10 + "\n" + "b" * 10, "c" * 30]
@@ -0,0 +1,17 @@
+from services import telemetry as telemetry_module
+from services.telemetry import AITelemetry, tag_request
+
+def test_subjects_past_the_cap_are_counted_as_other(monkeypatch):
+    monkeypatch.setattr(telemetry_module, "AI_METRICS_MAX_SUBJECTS", 2)
+    telemetry = AITelemetry()
+    
+    for subject in ("Biology", "chemistry", "physics", "history", "biology"):
+        tag_request(subject=subject)
+        telemetry.record_event("chat", "gpt", "cache_hit")
+    tag_request()
+    
+    assert telemetry.get_stats()["subjects"] == {
+        "biology": {"cache_hit": 2},
+        "chemistry": {"cache_hit": 1},
+        "other": {"cache_hit": 2}
+    }
@@ -0,0 +1,37 @@
+import pytest
+from fastapi import HTTPException
+
+from routers import upload
+from services.document_extractor import DocumentTooLarge
+
+@pytest.fixture
+def small_chunks(monkeypatch):
+    monkeypatch.setattr(upload, "UPLOAD_CHUNK_SIZE", 4)
+    monkeypatch.setattr(upload, "MAX_TEXT_CHARS", 20)
+
+@pytest.mark.asyncio
+async def test_characters_split_across_chunks_decode(small_chunks, tmp_path):
+    path = tmp_path / "notes.txt"
+    path.write_text("café über naïve", encoding="utf-8")
+    
+    assert await upload.read_text_file(str(path)) == "café über naïve"
+
+@pytest.mark.asyncio
+async def test_long_text_files_stop_at_the_character_limit(small_chunks, tmp_path):
+    path = tmp_path / "notes.txt"
+    path.write_text("x" * 1000, encoding="utf-8")
+    
+    with pytest.raises(DocumentTooLarge):
+        await upload.read_text_file(str(path))
+    with pytest.raises(DocumentTooLarge):
+        await upload.read_text_file(b"x" * 21)
+
+@pytest.mark.asyncio
+async def test_completed_sessions_reject_long_text_files(small_chunks, tmp_path):
+    path = tmp_path / "notes.txt"
+    path.write_text("x" * 1000, encoding="utf-8")
+    
+    with pytest.raises(HTTPException) as error:
+        await upload.extract_and_store(None, "user-1", "notes.txt", ".txt", str(path), "digest", first_page=1)
+    
+    assert error.value.status_code == 400
@@ -0,0 +1,69 @@
+import httpx
+import pytest
+
+from middleware.upload_limit import UploadSizeLimitMiddleware
+from routers import upload
+
+async def echo_app(scope, receive, send):
+    """Reads the whole body and answers with its size"""
+    size = 0
+    while True:
+        message = await receive()
+        size += len(message.get("body", b""))
+        if not message.get("more_body"):
+            break
+    body = str(size).encode()
+    await send({"type": "http.response.start", "status": 200, "headers": [(b"content-length", str(len(body)).encode())]})
+    await send({"type": "http.response.body", "body": body})
+
+def make_client():
+    app = UploadSizeLimitMiddleware(
+        echo_app,
+        max_body_size=100,
+        route_limits=[(r"/file(/stream)?", 1000), (r"/files", 5000), (r"/sessions/[^/]+/chunks/[^/]+", 2000)]
+    )
+    return httpx.AsyncClient(app=app, base_url="http://test")
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("path, limit", [
+    ("/api/upload/file", 1000),
+    ("/api/upload/file/stream", 1000),
+    ("/api/upload/files", 5000),
+    ("/api/upload/sessions/abc/chunks/3", 2000),
+    ("/api/upload/sessions", 100)
+])
+async def test_each_route_gets_its_own_limit(path, limit):
+    async with make_client() as client:
+        allowed = await client.post(path, content=b"x" * limit)
+        rejected = await client.post(path, content=b"x" * (limit + 1))
+    
+    assert allowed.status_code == 200
+    assert rejected.status_code == 413
+
+@pytest.mark.asyncio
+async def test_streamed_body_is_counted_against_the_route_limit():
+    async def body():
+        for _ in range(3):
+            yield b"x" * 400
+    
+    async with make_client() as client:
+        response = await client.post("/api/upload/file", content=body())
+    
+    assert response.status_code == 413
+    assert response.json()["status_code"] == 413
+
+@pytest.mark.asyncio
+async def test_other_paths_are_not_limited():
+    async with make_client() as client:
+        response = await client.post("/api/summaries/", content=b"x" * 10000)
+    
+    assert response.status_code == 200
+
+def test_single_file_routes_do_not_get_the_multi_file_limit():
+    app = UploadSizeLimitMiddleware(None, upload.UPLOAD_DEFAULT_REQUEST_SIZE, upload.UPLOAD_ROUTE_LIMITS)
+    
+    assert app.limit_for("/api/upload/file") == upload.MAX_FILE_SIZE + upload.MULTIPART_FRAMING_SIZE
+    assert app.limit_for("/api/upload/file/stream") == upload.MAX_FILE_REQUEST_SIZE
+    assert app.limit_for("/api/upload/files") == upload.MAX_FILE_SIZE * upload.MAX_FILES_PER_UPLOAD + upload.MULTIPART_FRAMING_SIZE
+    assert app.limit_for("/api/upload/sessions/abc/chunks/0") == upload.RESUMABLE_CHUNK_SIZE
+    assert app.limit_for("/api/upload/sessions/abc/complete") == upload.UPLOAD_DEFAULT_REQUEST_SIZE
@@ -0,0 +1,69 @@
+import hashlib
+import os
+from tempfile import SpooledTemporaryFile
+
+import pytest
+from fastapi import HTTPException, UploadFile
+
+from routers import upload
+from services.document_store import DocumentStore
+
+def make_upload(data: bytes) -> UploadFile:
+    """An upload as the multipart parser leaves it, spooled and read to the end"""
+    spooled = SpooledTemporaryFile(max_size=16)
+    spooled.write(data)
+    return UploadFile(spooled, filename="notes.txt")
+
+@pytest.fixture
+def spool(tmp_path, monkeypatch):
+    store = DocumentStore(str(tmp_path / "store"))
+    uploads = tmp_path / "uploads"
+    uploads.mkdir()
+    monkeypatch.setattr(upload, "document_store", store)
+    monkeypatch.setattr(upload, "UPLOAD_DIR", str(uploads))
+    monkeypatch.setattr(upload, "UPLOAD_CHUNK_SIZE", 8)
+    monkeypatch.setattr(upload, "UPLOAD_SPOOL_THRESHOLD", 32)
+    monkeypatch.setattr(upload, "MAX_FILE_SIZE", 100)
+    return store, uploads
+
+@pytest.mark.asyncio
+async def test_small_uploads_are_read_into_memory(spool):
+    data = b"a short text file"
+    
+    async with upload.spool_upload(make_upload(data)) as (source, digest):
+        assert source == data
+        assert digest == hashlib.sha256(data).hexdigest()
+
+@pytest.mark.asyncio
+async def test_large_uploads_are_copied_once_and_cleaned_up(spool):
+    _, uploads = spool
+    data = b"x" * 80
+    
+    async with upload.spool_upload(make_upload(data)) as (source, digest):
+        with open(source, "rb") as f:
+            assert f.read() == data
+        assert os.listdir(uploads) == [os.path.basename(source)]
+    
+    assert os.listdir(uploads) == []
+
+@pytest.mark.asyncio
+async def test_stored_uploads_are_not_copied(spool):
+    store, uploads = spool
+    data = b"y" * 80
+    digest = hashlib.sha256(data).hexdigest()
+    await store.save(digest, data, "text")
+    
+    async with upload.spool_upload(make_upload(data)) as (source, _):
+        assert source == store._path(digest)
+        assert os.listdir(uploads) == []
+
+@pytest.mark.asyncio
+async def test_oversized_uploads_are_rejected_without_a_copy(spool):
+    _, uploads = spool
+    
+    with pytest.raises(HTTPException) as error:
+        async with upload.spool_upload(make_upload(b"z" * 101)):
+            pass
+    
+    assert error.value.status_code == 400
+    assert os.listdir(uploads) == []